@@ -0,0 +1,105 @@
+"""
+Compare the size and latency of the queries that compute stacked histograms
+(``%sqlplot histogram --category`` and ``geom_histogram(fill=...)``) as the
+number of bins grows. The previous implementation generated one
+SUM(CASE WHEN ...) column per bin, the current one groups by the bin index and
+arranges the counts with NumPy.
+
+>>> python histogram_stacked.py
+"""
+from time import perf_counter
+
+from IPython import InteractiveShell
+from jinja2 import Template
+
+from sql import plot
+from sql.connection import ConnectionManager
+
+num_rows = 1_000_000
+bin_counts = [10, 50, 100, 500, 1000]
+
+
+def legacy_query(table, column, category, bins, bin_size):
+    """The query that _histogram_stacked used to generate (one column per bin)"""
+    tolerance = bin_size / 1000
+    cases = " ".join(
+        f"SUM(CASE WHEN ABS(CEILING({column}/{bin_size} - 0.5)*{bin_size} "
+        f"- {bin}) <= {tolerance} THEN 1 ELSE 0 END) AS '{bin}',"
+        for bin in bins
+    )
+    return Template(
+        """
+        SELECT {{category}},
+        {{cases}}
+        FROM "{{table}}"
+        WHERE "{{column}}" IS NOT NULL
+        GROUP BY {{category}}
+        ORDER BY {{category}} DESC;
+        """
+    ).render(table=table, column=column, category=category, cases=cases)
+
+
+class QueryRecorder:
+    """Records the queries executed by a connection"""
+
+    def __init__(self, conn):
+        self.queries = []
+        self._execute = conn.execute
+
+    def execute(self, query, with_=None):
+        self.queries.append(query)
+        return self._execute(query, with_)
+
+
+def timeit(function, repeat=3):
+    timings = []
+
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+
+    return min(timings)
+
+
+if __name__ == "__main__":
+    ip = InteractiveShell.instance()
+    ip.run_line_magic("load_ext", "sql")
+    ip.run_line_magic("config", "SqlMagic.displaycon = False")
+    ip.run_line_magic("config", "SqlMagic.feedback = 0")
+    ip.run_line_magic("sql", "duckdb://")
+    ip.run_line_magic("sql", "SET enable_progress_bar = false")
+    ip.run_line_magic(
+        "sql",
+        "CREATE TABLE numbers AS SELECT random() * 1000 AS x, "
+        f"(range % 5)::VARCHAR AS category FROM range({num_rows})",
+    )
+
+    conn = ConnectionManager.current
+    recorder = QueryRecorder(conn)
+    conn.execute = recorder.execute
+
+    print(
+        f"{'bins':>6} {'legacy size':>12} {'legacy time':>12} "
+        f"{'size':>6} {'time':>8}"
+    )
+
+    for bins in bin_counts:
+        bin_, _, bin_size = plot._histogram("numbers", "x", bins, conn=conn)
+
+        query = legacy_query("numbers", "x", "category", bin_, bin_size)
+        legacy_size = len(query)
+        legacy_time = timeit(lambda: conn.execute(query).fetchall())
+
+        recorder.queries.clear()
+        elapsed = timeit(
+            lambda: plot._histogram_stacked(
+                "numbers", "x", "category", bin_, bin_size, conn=conn
+            )
+        )
+        size = len(recorder.queries[-1])
+
+        print(
+            f"{bins:>6} {legacy_size:>12} {legacy_time:>11.3f}s "
+            f"{size:>6} {elapsed:>7.3f}s"
+        )
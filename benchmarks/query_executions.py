@@ -0,0 +1,85 @@
+"""
+Count how many times each query is executed (and how long it takes) when
+converting results to pandas/polars data frames with DuckDB (native and via
+SQLAlchemy). Every query should be executed only once.
+
+>>> python query_executions.py
+"""
+from time import perf_counter
+
+import duckdb
+import duckdb_engine
+from IPython import InteractiveShell
+from sqlalchemy import create_engine
+
+from sql.magic import SqlMagic
+
+num_rows = 1_000_000
+query = "SELECT * FROM numbers"
+
+executed = []
+_execute = duckdb_engine.ConnectionWrapper.execute
+
+
+def execute_and_count(self, statement, *args, **kwargs):
+    executed.append(statement)
+    return _execute(self, statement, *args, **kwargs)
+
+
+# duckdb-engine sends every query (including the ones issued directly on the
+# DBAPI connection) through ConnectionWrapper.execute
+duckdb_engine.ConnectionWrapper.execute = execute_and_count
+
+
+class CountingConnection:
+    """Wraps a native duckdb connection to count executed queries"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return CountingConnection(self._conn.cursor())
+
+    def execute(self, statement, *args, **kwargs):
+        executed.append(statement)
+        self._conn.execute(statement, *args, **kwargs)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def setup(magic, alias, conn):
+    magic.execute(line=f"conn --alias {alias}", local_ns={"conn": conn})
+    magic.execute(
+        "CREATE TABLE numbers AS "
+        f"SELECT range AS x, random() AS y FROM range({num_rows})"
+    )
+
+
+def benchmark(magic, alias, method):
+    magic.execute(line=f"--use {alias}")
+    executed.clear()
+
+    start = perf_counter()
+    result = magic.execute(query)
+    getattr(result, method)()
+    elapsed = perf_counter() - start
+
+    print(
+        f"{alias:<18} {method:<16} executions: {executed.count(query)} "
+        f"time: {elapsed:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    magic = SqlMagic(InteractiveShell())
+    magic.displaycon = False
+    magic.feedback = 0
+
+    setup(magic, "duckdb-native", CountingConnection(duckdb.connect()))
+    setup(magic, "duckdb-sqlalchemy", create_engine("duckdb://"))
+
+    for alias in ("duckdb-native", "duckdb-sqlalchemy"):
+        for method in ("DataFrame", "PolarsDataFrame"):
+            benchmark(magic, alias, method)
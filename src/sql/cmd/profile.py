@@ -30,9 +30,37 @@ def profile(others):
         "-o", "--output", type=str, help="Store report location", required=False
     )
 
+    parser.add_argument(
+        "--sample",
+        type=str,
+        help="Profile a random sample: a number of rows (e.g., 1000) or a "
+        "percentage (e.g., 10%%)",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--approx",
+        action="store_true",
+        help="Use approximate algorithms for unique values and percentiles",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Compute the statistics again instead of using the cached report",
+        required=False,
+    )
+
     args = parser.parse_args(others)
 
-    report = inspect.get_table_statistics(schema=args.schema, name=args.table)
+    report = inspect.get_table_statistics(
+        schema=args.schema,
+        name=args.table,
+        sample=args.sample,
+        approx=args.approx,
+        refresh=args.refresh,
+    )
 
     if args.output:
         with open(args.output, "w") as f:
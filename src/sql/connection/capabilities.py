@@ -0,0 +1,218 @@
+"""
+Detect optional features supported by the underlying database driver
+"""
+from dataclasses import dataclass
+
+import sqlglot
+
+try:
+    import pyarrow as pa
+except ModuleNotFoundError:
+    pa = None
+
+try:
+    from sqlalchemy.engine.cursor import CursorFetchStrategy
+except ImportError:
+    CursorFetchStrategy = None
+
+
+# SQLAlchemy dialects whose DBAPI cursors can return results in Arrow format. We
+# only look for Arrow methods in the cursors of these dialects because other
+# drivers might define methods with the same names but different semantics
+ARROW_NATIVE_SQLALCHEMY_DIALECTS = {"duckdb", "snowflake", "bigquery"}
+
+# sqlglot dialects that support percentile_disc(...) WITHIN GROUP (ORDER BY ...)
+# as an aggregate function
+PERCENTILE_DISC_DIALECTS = {"duckdb", "postgres", "redshift", "snowflake", "oracle"}
+
+# sqlglot dialects that can't create a temporary table from a query outside of a
+# script (see AbstractConnection.temporary_table)
+NO_TEMPORARY_TABLES_DIALECTS = {"bigquery"}
+
+# identifiers we try when the dialect is unknown to sqlglot
+DEFAULT_IDENTIFIERS = ("", '"')
+
+
+@dataclass(frozen=True)
+class ConnectionCapabilities:
+    """
+    Features of a connection that we use to generate queries. They don't change
+    during the lifetime of a connection so they're computed once (see
+    ``AbstractConnection.capabilities``) instead of every time we render a query
+
+    Parameters
+    ----------
+    dialect : str
+        The dialect name (as reported by SQLAlchemy or the DBAPI connection)
+
+    driver : str
+        The driver name
+
+    sqlglot_dialect : str
+        The dialect name in sqlglot
+
+    identifiers : tuple
+        Characters that can be used to quote identifiers (some dialects use a
+        tuple with opening and closing characters, e.g., ``("[", "]")``)
+
+    use_backticks : bool
+        Whether the dialect supports backticks to quote identifiers
+
+    percentile_disc : bool
+        Whether the dialect supports ``percentile_disc(...) WITHIN GROUP``
+
+    arrow : bool
+        Whether results might be returned as Arrow data (requires pyarrow)
+
+    temporary_tables : bool
+        Whether the dialect can store the results of a query in a temporary table
+    """
+
+    dialect: str
+    driver: str
+    sqlglot_dialect: str
+    identifiers: tuple
+    use_backticks: bool
+    percentile_disc: bool
+    arrow: bool
+    temporary_tables: bool
+
+    @classmethod
+    def from_connection(cls, conn):
+        """Compute the capabilities of a connection"""
+        info = conn._get_database_information()
+        sqlglot_dialect = conn._get_sqlglot_dialect()
+
+        if conn.is_dbapi_connection:
+            # we can only tell when fetching the results, see get_arrow_batches
+            arrow = pa is not None
+        else:
+            arrow = (
+                pa is not None and info["dialect"] in ARROW_NATIVE_SQLALCHEMY_DIALECTS
+            )
+
+        return cls(
+            dialect=info["dialect"],
+            driver=info["driver"],
+            sqlglot_dialect=sqlglot_dialect,
+            identifiers=_get_identifiers(info["dialect"]),
+            use_backticks=_supports_backticks(sqlglot_dialect),
+            percentile_disc=sqlglot_dialect in PERCENTILE_DISC_DIALECTS,
+            arrow=arrow,
+            temporary_tables=sqlglot_dialect not in NO_TEMPORARY_TABLES_DIALECTS,
+        )
+
+
+def _get_tokenizer_identifiers(dialect):
+    return sqlglot.Dialect.get_or_raise(dialect).Tokenizer.IDENTIFIERS
+
+
+def _supports_backticks(sqlglot_dialect):
+    if not sqlglot_dialect:
+        return False
+
+    try:
+        return "`" in _get_tokenizer_identifiers(sqlglot_dialect)
+    except (ValueError, AttributeError, TypeError):
+        return False
+
+
+def _get_identifiers(dialect):
+    identifiers = list(DEFAULT_IDENTIFIERS)
+
+    try:
+        identifiers = [*set(identifiers + _get_tokenizer_identifiers(dialect))]
+    except ValueError:
+        pass
+    except AttributeError:
+        # this might be a DBAPI connection
+        pass
+
+    return tuple(identifiers)
+
+
+def get_arrow_batches(sqlaproxy, dialect=None):
+    """
+    Returns an iterable of ``pyarrow.RecordBatch`` with the results of an executed
+    query if the driver returns Arrow data natively (DuckDB, ADBC drivers,
+    Snowflake, BigQuery), otherwise returns None. If this returns an iterable,
+    the results must only be consumed through it
+
+    Parameters
+    ----------
+    sqlaproxy
+        A DBAPI cursor or a SQLAlchemy ``CursorResult``
+
+    dialect : str, default None
+        The connection's dialect (only used for SQLAlchemy results)
+    """
+    if pa is None:
+        return None
+
+    if _is_sqlalchemy_result(sqlaproxy):
+        cursor = _get_unbuffered_cursor(sqlaproxy, dialect)
+    else:
+        cursor = sqlaproxy
+
+    if cursor is None or getattr(cursor, "description", None) is None:
+        return None
+
+    try:
+        return _fetch_arrow_batches(cursor)
+    # drivers might define the methods but fail for some results (e.g., Snowflake
+    # raises an error if the results are in JSON format), fetching rows still works
+    # since nothing has been consumed
+    except Exception:
+        return None
+
+
+def _is_sqlalchemy_result(sqlaproxy):
+    return hasattr(sqlaproxy, "cursor_strategy")
+
+
+def _get_unbuffered_cursor(result, dialect):
+    """
+    Returns the DBAPI cursor from a SQLAlchemy result if no rows have been
+    buffered by SQLAlchemy, otherwise returns None
+    """
+    if dialect not in ARROW_NATIVE_SQLALCHEMY_DIALECTS or not result.returns_rows:
+        return None
+
+    # other strategies (e.g., when using stream_results) pre-fetch rows from the
+    # cursor, which we'd miss if we fetched the rest as Arrow
+    if type(result.cursor_strategy) is not CursorFetchStrategy:
+        return None
+
+    return result.cursor
+
+
+def _fetch_arrow_batches(cursor):
+    # duckdb and ADBC: returns a pyarrow.RecordBatchReader
+    if hasattr(cursor, "fetch_record_batch"):
+        return cursor.fetch_record_batch()
+
+    # snowflake: returns an iterator of pyarrow.Table
+    if hasattr(cursor, "fetch_arrow_batches"):
+        return _tables_to_batches(cursor.fetch_arrow_batches())
+
+    if hasattr(cursor, "fetch_arrow_table"):
+        return cursor.fetch_arrow_table().to_batches()
+
+    # snowflake: returns None if there are no results
+    if hasattr(cursor, "fetch_arrow_all"):
+        table = cursor.fetch_arrow_all()
+        return [] if table is None else table.to_batches()
+
+    # bigquery's DBAPI cursor keeps the job that produced the results, fetching
+    # them as Arrow doesn't re-run the query
+    query_job = getattr(cursor, "_query_job", None)
+
+    if query_job is not None and hasattr(query_job, "to_arrow"):
+        return query_job.to_arrow().to_batches()
+
+    return None
+
+
+def _tables_to_batches(tables):
+    for table in tables:
+        yield from table.to_batches()
@@ -2,12 +2,17 @@ import warnings
 import difflib
 import abc
 import os
+import re
+import sys
 from difflib import get_close_matches
 import atexit
+import threading
+from contextlib import contextmanager
 from functools import partial
 
 import sqlalchemy
 from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import DefaultDialect
 from sqlalchemy.exc import (
     NoSuchModuleError,
     OperationalError,
@@ -16,7 +21,7 @@ from sqlalchemy.exc import (
     InternalError,
 )
 from IPython.core.error import UsageError
-import sqlglot
+from sqlglot import exp
 import sqlparse
 from ploomber_core.exceptions import modify_exceptions
 
@@ -29,9 +34,12 @@ from sql.parse import (
     escape_string_literals_with_colon_prefix,
     find_named_parameters,
     ConnectionsFile,
+    POOL_OPTIONS,
 )
 from sql.warnings import JupySQLQuotedNamedParametersWarning, JupySQLRollbackPerformed
 from sql import _current
+from sql import query_util
+from sql.connection.capabilities import ConnectionCapabilities
 
 
 PLOOMBER_DOCS_LINK_STR = (
@@ -93,6 +101,52 @@ def extract_module_name_from_NoSuchModuleError(e):
     return str(e).split(":")[-1].split(".")[-1]
 
 
+def _is_select(query):
+    """Returns True if the query is a SELECT statement"""
+    words = query.split()
+
+    if words:
+        first_word_statement = words[0].lower()
+    else:
+        first_word_statement = ""
+
+    # NOTE: in duckdb db "from TABLE_NAME" is valid
+    # TODO: we can parse the query to ensure that it's a SELECT statement
+    # for example, it might start with WITH but the final statement might
+    # not be a SELECT
+    return first_word_statement in {"select", "with", "from"}
+
+
+def _has_multiple_statements(query):
+    """Returns True if the query contains more than one statement"""
+    # run_statements already split the cell, so we only call sqlparse (which is
+    # slow for long queries) if there's a semicolon before the end of the query
+    if ";" not in query.rstrip().rstrip(";"):
+        return False
+
+    return len(sqlparse.split(query)) > 1
+
+
+def _find_interrupt_method(dbapi_connection):
+    """
+    Returns the driver's method to interrupt the query running in the DBAPI
+    connection (None if the driver doesn't have one)
+    """
+    # duckdb-engine wraps the duckdb connection
+    dbapi_connection = getattr(
+        dbapi_connection, "_ConnectionWrapper__c", dbapi_connection
+    )
+
+    # sqlite3 and duckdb implement interrupt(), psycopg2 and psycopg cancel()
+    for name in ("interrupt", "cancel"):
+        method = getattr(dbapi_connection, name, None)
+
+        if callable(method):
+            return method
+
+    return None
+
+
 class ResultSetCollection:
     def __init__(self) -> None:
         self._result_sets = []
@@ -192,6 +246,7 @@ class ConnectionManager:
         creator=None,
         alias=None,
         config=None,
+        pool_options=None,
     ):
         """
         Set the current database connection. This method is called from the magic to
@@ -210,6 +265,10 @@ class ConnectionManager:
         config : object, optional
             An object with configuration options. Options must be accessible via
             attributes. As of 0.9.0, only the autocommit option is needed.
+
+        pool_options : dict, optional
+            Options to configure the connection pool (e.g., from a section in the
+            connections file), they take precedence over the ones in ``config``
         """
         connect_args = connect_args or {}
 
@@ -251,6 +310,7 @@ class ConnectionManager:
                         creator=creator,
                         alias=alias,
                         config=config,
+                        pool_options=pool_options,
                     )
 
         else:
@@ -365,10 +425,17 @@ class ConnectionManager:
 
     @classmethod
     def from_connect_str(
-        cls, connect_str=None, connect_args=None, creator=None, alias=None, config=None
+        cls,
+        connect_str=None,
+        connect_args=None,
+        creator=None,
+        alias=None,
+        config=None,
+        pool_options=None,
     ):
         """Creates a new connection from a connection string"""
         connect_args = connect_args or {}
+        pool_kwargs = get_pool_kwargs(config, pool_options, connect_str)
 
         try:
             if creator:
@@ -376,11 +443,13 @@ class ConnectionManager:
                     connect_str,
                     connect_args=connect_args,
                     creator=creator,
+                    **pool_kwargs,
                 )
             else:
                 engine = sqlalchemy.create_engine(
                     connect_str,
                     connect_args=connect_args,
+                    **pool_kwargs,
                 )
         except (ModuleNotFoundError, NoSuchModuleError) as e:
             suggestion_str = get_missing_package_suggestion_str(e)
@@ -416,6 +485,7 @@ class ConnectionManager:
                 displaycon=False,
                 alias="default",
                 config=config,
+                pool_options=connections_file.get_default_pool_options(),
             )
 
 
@@ -429,6 +499,24 @@ class AbstractConnection(abc.ABC):
         ConnectionManager.connections[alias] = self
 
         self._result_sets = ResultSetCollection()
+        self._capabilities = None
+        # number of write statements executed, used to invalidate cached plot data
+        self._write_generation = 0
+        self._checkout_lock = threading.RLock()
+        # borrowed connections running statements of the current cell (see
+        # sql.run.parallel), interrupt() also interrupts them
+        self._running_checkouts = set()
+
+    @property
+    def capabilities(self):
+        """
+        Returns a ``ConnectionCapabilities`` object with the features of this
+        connection (sqlglot dialect, identifiers, etc.), it's computed once
+        """
+        if self._capabilities is None:
+            self._capabilities = ConnectionCapabilities.from_connection(self)
+
+        return self._capabilities
 
     @abc.abstractproperty
     def dialect(self):
@@ -453,6 +541,175 @@ class AbstractConnection(abc.ABC):
         """Create a table from a pandas DataFrame"""
         pass
 
+    @contextmanager
+    def checkout(self, pooled=False):
+        """
+        Borrow a connection to run queries (it has the same ``execute`` and
+        ``raw_execute`` methods). By default, it's this connection, so callers
+        in other threads wait until it's returned. Subclasses that have a pool
+        of connections may return another connection if ``pooled`` is True
+        """
+        with self._lock():
+            yield self
+
+    @contextmanager
+    def temporary_table(self, name, query):
+        """
+        Store the results of ``query`` in a temporary table (only visible to
+        this connection), the table is dropped when the block ends. Yields the
+        name of the table, which might have a prefix required by the dialect
+        (e.g., ``#`` in SQL Server)
+        """
+        dialect = self.capabilities.sqlglot_dialect
+
+        if not self.capabilities.temporary_tables:
+            raise exceptions.UsageError(
+                f"Temporary tables are not supported for {dialect}"
+            )
+
+        prefix, statement = _TEMPORARY_TABLE_STATEMENTS.get(
+            dialect, _DEFAULT_TEMPORARY_TABLE_STATEMENT
+        )
+        name = f"{prefix}{name}"
+        self.raw_execute(statement.format(name=name, query=query))
+
+        try:
+            yield name
+        finally:
+            self.raw_execute(f"DROP TABLE {name}")
+
+    @contextmanager
+    def _lock(self):
+        """
+        Use this connection exclusively, waits if another thread is using it
+        (e.g., a query running with ``%%sql --async``)
+        """
+        if not self._checkout_lock.acquire(blocking=False):
+            display.message("Waiting for the query running in the background...")
+            self._checkout_lock.acquire()
+
+        try:
+            yield
+        finally:
+            self._checkout_lock.release()
+
+    @abc.abstractmethod
+    def _get_dbapi_connection(self):
+        """Returns the underlying DBAPI connection"""
+        pass
+
+    def _get_interrupt_method(self):
+        """
+        Returns the driver's method to interrupt the running query (None if the
+        driver doesn't have one)
+        """
+        return _find_interrupt_method(self._get_dbapi_connection())
+
+    def interrupt(self):
+        """
+        Interrupt the query running in this connection (call it from another
+        thread). Returns False if the driver doesn't support it
+        """
+        method = self._get_interrupt_method()
+        interrupted = method is not None
+
+        if interrupted:
+            method()
+
+        for connection in list(self._running_checkouts):
+            interrupted = connection.interrupt() or interrupted
+
+        return interrupted
+
+    def _prepare_interrupt(self):
+        """
+        Called before running queries that may be interrupted by a timeout,
+        subclasses can override it to fetch what ``interrupt()`` needs
+        """
+        pass
+
+    def _rollback(self):
+        """
+        Roll back the current transaction, so the connection can be used again
+        after interrupting a query
+        """
+        pass
+
+    @contextmanager
+    def _timeout(self, seconds, connection=None):
+        """
+        Interrupt the queries that run in this block if they take longer than
+        ``seconds`` (a watchdog thread calls ``interrupt()``). If they're
+        interrupted, rolls back the transaction and raises QueryTimeoutError
+
+        Parameters
+        ----------
+        seconds : float
+            Maximum number of seconds, 0 or None to disable the timeout
+
+        connection : default None
+            The connection that runs the queries, if it's a connection borrowed
+            with ``checkout()``, only that connection is interrupted (and it's
+            rolled back when it's returned to the pool)
+        """
+        if not seconds:
+            yield
+            return
+
+        if connection is None:
+            connection = self
+
+        if connection is self:
+            self._prepare_interrupt()
+
+        # prevents the watchdog from interrupting a query that's started after
+        # the block finished
+        lock = threading.Lock()
+        finished = False
+        timed_out = False
+
+        def watchdog():
+            nonlocal timed_out
+
+            with lock:
+                if finished:
+                    return
+
+                timed_out = True
+
+                if not connection.interrupt():
+                    display.message(
+                        f"The query exceeded the timeout ({seconds}s) but "
+                        f"{self._driver!r} does not support cancelling queries, "
+                        "waiting for it to finish..."
+                    )
+
+        timer = threading.Timer(seconds, watchdog)
+        timer.daemon = True
+        timer.start()
+
+        try:
+            yield
+        except Exception as e:
+            with lock:
+                finished = True
+
+            if not timed_out:
+                raise
+
+            if connection is self:
+                self._rollback()
+
+            raise exceptions.QueryTimeoutError(
+                f"Query cancelled after exceeding the timeout ({seconds}s). "
+                "Change it with --timeout or %config SqlMagic.statement_timeout"
+            ) from e
+        finally:
+            with lock:
+                finished = True
+
+            timer.cancel()
+
     def close(self):
         """Close the connection"""
         for rs in self._result_sets:
@@ -494,7 +751,7 @@ class AbstractConnection(abc.ABC):
         str
             SQL clause that's compatible to current connected dialect
         """
-        write_dialect = self._get_sqlglot_dialect()
+        write_dialect = self.capabilities.sqlglot_dialect
 
         # we write queries to be duckdb-compatible so we don't need to transpile
         # them. Furthermore, sqlglot does not guarantee roundtrip conversion
@@ -503,13 +760,68 @@ class AbstractConnection(abc.ABC):
             return query
 
         try:
-            return ";\n".join(
-                [p.sql(dialect=write_dialect) for p in sqlglot.parse(query)]
-            )
+            return query_util.transpile(query, write=write_dialect)
+        except Exception:
+            return query
+
+    def _limit_query(self, query, limit):
+        """Add a LIMIT clause (TOP, FETCH FIRST, etc., depending on the dialect)
+        to a SELECT statement so the database can stop once it has enough rows
+
+        Parameters
+        ----------
+        query : str
+            SQL query
+
+        limit : int
+            Maximum number of rows
+
+        Returns
+        -------
+        str
+            The query with the limit. Returns the original query if it isn't a
+            single SELECT statement, if it already has a limit that is smaller (or
+            that is not a number), or if sqlglot cannot parse it
+        """
+        dialect = self.capabilities.sqlglot_dialect
+
+        try:
+            expressions = query_util.parse(query, dialect)
+        except Exception:
+            return query
+
+        if len(expressions) != 1:
+            return query
+
+        expression = expressions[0]
+
+        if not isinstance(expression, (exp.Select, exp.Union)):
+            return query
+
+        current = expression.args.get("limit")
+
+        if current is not None:
+            # FETCH FIRST n ROWS stores the number in "count"
+            value = current.args.get("count") or current.expression
+
+            if not isinstance(value, exp.Literal) or value.is_string:
+                return query
+
+            try:
+                current_limit = int(value.this)
+            except ValueError:
+                # e.g., LIMIT 10.5 or LIMIT 1e3
+                return query
+
+            if current_limit <= limit:
+                return query
+
+        try:
+            return expression.limit(limit).sql(dialect=dialect)
         except Exception:
             return query
 
-    def _prepare_query(self, query, with_=None) -> str:
+    def _prepare_query(self, query, with_=None, limit=None) -> str:
         """
         Returns a textual representation of a query based
         on the current connection
@@ -521,12 +833,18 @@ class AbstractConnection(abc.ABC):
 
         with_ : string, default None
             The key to use in with sql clause
+
+        limit : int, default None
+            If not None, limit SELECT statements to this number of rows
         """
         if with_:
             query = self._resolve_cte(query, with_)
 
         query = self._transpile_query(query)
 
+        if limit:
+            query = self._limit_query(query, limit)
+
         return query
 
     def _resolve_cte(self, query, with_):
@@ -547,15 +865,7 @@ class AbstractConnection(abc.ABC):
         bool
             Indicate if the dialect can use backtick identifier in the SQL clause
         """
-        cur_dialect = self._get_sqlglot_dialect()
-        if not cur_dialect:
-            return False
-        try:
-            return (
-                "`" in sqlglot.Dialect.get_or_raise(cur_dialect).Tokenizer.IDENTIFIERS
-            )
-        except (ValueError, AttributeError, TypeError):
-            return False
+        return self.capabilities.use_backticks
 
     def get_curr_identifiers(self) -> list:
         """
@@ -563,23 +873,7 @@ class AbstractConnection(abc.ABC):
 
         Default identifiers are : ["", '"']
         """
-        identifiers = ["", '"']
-        try:
-            connection_info = self._get_database_information()
-            if connection_info:
-                cur_dialect = connection_info["dialect"]
-                identifiers_ = sqlglot.Dialect.get_or_raise(
-                    cur_dialect
-                ).Tokenizer.IDENTIFIERS
-
-                identifiers = [*set(identifiers + identifiers_)]
-        except ValueError:
-            pass
-        except AttributeError:
-            # this might be a DBAPI connection
-            pass
-
-        return identifiers
+        return list(self.capabilities.identifiers)
 
 
 # some dialects break when commit is used
@@ -593,6 +887,37 @@ _COMMIT_BLACKLIST_DIALECTS = (
     "vertica",
 )
 
+# dialects whose drivers can only use server-side cursors inside a transaction
+# (e.g., psycopg2 raises an error if the connection is in autocommit mode)
+_STREAM_RESULTS_REQUIRE_TRANSACTION_DIALECTS = ("postgres", "redshift")
+
+# statements that create objects only visible to the connection that runs them
+# (e.g., CREATE TEMP TABLE, or SQL Server's #tables)
+_CREATE_TEMP_OBJECT = re.compile(
+    r"\bCREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:LOCAL|GLOBAL|PRIVATE)\s+)?TEMP(?:ORARY)?\b"
+    r"|\b(?:TABLE|INTO)\s+#",
+    re.IGNORECASE,
+)
+
+# prefix of the table name and statement to store the results of a query in a
+# temporary table (keys are sqlglot dialects), see temporary_table
+_TEMPORARY_TABLE_STATEMENTS = {
+    "tsql": ("#", "SELECT * INTO {name} FROM ({query}) AS temporary_table_query"),
+    # private temporary tables (Oracle 18c+) can be created from a query without
+    # defining them first, their names must start with ORA$PTT_
+    "oracle": (
+        "ORA$PTT_",
+        "CREATE PRIVATE TEMPORARY TABLE {name} ON COMMIT PRESERVE DEFINITION "
+        "AS {query}",
+    ),
+}
+
+_DEFAULT_TEMPORARY_TABLE_STATEMENT = ("", "CREATE TEMPORARY TABLE {name} AS {query}")
+
+_TRANSACTION_START = {"begin", "start"}
+
+_TRANSACTION_END = {"commit", "rollback", "end", "abort"}
+
 
 # TODO: the autocommit is read only during initialization, if the user changes it
 # it won't have any effect
@@ -627,24 +952,20 @@ class SQLAlchemyConnection(AbstractConnection):
         db_info = self._get_database_information()
         self._dialect = db_info["dialect"]
         self._driver = db_info["driver"]
+        self._config = config
+        # (dbapi connection, server process id), see _prepare_interrupt
+        self._backend_pid = None
+        # see has_session_state
+        self._has_temp_objects = False
+        self._has_uncommitted_changes = False
+        # see _get_execution_options
+        self._warned_stream_results = False
 
         autocommit = True if config is None else config.autocommit
-
-        if autocommit:
-            success = set_sqlalchemy_isolation_level(self._connection_sqlalchemy)
-            self._requires_manual_commit = not success
-
-            # TODO: I noticed we don't have any unit tests for this
-            # even if autocommit is true, we should not use it for some dialects
-            self._requires_manual_commit = (
-                all(
-                    blacklisted_dialect not in str(self._dialect)
-                    for blacklisted_dialect in _COMMIT_BLACKLIST_DIALECTS
-                )
-                and self._requires_manual_commit
-            )
-        else:
-            self._requires_manual_commit = False
+        self._autocommit = autocommit
+        self._requires_manual_commit = _get_requires_manual_commit(
+            self._connection_sqlalchemy, autocommit, self._dialect
+        )
 
         # TODO: we're no longer using this. I believe this is only used via the
         # config.feedback option
@@ -676,24 +997,21 @@ class SQLAlchemyConnection(AbstractConnection):
         parameters = parameters or {}
 
         # we do not support multiple statements
-        if len(sqlparse.split(query)) > 1:
+        if _has_multiple_statements(query):
             raise NotImplementedError("Only one statement is supported.")
 
-        words = query.split()
+        is_select = _is_select(query)
 
-        if words:
-            first_word_statement = words[0].lower()
-        else:
-            first_word_statement = ""
+        if not is_select:
+            self._write_generation += 1
 
-        # NOTE: in duckdb db "from TABLE_NAME" is valid
-        # TODO: we can parse the query to ensure that it's a SELECT statement
-        # for example, it might start with WITH but the final statement might
-        # not be a SELECT
-        is_select = first_word_statement in {"select", "with", "from"}
+        execution_options = self._get_execution_options() if is_select else None
 
-        operation = partial(self._execute_with_parameters, query, parameters)
+        operation = partial(
+            self._execute_with_parameters, query, parameters, execution_options
+        )
         out = self._execute_with_error_handling(operation)
+        self._track_session_state(query, is_select)
 
         if self._requires_manual_commit:
             # calling connection.commit() when using duckdb-engine will yield
@@ -702,30 +1020,169 @@ class SQLAlchemyConnection(AbstractConnection):
             if is_select and self.dialect == "duckdb":
                 return out
 
-            # in sqlalchemy 1.x, connection has no commit attribute
-            if IS_SQLALCHEMY_ONE:
-                # TODO: I moved this from run.py where we were catching all exceptions
-                # because some drivers do not support commits. However, I noticed
-                # that if I remove the try catch we get this error in SQLite:
-                #  "cannot commit - no transaction is active", we need to investigate
-                # further, catching generic exceptions is not a good idea
-                try:
-                    self._connection.execute("commit")
-                except Exception:
-                    pass
-            else:
-                self._connection.commit()
+            # committing closes the server-side cursor before we fetch the rows
+            if execution_options:
+                return out
+
+            self._commit()
 
         return out
 
-    def _execute_with_parameters(self, query, parameters):
-        """Execute the query with the given parameters"""
+    def _track_session_state(self, query, is_select):
+        """
+        Keep track of the temporary objects and the uncommitted changes of this
+        connection (see ``has_session_state``)
+        """
+        if _CREATE_TEMP_OBJECT.search(query):
+            self._has_temp_objects = True
+
+        words = query.split()
+        first_word = words[0].lower() if words else ""
+
+        if first_word in _TRANSACTION_END:
+            self._has_uncommitted_changes = False
+        elif first_word in _TRANSACTION_START or not (self._autocommit or is_select):
+            self._has_uncommitted_changes = True
+
+    @property
+    def has_session_state(self):
+        """
+        Returns True if this connection created temporary objects or has
+        uncommitted changes, connections borrowed from the pool can't see them
+        """
+        return self._has_temp_objects or self._has_uncommitted_changes
+
+    def _commit(self, connection=None):
+        """
+        Commit the transaction of ``connection`` (this connection if None, or a
+        connection borrowed from the pool)
+        """
+        connection = self._connection if connection is None else connection
+
+        # in sqlalchemy 1.x, connection has no commit attribute
         if IS_SQLALCHEMY_ONE:
-            out = self._connection.execute(sqlalchemy.text(query), **parameters)
+            # TODO: I moved this from run.py where we were catching all exceptions
+            # because some drivers do not support commits. However, I noticed
+            # that if I remove the try catch we get this error in SQLite:
+            #  "cannot commit - no transaction is active", we need to investigate
+            # further, catching generic exceptions is not a good idea
+            try:
+                connection.execute("commit")
+            except Exception:
+                pass
         else:
-            out = self._connection.execute(
-                sqlalchemy.text(query), parameters=parameters
-            )
+            connection.commit()
+
+    def executemany(self, query, batches):
+        """Run a statement once per set of parameters. Each batch is committed
+        after it runs (if autocommit is enabled), if a batch fails, it's rolled
+        back and the previous batches are kept
+
+        Parameters
+        ----------
+        query : str
+            A single SQL statement with :name parameters
+
+        batches : iterable
+            Lists of dictionaries that map parameter names to values, each list
+            is passed to the driver's ``executemany`` (the statement is compiled
+            once and reused for all the batches)
+
+        Returns
+        -------
+        int
+            The number of rows affected (-1 if the driver doesn't report it)
+        """
+        query, _ = escape_string_literals_with_colon_prefix(query)
+        statement = sqlalchemy.text(query)
+        self._write_generation += 1
+
+        # some drivers only report the rows affected by the last parameters
+        sane_rowcount = self._connection.dialect.supports_sane_multi_rowcount
+        rowcount = 0
+
+        for batch in batches:
+            try:
+                out = self._execute_with_error_handling(
+                    partial(self._connection.execute, statement, batch)
+                )
+            except Exception:
+                if self._requires_manual_commit:
+                    # a failed rollback shouldn't hide the error in the batch
+                    try:
+                        self._rollback()
+                    except Exception:
+                        pass
+
+                raise
+
+            if self._requires_manual_commit:
+                self._commit()
+
+            rowcount += out.rowcount
+            sane_rowcount = sane_rowcount and out.rowcount >= 0
+
+        return rowcount if sane_rowcount else -1
+
+    def _get_execution_options(self):
+        """
+        Returns the execution options for SELECT statements. If
+        SqlMagic.stream_results is set, results are fetched with a server-side
+        cursor (if the driver supports it), otherwise, some drivers (e.g.,
+        psycopg2) load all rows into memory.
+
+        We set max_row_buffer instead of yield_per: yield_per fetches batches of
+        exactly stream_results rows, while max_row_buffer starts with a one-row
+        buffer, so the preview only fetches the rows requested by ResultSet
+        (up to displaylimit), and the buffer grows up to stream_results rows as
+        the rest of the results are consumed.
+
+        Some drivers (e.g., psycopg2) can only use server-side cursors inside a
+        transaction, so we don't stream results if their connection is in
+        autocommit mode
+        """
+        max_row_buffer = None if self._config is None else self._config.stream_results
+
+        if not max_row_buffer:
+            return None
+
+        if self._is_in_autocommit_mode() and any(
+            name in str(self.dialect)
+            for name in _STREAM_RESULTS_REQUIRE_TRANSACTION_DIALECTS
+        ):
+            if not self._warned_stream_results:
+                display.message_warning(
+                    f"Ignoring stream_results: {self.dialect} can only use "
+                    "server-side cursors inside a transaction, set "
+                    "%config SqlMagic.autocommit = False and connect again to use it"
+                )
+                self._warned_stream_results = True
+
+            return None
+
+        return {"stream_results": True, "max_row_buffer": max_row_buffer}
+
+    def _is_in_autocommit_mode(self):
+        """Returns True if the driver's connection is in autocommit mode"""
+        return bool(getattr(self._get_dbapi_connection(), "autocommit", False))
+
+    def _execute_with_parameters(
+        self, query, parameters, execution_options=None, connection=None
+    ):
+        """
+        Execute the query with the given parameters in ``connection`` (this
+        connection if None, or a connection borrowed from the pool)
+        """
+        connection = self._connection if connection is None else connection
+        statement = sqlalchemy.text(query)
+
+        if execution_options:
+            statement = statement.execution_options(**execution_options)
+
+        if IS_SQLALCHEMY_ONE:
+            out = connection.execute(statement, **parameters)
+        else:
+            out = connection.execute(statement, parameters=parameters)
 
         return out
 
@@ -796,14 +1253,19 @@ class SQLAlchemyConnection(AbstractConnection):
                         )
                 raise
 
-    def _execute_with_error_handling(self, operation):
+    def _execute_with_error_handling(self, operation, connection=None):
         """Execute a database operation and handle errors
 
         Parameters
         ----------
         operation : callable
             A callable that takes no parameters to execute a database operation
+
+        connection : sqlalchemy.engine.Connection, default None
+            The connection that runs the operation, it's rolled back if its
+            transaction is aborted (this connection if None)
         """
+        connection = self._connection if connection is None else connection
         rollback_needed = False
 
         try:
@@ -854,7 +1316,7 @@ class SQLAlchemyConnection(AbstractConnection):
                 raise
 
         if rollback_needed:
-            self._connection.rollback()
+            self._rollback(connection)
             out = operation()
 
         return out
@@ -884,6 +1346,114 @@ class SQLAlchemyConnection(AbstractConnection):
         """Returns the SQLAlchemy connection object"""
         return self._connection_sqlalchemy
 
+    def _get_dbapi_connection(self):
+        pool_connection = self._connection.connection
+        return (
+            pool_connection.connection
+            if IS_SQLALCHEMY_ONE
+            else pool_connection.dbapi_connection
+        )
+
+    def _prepare_interrupt(self):
+        # postgres drivers without a native cancel (e.g., pg8000) are interrupted
+        # with pg_cancel_backend from another connection, which needs the process
+        # id of the server process that runs the queries of this connection
+        if not any(name in str(self.dialect) for name in ("postgres", "redshift")):
+            return
+
+        dbapi_connection = self._get_dbapi_connection()
+
+        if self._get_interrupt_method() is not None or (
+            self._backend_pid is not None and self._backend_pid[0] is dbapi_connection
+        ):
+            return
+
+        pid = self._connection.execute(
+            sqlalchemy.text("SELECT pg_backend_pid()")
+        ).scalar()
+        self._backend_pid = (dbapi_connection, pid)
+
+    def interrupt(self):
+        if super().interrupt():
+            return True
+
+        if self._backend_pid is None:
+            return False
+
+        with self._connection.engine.connect() as connection:
+            connection.execute(
+                sqlalchemy.text("SELECT pg_cancel_backend(:pid)"),
+                {"pid": self._backend_pid[1]},
+            )
+
+        return True
+
+    def _rollback(self, connection=None):
+        """
+        Roll back the transaction of ``connection`` (this connection if None, or a
+        connection borrowed from the pool)
+        """
+        connection = self._connection if connection is None else connection
+
+        # in sqlalchemy 1.x, connection has no rollback attribute
+        if IS_SQLALCHEMY_ONE:
+            connection.execute("rollback")
+        else:
+            connection.rollback()
+
+    @property
+    def is_in_memory(self):
+        """
+        Returns True if it's a connection to an in-memory DuckDB or SQLite
+        database (every connection to it opens a new database)
+        """
+        database = self._connection.engine.url.database
+        return self._dialect in {"duckdb", "sqlite"} and database in {
+            None,
+            "",
+            ":memory:",
+        }
+
+    @contextmanager
+    def checkout(self, pooled=False):
+        """
+        Borrow a connection to run queries. By default, it's this connection. If
+        ``pooled`` is True, borrow a connection from the engine's pool, so many
+        threads can run queries at the same time (e.g., when profiling with
+        ``SqlMagic.profile_concurrency``)
+
+        Notes
+        -----
+        Pooled connections don't see the temporary objects or the uncommitted
+        changes made with this connection, so we return this connection if there
+        are any (see ``has_session_state``), and for in-memory databases. We also
+        return it if autocommit is disabled, since the changes made in a pooled
+        connection can't be committed by the user
+        """
+        if (
+            not pooled
+            or self.is_in_memory
+            or self.has_session_state
+            or not self._autocommit
+        ):
+            with super().checkout() as connection:
+                yield connection
+        else:
+            with self._connection.engine.connect() as connection:
+                yield PooledConnection(self, connection)
+
+    @contextmanager
+    def temporary_table(self, name, query):
+        # the table is dropped when the block ends, so it shouldn't prevent
+        # using pooled connections afterwards (see has_session_state)
+        has_temp_objects = self._has_temp_objects
+
+        try:
+            with super().temporary_table(name, query) as name:
+                yield name
+        finally:
+            self._has_temp_objects = has_temp_objects
+
     def close(self):
         super().close()
 
@@ -908,6 +1478,8 @@ class SQLAlchemyConnection(AbstractConnection):
 
     def to_table(self, table_name, data_frame, if_exists, index):
         """Create a table from a pandas DataFrame"""
+        self._write_generation += 1
+
         operation = partial(
             data_frame.to_sql,
             table_name,
@@ -928,6 +1500,76 @@ class SQLAlchemyConnection(AbstractConnection):
         display.message_success(f"Success! Persisted {table_name} to the database.")
 
 
+class PooledConnection:
+    """A connection borrowed from the pool of a SQLAlchemyConnection's engine
+
+    Parameters
+    ----------
+    parent : SQLAlchemyConnection
+        The connection that owns the engine
+
+    connection : sqlalchemy.engine.Connection
+        The connection checked out from the engine's pool
+    """
+
+    def __init__(self, parent, connection):
+        self._parent = parent
+        self._connection = connection
+        self._requires_manual_commit = _get_requires_manual_commit(
+            connection, parent._autocommit, parent.dialect
+        )
+
+    @property
+    def dialect(self):
+        return self._parent.dialect
+
+    def execute(self, query, with_=None):
+        """Executes a SQL query (with the same pre-processing as the parent)"""
+        return self.raw_execute(self._parent._prepare_query(query, with_))
+
+    def raw_execute(self, query, parameters=None):
+        """Run the query without any preprocessing"""
+        parameters = parameters or {}
+        query, _ = escape_string_literals_with_colon_prefix(query)
+        is_select = _is_select(query)
+
+        if not is_select:
+            self._parent._write_generation += 1
+
+        operation = partial(
+            self._parent._execute_with_parameters,
+            query,
+            parameters,
+            connection=self._connection,
+        )
+        out = self._parent._execute_with_error_handling(
+            operation, connection=self._connection
+        )
+
+        # see SQLAlchemyConnection._connection_execute
+        if self._requires_manual_commit and not (
+            is_select and self.dialect == "duckdb"
+        ):
+            self._parent._commit(self._connection)
+
+        return out
+
+    def interrupt(self):
+        """Interrupt the query running in this connection"""
+        pool_connection = self._connection.connection
+        method = _find_interrupt_method(
+            pool_connection.connection
+            if IS_SQLALCHEMY_ONE
+            else pool_connection.dbapi_connection
+        )
+
+        if method is None:
+            return False
+
+        method()
+        return True
+
+
 class DBAPIConnection(AbstractConnection):
     """A connection object for generic DBAPI connections"""
 
@@ -981,12 +1623,15 @@ class DBAPIConnection(AbstractConnection):
         """
         # we do not support multiple statements (this might actually work in some
         # drivers but we need to add this for consistency with SQLAlchemyConnection)
-        if len(sqlparse.split(query)) > 1:
+        if _has_multiple_statements(query):
             raise NotImplementedError("Only one statement is supported.")
 
         if with_:
             query = self._resolve_cte(query, with_)
 
+        if not _is_select(query):
+            self._write_generation += 1
+
         cur = self._connection.cursor()
         cur.execute(query)
 
@@ -995,6 +1640,84 @@ class DBAPIConnection(AbstractConnection):
 
         return cur
 
+    def executemany(self, query, batches):
+        """Run a statement once per set of parameters. Each batch is committed
+        after it runs (if autocommit is enabled), if a batch fails, it's rolled
+        back and the previous batches are kept
+
+        Parameters
+        ----------
+        query : str
+            A single SQL statement with :name parameters, they're converted to
+            the driver's paramstyle
+
+        batches : iterable
+            Lists of dictionaries that map parameter names to values, each list
+            is passed to the driver's ``executemany``
+
+        Returns
+        -------
+        int
+            The number of rows affected (-1 if the driver doesn't report it)
+        """
+        query, _ = escape_string_literals_with_colon_prefix(query)
+        compiled = sqlalchemy.text(query).compile(
+            dialect=DefaultDialect(paramstyle=self._paramstyle)
+        )
+        names = compiled.positiontup
+        self._write_generation += 1
+
+        cur = self._connection.cursor()
+        rowcount = 0
+        sane_rowcount = True
+
+        for batch in batches:
+            try:
+                parameters = (
+                    batch
+                    if names is None
+                    else [tuple(row[name] for name in names) for row in batch]
+                )
+            except KeyError as e:
+                raise exceptions.InvalidQueryParameters(
+                    f"Cannot execute query because the parameter {e} is missing "
+                    "from the rows"
+                ) from e
+
+            try:
+                cur.executemany(compiled.string, parameters)
+            except Exception:
+                if self._requires_manual_commit:
+                    self._rollback()
+
+                raise
+
+            if self._requires_manual_commit:
+                self._connection.commit()
+
+            # some drivers (e.g., duckdb) don't have cursor.rowcount
+            batch_rowcount = getattr(cur, "rowcount", -1)
+            rowcount += batch_rowcount
+            sane_rowcount = sane_rowcount and batch_rowcount >= 0
+
+        return rowcount if sane_rowcount else -1
+
+    @property
+    def _paramstyle(self):
+        # the DBAPI module defines the paramstyle (e.g., sqlite3.paramstyle)
+        module = sys.modules.get(type(self._connection).__module__.split(".")[0])
+        return getattr(module, "paramstyle", "qmark")
+
+    def _get_dbapi_connection(self):
+        return self._connection
+
+    def _rollback(self):
+        # some drivers raise an error if there is no transaction to roll back
+        try:
+            self._connection.rollback()
+        except Exception:
+            pass
+
     def _get_database_information(self):
         return {
             "dialect": self.dialect,
@@ -1024,6 +1747,98 @@ class DBAPIConnection(AbstractConnection):
         )
 
 
+_POOL_CLASSES = {
+    "QueuePool": sqlalchemy.pool.QueuePool,
+    "NullPool": sqlalchemy.pool.NullPool,
+}
+
+
+# options that only apply to pools that keep connections open
+_QUEUE_POOL_OPTIONS = ("pool_size", "max_overflow")
+
+
+def get_pool_kwargs(config, pool_options=None, connect_str=None):
+    """
+    Returns the arguments to pass to ``sqlalchemy.create_engine`` to configure
+    the connection pool. Options that aren't set (None) keep SQLAlchemy's default
+    for the dialect
+
+    Parameters
+    ----------
+    config : object
+        An object with the SqlMagic options (it might not have the pool options)
+
+    pool_options : dict, optional
+        Options that take precedence over the ones in ``config`` (e.g., from a
+        section in the connections file)
+
+    connect_str : str, optional
+        The connection string, used to find the dialect's default pool class if
+        ``pool_class`` isn't set
+
+    Raises
+    ------
+    UsageError
+        If ``pool_size`` or ``max_overflow`` are set but the pool class isn't a
+        ``QueuePool`` (e.g., ``NullPool`` doesn't keep connections open)
+    """
+    options = {key: getattr(config, key, None) for key in POOL_OPTIONS}
+    options.update(pool_options or {})
+
+    kwargs = {}
+    pool_class = options["pool_class"]
+
+    if pool_class:
+        if pool_class not in _POOL_CLASSES:
+            raise exceptions.ValueError(
+                f"Invalid pool_class: {pool_class!r}. "
+                f"Valid values are: {', '.join(_POOL_CLASSES)}"
+            )
+
+        kwargs["poolclass"] = _POOL_CLASSES[pool_class]
+
+    queue_pool_options = [
+        key for key in _QUEUE_POOL_OPTIONS if options[key] is not None
+    ]
+
+    if queue_pool_options:
+        poolclass = kwargs.get("poolclass") or _get_default_pool_class(connect_str)
+
+        if poolclass is not None and not issubclass(
+            poolclass, sqlalchemy.pool.QueuePool
+        ):
+            raise exceptions.ValueError(
+                f"{' and '.join(queue_pool_options)} can only be used with "
+                f"pool_class='QueuePool', but the pool class is {poolclass.__name__!r}"
+                ". Set pool_class='QueuePool' or unset "
+                f"{' and '.join(queue_pool_options)}"
+            )
+
+    for key in [*_QUEUE_POOL_OPTIONS, "pool_recycle"]:
+        if options[key] is not None:
+            kwargs[key] = options[key]
+
+    if options["pool_pre_ping"]:
+        kwargs["pool_pre_ping"] = True
+
+    return kwargs
+
+
+def _get_default_pool_class(connect_str):
+    """
+    Returns the pool class that SQLAlchemy uses by default for the connection
+    string (None if it can't be determined, e.g., if the driver isn't installed)
+    """
+    if connect_str is None:
+        return None
+
+    try:
+        url = sqlalchemy.engine.make_url(connect_str)
+        return url.get_dialect().get_pool_class(url)
+    except Exception:
+        return None
+
+
 def _check_if_duckdb_dbapi_connection(conn):
     """Check if the connection is a native duckdb connection"""
     # NOTE: duckdb defines df and pl to efficiently convert results to
@@ -1126,6 +1941,25 @@ def default_alias_for_engine(engine):
     return f"{engine.url.username}@{engine.url.database}"
 
 
+def _get_requires_manual_commit(connection, autocommit, dialect):
+    """
+    Returns True if we need to commit after each statement that runs in a
+    SQLAlchemy connection: autocommit is enabled but the isolation level cannot
+    be set to AUTOCOMMIT (and the dialect supports commits)
+    """
+    if not autocommit:
+        return False
+
+    success = set_sqlalchemy_isolation_level(connection)
+
+    # TODO: I noticed we don't have any unit tests for this
+    # even if autocommit is true, we should not use it for some dialects
+    return not success and all(
+        blacklisted_dialect not in str(dialect)
+        for blacklisted_dialect in _COMMIT_BLACKLIST_DIALECTS
+    )
+
+
 def set_sqlalchemy_isolation_level(conn):
     """
     Sets the autocommit setting for a database connection using SQLAlchemy.
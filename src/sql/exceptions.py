@@ -52,3 +52,6 @@ ConfigurationError = exception_factory("ConfigurationError")
 
 
 InvalidQueryParameters = exception_factory("InvalidQueryParameters")
+
+# raised when a query is cancelled for exceeding the statement timeout
+QueryTimeoutError = exception_factory("QueryTimeoutError")
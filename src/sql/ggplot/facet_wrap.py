@@ -1,6 +1,7 @@
 from jinja2 import Template
 import math
 import sql.connection
+from sql import plot_cache
 from sql.telemetry import telemetry
 
 
@@ -20,7 +21,7 @@ class facet:
 
         conn = sql.connection.ConnectionManager.current
 
-        values = conn.execute(query, with_).fetchall()
+        values = plot_cache.fetchall(conn, query, with_)
         # Added to make histogram more inclusive to NULLs
         # Filter out NULL values
         # If value[0] is NULL we skip it
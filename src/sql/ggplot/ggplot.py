@@ -66,9 +66,16 @@ class ggplot:
                 self.table, other.facet, with_=self.with_
             )
 
+            # shared by all panels so the geom computes them in a single query
+            results = {}
+
             for i, value in enumerate(values):
                 ax_ = self.figure.add_subplot(n_rows, n_cols, i + 1)
-                facet_key_val = {"key": other.facet, "value": value[0]}
+                facet_key_val = {
+                    "key": other.facet,
+                    "value": value[0],
+                    "results": results,
+                }
                 self.geom.draw(self, ax_, facet_key_val)
                 handles, labels = ax_.get_legend_handles_labels()
                 ax_.set_title(value[0])
@@ -5,7 +5,7 @@ from sql.connection import ConnectionManager
 from sql.telemetry import telemetry
 from sql import exceptions
 import math
-from sql import util
+from sql import util, profiling, profile_cache
 from IPython.core.display import HTML
 import uuid
 
@@ -227,157 +227,94 @@ class TableDescription(DatabaseInspection):
     Numerical columns - [Count, Unique, Mean, Max, Min,
                          STD, 25h, 50h and 75h percentiles]
 
+    ------------------------------------------
+    Statistics computed on a sample (``sample``) or with approximate algorithms
+    (``approx=True``) are marked with an asterisk
+
+    ------------------------------------------
+    Reports are cached in ``SqlMagic.profile_cache_filename`` and reused while the
+    table doesn't change, pass ``refresh=True`` to compute them again
+
     """
 
-    def __init__(self, table_name, schema=None) -> None:
+    def __init__(
+        self, table_name, schema=None, sample=None, approx=False, refresh=False
+    ) -> None:
         util.is_table_exists(table_name, schema)
+        sample = profiling.parse_sample(sample)
+
+        conn = ConnectionManager.current
+        cache = profile_cache.get_cache(conn)
+
+        if cache is not None:
+            key = profile_cache.get_cache_key(conn, table_name, schema, sample, approx)
+            fingerprint = profile_cache.get_fingerprint(conn, table_name, schema)
+
+            if fingerprint is None:
+                cache = None
+
+        cached = None if cache is None or refresh else cache.get(key, fingerprint)
+
+        if cached is not None:
+            self._load(cached)
+            return
 
         if schema:
             table_name = f"{schema}.{table_name}"
 
-        conn = ConnectionManager.current
+        self._profile(conn, table_name, sample, approx)
 
-        columns_query_result = conn.raw_execute(f"SELECT * FROM {table_name} WHERE 1=0")
-        if ConnectionManager.current.is_dbapi_connection:
-            columns = [i[0] for i in columns_query_result.description]
-        else:
-            columns = columns_query_result.keys()
+        if cache is not None:
+            cache.set(key, fingerprint, self._dump())
+
+    def _load(self, report):
+        self._table = PrettyTable()
+        self._table.field_names = report["field_names"]
+
+        for row in report["rows"]:
+            self._table.add_row(row)
+
+        self._table_html = report["html"]
+        self._table_txt = report["txt"]
 
-        table_stats = dict({})
-        columns_to_include_in_report = set()
+    def _dump(self):
+        return {
+            "field_names": self._table.field_names,
+            "rows": self._table.rows,
+            "html": self._table_html,
+            "txt": self._table_txt,
+        }
+
+    def _profile(self, conn, table_name, sample, approx):
+        columns, first_row = profiling.get_columns_and_first_row(conn, table_name)
+
+        numeric_columns = []
         columns_with_styles = []
         message_check = False
 
-        for i, column in enumerate(columns):
-            table_stats[column] = dict()
-
+        for i, (column, value) in enumerate(zip(columns, first_row)):
             # check the datatype of a column
-            try:
-                result = ConnectionManager.current.raw_execute(
-                    f"""SELECT {column} FROM {table_name} LIMIT 1"""
-                ).fetchone()
-
-                value = result[0]
-                is_numeric = isinstance(value, (int, float)) or (
-                    isinstance(value, str) and _is_numeric(value)
-                )
-            except ValueError:
-                is_numeric = True
+            is_numeric = isinstance(value, (int, float)) or (
+                isinstance(value, str) and _is_numeric(value)
+            )
+
+            if is_numeric:
+                numeric_columns.append(column)
 
             if _is_numeric_as_str(column, value):
                 columns_with_styles.append(i + 1)
                 message_check = True
-            # Note: index is reserved word in sqlite
-            try:
-                result_col_freq_values = ConnectionManager.current.raw_execute(
-                    f"""SELECT DISTINCT {column} as top,
-                    COUNT({column}) as frequency FROM {table_name}
-                    GROUP BY top ORDER BY frequency Desc""",
-                ).fetchall()
-
-                table_stats[column]["freq"] = result_col_freq_values[0][1]
-                table_stats[column]["top"] = result_col_freq_values[0][0]
-
-                columns_to_include_in_report.update(["freq", "top"])
-
-            except Exception:
-                pass
-
-            try:
-                # get all non None values, min, max and avg.
-                result_value_values = ConnectionManager.current.raw_execute(
-                    f"""
-                    SELECT MIN({column}) AS min,
-                    MAX({column}) AS max,
-                    COUNT({column}) AS count
-                    FROM {table_name}
-                    WHERE {column} IS NOT NULL
-                    """,
-                ).fetchall()
-
-                columns_to_include_in_report.update(["count", "min", "max"])
-                table_stats[column]["count"] = result_value_values[0][2]
-
-                table_stats[column]["min"] = round(result_value_values[0][0], 4)
-                table_stats[column]["max"] = round(result_value_values[0][1], 4)
-
-                columns_to_include_in_report.update(["count", "min", "max"])
-
-            except Exception:
-                pass
-
-            try:
-                # get unique values
-                result_value_values = ConnectionManager.current.raw_execute(
-                    f"""
-                    SELECT
-                    COUNT(DISTINCT {column}) AS unique_count
-                    FROM {table_name}
-                    WHERE {column} IS NOT NULL
-                    """,
-                ).fetchall()
-                table_stats[column]["unique"] = result_value_values[0][0]
-                columns_to_include_in_report.update(["unique"])
-            except Exception:
-                pass
-
-            try:
-                results_avg = ConnectionManager.current.raw_execute(
-                    f"""
-                                SELECT AVG({column}) AS avg
-                                FROM {table_name}
-                                WHERE {column} IS NOT NULL
-                                """,
-                ).fetchall()
-
-                columns_to_include_in_report.update(["mean"])
-                table_stats[column]["mean"] = format(float(results_avg[0][0]), ".4f")
-
-            except Exception:
-                table_stats[column]["mean"] = math.nan
-
-            # These keys are numeric and work only on duckdb
-            special_numeric_keys = ["std", "25%", "50%", "75%"]
-
-            try:
-                # Note: stddev_pop and PERCENTILE_DISC will work only on DuckDB
-                result = ConnectionManager.current.raw_execute(
-                    f"""
-                    SELECT
-                        stddev_pop({column}) as key_std,
-                        percentile_disc(0.25) WITHIN GROUP
-                        (ORDER BY {column}) as key_25,
-                        percentile_disc(0.50) WITHIN GROUP
-                        (ORDER BY {column}) as key_50,
-                        percentile_disc(0.75) WITHIN GROUP
-                        (ORDER BY {column}) as key_75
-                    FROM {table_name}
-                    """,
-                ).fetchall()
-
-                columns_to_include_in_report.update(special_numeric_keys)
-                for i, key in enumerate(special_numeric_keys):
-                    # r_key = f'key_{key.replace("%", "")}'
-                    table_stats[column][key] = format(float(result[0][i]), ".4f")
-
-            except TypeError:
-                # for non numeric values
-                for key in special_numeric_keys:
-                    table_stats[column][key] = math.nan
-
-            except Exception as e:
-                # We tried to apply numeric function on
-                # non numeric value, i.e: DateTime
-                if "duckdb.BinderException" or "add explicit type casts" in str(e):
-                    for key in special_numeric_keys:
-                        table_stats[column][key] = math.nan
-
-                # Failed to run sql command/func (e.g stddev_pop).
-                # We ignore the cell stats for such case.
-                pass
 
+        table_stats, columns_to_include_in_report = profiling.compute_statistics(
+            conn, table_name, columns, numeric_columns, sample=sample, approx=approx
+        )
+        estimates = profiling.describe_estimates(
+            conn, columns_to_include_in_report, sample=sample, approx=approx
+        )
+
+        for column in columns:
             table_stats[column] = _assign_column_specific_stats(
-                table_stats[column], is_numeric
+                table_stats[column], column in numeric_columns
             )
 
         self._table = PrettyTable()
@@ -399,7 +336,7 @@ class TableDescription(DatabaseInspection):
 
         for row in custom_order:
             if row.lower() in [r.lower() for r in columns_to_include_in_report]:
-                values = [row]
+                values = [f"{row}*" if row in estimates else row]
                 for column in table_stats:
                     if row in table_stats[column]:
                         value = table_stats[column][row]
@@ -422,11 +359,9 @@ class TableDescription(DatabaseInspection):
             warning_background = "white"
             warning_title = ""
 
-        current = ConnectionManager.current
-        database = current.dialect
-        db_driver = current._get_database_information()["driver"]
+        db_driver = conn.capabilities.driver
 
-        if database and "duckdb" in database:
+        if "std" in columns_to_include_in_report:
             db_message = ""
         else:
             db_message = f"""Following statistics are not available in
@@ -439,6 +374,20 @@ class TableDescription(DatabaseInspection):
             "</div>"
         )
 
+        if estimates:
+            estimates_content = "<br>".join(
+                f"<code>{stat}</code>: {description}"
+                for stat, description in sorted(estimates.items())
+            )
+            estimates_html = (
+                "<div style='position: sticky; left: 0; padding: 10px; "
+                "font-size: 12px; color: black;'>"
+                f"<strong>* Estimated statistics:</strong><br>{estimates_content}"
+                "</div>"
+            )
+        else:
+            estimates_html = ""
+
         message_html = (
             f"<div style='position: sticky; left: 0; padding: 10px; "
             f"font-size: 12px; color: black; background-color: {warning_background};'>"
@@ -469,6 +418,7 @@ class TableDescription(DatabaseInspection):
                 attributes={"id": f"profile-table-{unique_id}"}
             )
             + message_html
+            + estimates_html
         ).__html__()
 
         self._table_txt = self._table.get_string()
@@ -487,14 +437,23 @@ def get_columns(name, schema=None):
 
 
 @telemetry.log_call()
-def get_table_statistics(name, schema=None):
+def get_table_statistics(name, schema=None, sample=None, approx=False, refresh=False):
     """Get table statistics for a given connection.
 
     For all data types the results will include `count`, `mean`, `std`, `min`
     `max`, `25`, `50` and `75` percentiles. It will also include `unique`, `top`
     and `freq` statistics.
+
+    Pass `sample` (a number of rows, e.g., 1000, or a percentage, e.g., "10%")
+    to compute the statistics on a random sample of the table, and `approx=True`
+    to use approximate algorithms for `unique` and the percentiles.
+
+    Reports are cached while the table doesn't change, pass `refresh=True` to
+    compute the statistics again.
     """
-    return TableDescription(name, schema=schema)
+    return TableDescription(
+        name, schema=schema, sample=sample, approx=approx, refresh=refresh
+    )
 
 
 def get_schema_names(conn=None):
@@ -1,5 +1,6 @@
 import json
 import re
+from contextlib import contextmanager
 from pathlib import Path
 
 try:
@@ -23,16 +24,17 @@ from sqlalchemy.exc import (
     StatementError,
 )
 from traitlets.config.configurable import Configurable
-from traitlets import Bool, Int, TraitError, Unicode, Dict, observe, validate
+from traitlets import Bool, Float, Int, TraitError, Unicode, Dict, observe, validate
 
 import warnings
 import shlex
 from difflib import get_close_matches
 import sql.connection
 import sql.parse
-from sql.run.run import run_statements
+from sql.run.run import run_executemany, run_statements, run_statements_in_checkout
+from sql.run.handle import QueryHandle
 from sql.parse import _option_strings_from_parser
-from sql import display, exceptions
+from sql import display, exceptions, plot_cache
 from sql.store import store
 from sql.command import SQLCommand
 from sql.magic_plot import SqlPlotMagic
@@ -106,6 +108,14 @@ class SqlMagic(Magics, Configurable):
         allow_none=True,
         help="Automatically limit the size of the returned result sets",
     )
+    autolimit_pushdown = Bool(
+        default_value=False,
+        config=True,
+        help=(
+            "Add a LIMIT clause to SELECT statements when autolimit is set so the "
+            "database only computes the rows that will be fetched"
+        ),
+    )
     style = Unicode(
         default_value="DEFAULT",
         config=True,
@@ -152,6 +162,108 @@ class SqlMagic(Magics, Configurable):
         config=True,
         help="Return data into local variables from column names",
     )
+    stream_results = Int(
+        default_value=0,
+        config=True,
+        help=(
+            "Fetch results of SQLAlchemy connections using server-side cursors, "
+            "in batches of up to this many rows (0 to disable)"
+        ),
+    )
+    statement_timeout = Float(
+        default_value=0,
+        config=True,
+        help="Cancel queries that run for more than this many seconds (0 to disable)",
+    )
+    executemany_batch_size = Int(
+        default_value=1000,
+        config=True,
+        help="Number of rows that %%sql --executemany sends to the driver at once",
+    )
+    statement_concurrency = Int(
+        default_value=1,
+        config=True,
+        help=(
+            "Maximum number of independent statements of a cell that run at the "
+            "same time (each one in a separate connection from the engine's pool)"
+        ),
+    )
+    profile_concurrency = Int(
+        default_value=1,
+        config=True,
+        help=(
+            "Maximum number of queries that %sqlcmd profile runs at the same time "
+            "(each one in a separate connection from the engine's pool)"
+        ),
+    )
+    plot_cache = Bool(
+        default_value=False,
+        config=True,
+        help=(
+            "Cache the data that %sqlplot and ggplot fetch, so changing only the "
+            "style of a plot doesn't run the queries again. Writes made outside "
+            "this session to a server database aren't detected (False clears "
+            "the cache)"
+        ),
+    )
+    profile_cache_filename = Unicode(
+        default_value="",
+        config=True,
+        help=(
+            "Path to the SQLite database where %sqlcmd profile caches the "
+            "statistics of tables (e.g., ~/.jupysql/profile_cache.db), an empty "
+            "string disables the cache"
+        ),
+    )
+    pool_class = Unicode(
+        default_value="",
+        config=True,
+        help=(
+            "Connection pool of new SQLAlchemy connections: 'QueuePool', "
+            "'NullPool' or an empty string to use the default for the dialect"
+        ),
+    )
+    pool_size = Int(
+        default_value=None,
+        allow_none=True,
+        config=True,
+        help=(
+            "Number of connections kept open by the pool of new SQLAlchemy "
+            "connections (None to use the SQLAlchemy default)"
+        ),
+    )
+    max_overflow = Int(
+        default_value=None,
+        allow_none=True,
+        config=True,
+        help=(
+            "Number of connections the pool of new SQLAlchemy connections opens "
+            "when all pool_size connections are in use (-1 for no limit, None "
+            "to use the SQLAlchemy default)"
+        ),
+    )
+    pool_recycle = Int(
+        default_value=None,
+        allow_none=True,
+        config=True,
+        help=(
+            "Replace pooled connections after this many seconds (None to never "
+            "replace them)"
+        ),
+    )
+    pool_pre_ping = Bool(
+        default_value=False,
+        config=True,
+        help="Test pooled connections before using them and replace stale ones",
+    )
+    result_storage = Unicode(
+        default_value="rows",
+        config=True,
+        help=(
+            "How result sets store fetched rows: 'rows' (a list of rows) or "
+            "'arrow' (columnar pyarrow record batches, requires pyarrow)"
+        ),
+    )
 
     feedback = Int(
         default_value=1,
@@ -214,6 +326,96 @@ class SqlMagic(Magics, Configurable):
         except ValueError:
             raise TraitError("{}: displaylimit is not an integer".format(value))
 
+    @validate("stream_results")
+    def _valid_stream_results(self, proposal):
+        value = proposal["value"]
+
+        if value < 0:
+            raise TraitError(f"{value}: stream_results cannot be a negative integer")
+
+        return value
+
+    @validate("statement_timeout")
+    def _valid_statement_timeout(self, proposal):
+        value = proposal["value"]
+
+        if value < 0:
+            raise TraitError(f"{value}: statement_timeout cannot be negative")
+
+        return value
+
+    @validate("executemany_batch_size")
+    def _valid_executemany_batch_size(self, proposal):
+        value = proposal["value"]
+
+        if value < 1:
+            raise TraitError(
+                f"{value}: executemany_batch_size must be a positive integer"
+            )
+
+        return value
+
+    @validate("statement_concurrency")
+    def _valid_statement_concurrency(self, proposal):
+        value = proposal["value"]
+
+        if value < 1:
+            raise TraitError(
+                f"{value}: statement_concurrency must be a positive integer"
+            )
+
+        return value
+
+    @validate("profile_concurrency")
+    def _valid_profile_concurrency(self, proposal):
+        value = proposal["value"]
+
+        if value < 1:
+            raise TraitError(f"{value}: profile_concurrency must be a positive integer")
+
+        return value
+
+    @validate("pool_class")
+    def _valid_pool_class(self, proposal):
+        value = proposal["value"]
+
+        if value not in {"", "QueuePool", "NullPool"}:
+            raise TraitError(
+                f"{value!r} is not a valid pool_class, "
+                "valid values are: 'QueuePool' and 'NullPool'"
+            )
+
+        return value
+
+    @validate("pool_size")
+    def _valid_pool_size(self, proposal):
+        value = proposal["value"]
+
+        if value is not None and value < 0:
+            raise TraitError(f"{value}: pool_size cannot be a negative integer")
+
+        return value
+
+    @validate("result_storage")
+    def _valid_result_storage(self, proposal):
+        value = proposal["value"]
+
+        if value not in {"rows", "arrow"}:
+            raise TraitError(
+                f"{value!r} is not a valid result_storage, "
+                "valid values are: 'rows' and 'arrow'"
+            )
+
+        if value == "arrow":
+            check_installed(["pyarrow"], "result_storage='arrow'")
+
+        return value
+
+    @observe("plot_cache")
+    def _clear_plot_cache(self, change):
+        if not change["new"]:
+            plot_cache.clear()
+
     @observe("autopandas", "autopolars")
     def _mutex_autopandas_autopolars(self, change):
         # When enabling autopandas or autopolars, automatically disable the
@@ -358,6 +560,30 @@ class SqlMagic(Magics, Configurable):
         action="append",
         help="Interactive mode",
     )
+    @argument(
+        "--chunksize",
+        type=int,
+        help="Return a generator of data frames with at most CHUNKSIZE rows each",
+    )
+    @argument(
+        "--async",
+        action="store_true",
+        dest="async_",
+        help="Run the query in the background and return a handle",
+    )
+    @argument(
+        "--timeout",
+        type=float,
+        help="Cancel the query if it runs for more than TIMEOUT seconds",
+    )
+    @argument(
+        "--executemany",
+        type=str,
+        help=(
+            "Run the statement once per row of EXECUTEMANY (a data frame or a "
+            "list of dictionaries) with the row values as :name parameters"
+        ),
+    )
     def execute(self, line="", cell="", local_ns=None):
         """
         Runs SQL statement against a database, specified by
@@ -478,8 +704,11 @@ class SqlMagic(Magics, Configurable):
 
         connect_arg = command.connection
 
+        pool_options = None
+
         if args.section:
             connect_arg = sql.parse.connection_str_from_dsn_section(args.section, self)
+            pool_options = sql.parse.pool_options_from_dsn_section(args.section, self)
 
         if args.connection_arguments:
             try:
@@ -508,6 +737,7 @@ class SqlMagic(Magics, Configurable):
             creator=args.creator,
             alias=args.section if args.section else args.alias,
             config=self,
+            pool_options=pool_options,
         )
         payload["connection_info"] = conn._get_database_information()
 
@@ -563,45 +793,129 @@ class SqlMagic(Magics, Configurable):
             display.message("Skipping execution...")
             return
 
-        try:
-            result = run_statements(
-                conn,
-                command.sql,
-                self,
-                parameters=user_ns if self.named_parameters else None,
+        if args.chunksize is not None:
+            if args.chunksize < 1:
+                raise exceptions.UsageError(
+                    f"--chunksize must be a positive integer, got: {args.chunksize}"
+                )
+
+            if self.column_local_vars:
+                raise exceptions.UsageError(
+                    "Cannot use --chunksize with column_local_vars"
+                )
+
+        if args.timeout is not None and args.timeout < 0:
+            raise exceptions.UsageError(
+                f"--timeout cannot be negative, got: {args.timeout}"
             )
 
-            if (
-                result is not None
-                and not isinstance(result, str)
-                and self.column_local_vars
-            ):
-                # Instead of returning values, set variables directly in the
-                # users namespace. Variable names given by column names
+        timeout = self.statement_timeout if args.timeout is None else args.timeout
 
-                if self.autopandas or self.autopolars:
-                    keys = result.keys()
-                else:
-                    keys = result.keys
-                    result = result.dict()
+        if args.executemany:
+            return self._execute_many(conn, command, user_ns, args, timeout)
 
-                if self.feedback:
-                    display.message(
-                        "Returning data to local variables [{}]".format(", ".join(keys))
-                    )
+        if args.async_:
+            return self._execute_async(conn, command, user_ns, args.chunksize, timeout)
 
-                self.shell.user_ns.update(result)
+        result = self._run_statements(conn, command, user_ns, args.chunksize, timeout)
 
-                return None
+        if (
+            result is not None
+            and not isinstance(result, str)
+            and self.column_local_vars
+        ):
+            # Instead of returning values, set variables directly in the
+            # users namespace. Variable names given by column names
+
+            if self.autopandas or self.autopolars:
+                keys = result.keys()
             else:
-                if command.result_var:
-                    self.shell.user_ns.update({command.result_var: result})
-                    if command.return_result_var:
-                        return result
-                    return None
+                keys = result.keys
+                result = result.dict()
+
+            if self.feedback:
+                display.message(
+                    "Returning data to local variables [{}]".format(", ".join(keys))
+                )
+
+            self.shell.user_ns.update(result)
+
+            return None
+        else:
+            if command.result_var:
+                self.shell.user_ns.update({command.result_var: result})
+                if command.return_result_var:
+                    return result
+                return None
+
+            # Return results into the default ipython _ variable
+            return result
+
+    def _execute_async(self, conn, command, user_ns, chunksize, timeout=None):
+        """Run the query in a background thread and return a QueryHandle"""
+        if self.column_local_vars or chunksize is not None:
+            raise exceptions.UsageError(
+                "Cannot use --async with --chunksize or column_local_vars"
+            )
+
+        # sqlite connections can only be used in the thread that created them
+        if conn.dialect == "sqlite":
+            raise exceptions.UsageError("--async is not supported for SQLite")
+
+        def run(on_checkout, on_rows):
+            with self._handle_query_errors(command.sql):
+                result = run_statements_in_checkout(
+                    conn,
+                    command.sql,
+                    self,
+                    parameters=user_ns if self.named_parameters else None,
+                    timeout=timeout,
+                    on_checkout=on_checkout,
+                    on_rows=on_rows,
+                )
 
-                # Return results into the default ipython _ variable
-                return result
+            if command.result_var:
+                self.shell.user_ns.update({command.result_var: result})
+
+            return result
+
+        return QueryHandle(conn, command.sql, run)
+
+    def _execute_many(self, conn, command, user_ns, args, timeout):
+        """Run the statement once per row of the --executemany variable"""
+        if args.async_ or args.chunksize is not None:
+            raise exceptions.UsageError(
+                "Cannot use --executemany with --async or --chunksize"
+            )
+
+        name = args.executemany
+
+        if name not in user_ns:
+            raise exceptions.UsageError(
+                f"Expected {name!r} to be a data frame or a list of dictionaries "
+                "but it's undefined"
+            )
+
+        with self._handle_query_errors(command.sql):
+            run_executemany(conn, command.sql, user_ns[name], self, timeout=timeout)
+
+    def _run_statements(self, conn, command, user_ns, chunksize, timeout=None):
+        """Run the SQL code in the connection and return the result"""
+        with self._handle_query_errors(command.sql):
+            return run_statements(
+                conn,
+                command.sql,
+                self,
+                parameters=user_ns if self.named_parameters else None,
+                chunksize=chunksize,
+                timeout=timeout,
+            )
+
+    @contextmanager
+    def _handle_query_errors(self, query):
+        """Display the errors raised when running the query"""
+        try:
+            yield
 
         # JA: added DatabaseError for MySQL
         except (
@@ -612,11 +926,11 @@ class SqlMagic(Magics, Configurable):
             StatementError,
         ) as e:
             # Sqlite apparently return all errors as OperationalError :/
-            self._error_handling(e, command.sql)
+            self._error_handling(e, query)
         except Exception as e:
             # handle DuckDB exceptions
             if "Catalog Error" in str(e):
-                self._error_handling(e, command.sql)
+                self._error_handling(e, query)
             else:
                 raise e
 
@@ -12,6 +12,46 @@ from IPython.core.magic_arguments import parse_argstring
 from sql import exceptions
 
 
+def _parse_boolean(value):
+    try:
+        return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+    except KeyError:
+        raise ValueError(f"Not a boolean: {value}")
+
+
+# keys in a connections file section that configure the connection pool (they
+# have the same name as the SqlMagic options), mapped to their parser
+POOL_OPTIONS = {
+    "pool_class": str,
+    "pool_size": int,
+    "max_overflow": int,
+    "pool_recycle": int,
+    "pool_pre_ping": _parse_boolean,
+}
+
+
+def split_pool_options(section):
+    """
+    Split the items of a connections file section into the URL arguments and the
+    pool options (converted to their type)
+    """
+    url_args, pool_options = {}, {}
+
+    for key, value in dict(section).items():
+        if key not in POOL_OPTIONS:
+            url_args[key] = value
+            continue
+
+        try:
+            pool_options[key] = POOL_OPTIONS[key](value.strip())
+        except ValueError as e:
+            raise exceptions.ValueError(
+                f"Invalid value for {key!r} in the connections file: {value!r}"
+            ) from e
+
+    return url_args, pool_options
+
+
 class ConnectionsFile:
     def __init__(self, path_to_file) -> None:
         self.parser = configparser.ConfigParser()
@@ -26,9 +66,20 @@ class ConnectionsFile:
         except configparser.NoSectionError:
             return None
 
-        url = URL.create(**dict(section))
+        url_args, _ = split_pool_options(section)
+        url = URL.create(**url_args)
         return str(url.render_as_string(hide_password=False))
 
+    def get_default_pool_options(self):
+        """Returns the pool options in the default section"""
+        try:
+            section = self.parser.items("default")
+        except configparser.NoSectionError:
+            return {}
+
+        _, pool_options = split_pool_options(section)
+        return pool_options
+
 
 def connection_str_from_dsn_section(section, config):
     """Return a SQLAlchemy connection string from a section in a DSN file
@@ -41,6 +92,41 @@ def connection_str_from_dsn_section(section, config):
     config : Config
         The config object, must have a dsn_filename attribute
     """
+    cfg_dict, _ = split_pool_options(_read_dsn_section(section, config))
+
+    try:
+        url = URL.create(**cfg_dict)
+    except TypeError as e:
+        if "unexpected keyword argument" in str(e):
+            pool_keys = ", ".join(POOL_OPTIONS)
+            raise exceptions.TypeError(
+                f"%config SqlMagic.dsn_filename ({config.dsn_filename!r}) is invalid. "
+                "It must only contain the following keys: drivername, username, "
+                f"password, host, port, database, query, {pool_keys}"
+            ) from e
+        else:
+            raise
+
+    return str(url.render_as_string(hide_password=False))
+
+
+def pool_options_from_dsn_section(section, config):
+    """Return the connection pool options from a section in a DSN file
+
+    Parameters
+    ----------
+    section : str
+        The section name in the DSN file
+
+    config : Config
+        The config object, must have a dsn_filename attribute
+    """
+    _, pool_options = split_pool_options(_read_dsn_section(section, config))
+    return pool_options
+
+
+def _read_dsn_section(section, config):
+    """Return the items in a section of the DSN file"""
     parser = configparser.ConfigParser()
     dsn_file = Path(config.dsn_filename)
 
@@ -70,21 +156,7 @@ def connection_str_from_dsn_section(section, config):
             f"connections file {config.dsn_filename!r}"
         ) from e
 
-    cfg_dict = dict(cfg)
-
-    try:
-        url = URL.create(**cfg_dict)
-    except TypeError as e:
-        if "unexpected keyword argument" in str(e):
-            raise exceptions.TypeError(
-                f"%config SqlMagic.dsn_filename ({config.dsn_filename!r}) is invalid. "
-                "It must only contain the following keys: drivername, username, "
-                "password, host, port, database, query"
-            ) from e
-        else:
-            raise
-
-    return str(url.render_as_string(hide_password=False))
+    return cfg
 
 
 def _connection_string(arg, path_to_file):
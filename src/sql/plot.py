@@ -5,8 +5,8 @@ from ploomber_core.dependencies import requires
 from ploomber_core.exceptions import modify_exceptions
 from jinja2 import Template
 
-from sql import exceptions, display
-from sql.stats import _summary_stats
+from sql import exceptions, display, _current, plot_cache
+from sql.stats import _summary_stats_many
 from sql.util import (
     _are_numeric_values,
     validate_mutually_exclusive_args,
@@ -28,49 +28,9 @@ except ModuleNotFoundError:
 
 import sql.connection
 from sql.telemetry import telemetry
+import sys
 import warnings
-
-
-def _whishi(conn, table, column, hival, with_=None):
-    if not conn:
-        conn = sql.connection.ConnectionManager.current
-    template = Template(
-        """
-SELECT COUNT(*), MAX("{{column}}")
-FROM (
-    SELECT "{{column}}"
-    FROM "{{table}}"
-    WHERE "{{column}}" <= {{hival}}
-) AS _whishi
-"""
-    )
-
-    query = template.render(table=table, column=column, hival=hival)
-
-    values = conn.execute(query, with_).fetchone()
-    keys = ["N", "wiskhi_max"]
-    return {k: float(v) for k, v in zip(keys, values)}
-
-
-def _whislo(conn, table, column, loval, with_=None):
-    if not conn:
-        conn = sql.connection.ConnectionManager.current
-    template = Template(
-        """
-SELECT COUNT(*), MIN("{{column}}")
-FROM (
-    SELECT "{{column}}"
-    FROM "{{table}}"
-    WHERE "{{column}}" >= {{loval}}
-) AS _whislo
-"""
-    )
-
-    query = template.render(table=table, column=column, loval=loval)
-
-    values = conn.execute(query, with_).fetchone()
-    keys = ["N", "wisklo_min"]
-    return {k: float(v) for k, v in zip(keys, values)}
+from collections import defaultdict
 
 
 def _percentile(conn, table, column, pct, with_=None):
@@ -85,29 +45,108 @@ FROM "{{table}}"
     )
     query = template.render(table=table, column=column, pct=pct)
 
-    values = conn.execute(query, with_).fetchone()[0]
+    values = plot_cache.fetchone(conn, query, with_)[0]
     return values
 
 
-def _between(conn, table, column, whislo, whishi, with_=None):
+# maximum number of outliers per column fetched to draw a boxplot
+MAX_FLIERS = 1000
+
+
+def _whiskers_and_fliers(conn, table, bounds, max_fliers=MAX_FLIERS, with_=None):
+    """
+    Compute the whisker extremes and the outliers of many columns in a single
+    query. The whiskers of all columns are computed in one aggregation (one row
+    per column is obtained by cross joining it with the column indexes), and
+    only the ``max_fliers`` outliers farthest from the median are fetched for
+    each column
+
+    Parameters
+    ----------
+    bounds : list
+        A list of ``(column, loval, hival, med)`` tuples. Values outside
+        ``[loval, hival]`` are outliers, ``None`` means there is no bound
+
+    Returns
+    -------
+    list
+        A ``(whislo, whishi, fliers)`` tuple for each column
+    """
     template = Template(
         """
-SELECT "{{column}}"
-FROM "{{table}}"
-WHERE "{{column}}" < {{whislo}}
-OR  "{{column}}" > {{whishi}}
+{%- macro outside(column, loval, hival) -%}
+{%- if loval is not none %}"{{column}}" < {{loval}}{% endif %}
+{%- if loval is not none and hival is not none %} OR {% endif %}
+{%- if hival is not none %}"{{column}}" > {{hival}}{% endif %}
+{%- endmacro -%}
+SELECT _idx.idx AS idx, 'whiskers' AS kind,
+CASE _idx.idx
+{%- for _ in bounds %} WHEN {{loop.index0}} THEN lo_{{loop.index0}}{% endfor %} \
+END AS value,
+CASE _idx.idx
+{%- for _ in bounds %} WHEN {{loop.index0}} THEN hi_{{loop.index0}}{% endfor %} \
+END AS value_hi
+FROM (
+    SELECT
+{%- for column, loval, hival, med in bounds %}
+    MIN({% if loval is not none %}CASE WHEN "{{column}}" >= {{loval}} \
+THEN "{{column}}" END{% else %}"{{column}}"{% endif %}) AS lo_{{loop.index0}},
+    MAX({% if hival is not none %}CASE WHEN "{{column}}" <= {{hival}} \
+THEN "{{column}}" END{% else %}"{{column}}"{% endif %}) AS hi_{{loop.index0}}
+{{- "," if not loop.last }}
+{%- endfor %}
+    FROM "{{table}}"
+) AS _whiskers
+CROSS JOIN (
+{%- for _ in bounds %}
+    {% if not loop.first %}UNION ALL {% endif %}SELECT {{loop.index0}} AS idx
+{%- endfor %}
+) AS _idx
+{%- for column, loval, hival, med in bounds %}
+{%- if loval is not none or hival is not none %}
+UNION ALL
+SELECT idx, kind, value, value_hi
+FROM (
+    SELECT {{loop.index0}} AS idx, 'flier' AS kind, "{{column}}" AS value,
+    NULL AS value_hi,
+    ROW_NUMBER() OVER (ORDER BY ABS("{{column}}" - {{med}}) DESC) AS rn
+    FROM "{{table}}"
+    WHERE {{outside(column, loval, hival)}}
+) AS _fliers_{{loop.index0}}
+WHERE rn <= {{max_fliers}}
+{%- endif %}
+{%- endfor %}
 """
     )
-    query = template.render(table=table, column=column, whislo=whislo, whishi=whishi)
+    query = template.render(table=table, bounds=bounds, max_fliers=max_fliers)
 
-    results = [float(n[0]) for n in conn.execute(query, with_).fetchall()]
-    return results
+    whiskers = [(None, None)] * len(bounds)
+    fliers = [[] for _ in bounds]
+
+    for idx, kind, value, value_hi in plot_cache.fetchall(conn, query, with_):
+        if kind == "whiskers":
+            whiskers[idx] = (value, value_hi)
+        else:
+            fliers[idx].append(float(value))
+
+    return [(*whiskers[idx], fliers[idx]) for idx in range(len(bounds))]
 
 
 # https://github.com/matplotlib/matplotlib/blob/b5ac96a8980fdb9e59c9fb649e0714d776e26701/lib/matplotlib/cbook/__init__.py
 @modify_exceptions
-def _boxplot_stats(conn, table, column, whis=1.5, autorange=False, with_=None):
-    """Compute statistics required to create a boxplot"""
+def _boxplot_stats_many(
+    conn, table, columns, whis=1.5, autorange=False, max_fliers=MAX_FLIERS, with_=None
+):
+    """
+    Compute the statistics required to create a boxplot of many columns. The
+    quartiles, mean and count of all columns are computed in one query, and the
+    whisker extremes and outliers in another one
+    """
+    if isinstance(table, _LocalTable):
+        return table.boxplot_stats(
+            columns, whis=whis, autorange=autorange, max_fliers=max_fliers
+        )
+
     if not conn:
         conn = sql.connection.ConnectionManager.current
 
@@ -117,61 +156,76 @@ def _boxplot_stats(conn, table, column, whis=1.5, autorange=False, with_=None):
 
         return notch_min, notch_max
 
-    stats = dict()
-
-    # arithmetic mean
-    s_stats = _summary_stats(conn, table, column, with_=with_)
-
-    stats["mean"] = s_stats["mean"]
-    q1, med, q3 = s_stats["q1"], s_stats["med"], s_stats["q3"]
-    N = s_stats["N"]
+    if not (np.iterable(whis) and not isinstance(whis, str)) and not np.isreal(whis):
+        raise ValueError("whis must be a float or list of percentiles")
 
-    # interquartile range
-    stats["iqr"] = q3 - q1
+    all_stats = []
+    bounds = []
 
-    if stats["iqr"] == 0 and autorange:
-        whis = (0, 100)
+    for column, s_stats in zip(
+        columns, _summary_stats_many(conn, table, columns, with_=with_)
+    ):
+        stats = dict()
 
-    # conf. interval around median
-    stats["cilo"], stats["cihi"] = _compute_conf_interval(N, med, stats["iqr"])
+        # arithmetic mean
+        stats["mean"] = s_stats["mean"]
+        q1, med, q3 = s_stats["q1"], s_stats["med"], s_stats["q3"]
+        N = s_stats["N"]
 
-    # lowest/highest non-outliers
-    if np.iterable(whis) and not isinstance(whis, str):
-        loval, hival = _percentile(conn, table, column, whis, with_=with_)
+        # interquartile range
+        stats["iqr"] = q3 - q1
 
-    elif np.isreal(whis):
-        loval = q1 - whis * stats["iqr"]
-        hival = q3 + whis * stats["iqr"]
-    else:
-        raise ValueError("whis must be a float or list of percentiles")
+        # conf. interval around median
+        stats["cilo"], stats["cihi"] = _compute_conf_interval(N, med, stats["iqr"])
 
-    # get high extreme
-    wiskhi_d = _whishi(conn, table, column, hival, with_=with_)
+        # lowest/highest non-outliers
+        if stats["iqr"] == 0 and autorange:
+            # whis=(0, 100): the whiskers are the minimum and maximum
+            loval, hival = None, None
+        elif np.iterable(whis) and not isinstance(whis, str):
+            loval, hival = _percentile(conn, table, column, whis, with_=with_)
+        else:
+            loval = q1 - whis * stats["iqr"]
+            hival = q3 + whis * stats["iqr"]
 
-    if wiskhi_d["N"] == 0 or wiskhi_d["wiskhi_max"] < q3:
-        stats["whishi"] = q3
-    else:
-        stats["whishi"] = wiskhi_d["wiskhi_max"]
+        # the whiskers never fall inside the box, since the quartiles are values
+        # in the column, widening the bounds to include them gives the same
+        # whiskers and lets us get the outliers in the same query
+        if loval is not None:
+            loval = min(loval, q1)
 
-    # get low extreme
-    wisklo_d = _whislo(conn, table, column, loval, with_=with_)
+        if hival is not None:
+            hival = max(hival, q3)
 
-    if wisklo_d["N"] == 0 or wisklo_d["wisklo_min"] > q1:
-        stats["whislo"] = q1
-    else:
-        stats["whislo"] = wisklo_d["wisklo_min"]
+        stats["q1"], stats["med"], stats["q3"] = q1, med, q3
+        all_stats.append(stats)
+        bounds.append((column, loval, hival, med))
 
-    # compute a single array of outliers
-    stats["fliers"] = np.array(
-        _between(conn, table, column, stats["whislo"], stats["whishi"], with_=with_)
+    results = _whiskers_and_fliers(
+        conn, table, bounds, max_fliers=max_fliers, with_=with_
     )
 
-    # add in the remaining stats
-    stats["q1"], stats["med"], stats["q3"] = q1, med, q3
+    for stats, (whislo, whishi, fliers) in zip(all_stats, results):
+        stats["whislo"] = stats["q1"] if whislo is None else float(whislo)
+        stats["whishi"] = stats["q3"] if whishi is None else float(whishi)
+        stats["fliers"] = np.array(fliers)
 
-    bxpstats = {k: v for k, v in stats.items()}
+    return all_stats
 
-    return bxpstats
+
+def _boxplot_stats(
+    conn, table, column, whis=1.5, autorange=False, max_fliers=MAX_FLIERS, with_=None
+):
+    """Compute statistics required to create a boxplot"""
+    return _boxplot_stats_many(
+        conn,
+        table,
+        [column],
+        whis=whis,
+        autorange=autorange,
+        max_fliers=max_fliers,
+        with_=with_,
+    )[0]
 
 
 # https://github.com/matplotlib/matplotlib/blob/ddc260ce5a53958839c244c0ef0565160aeec174/lib/matplotlib/axes/_axes.py#L3915
@@ -227,7 +281,8 @@ def boxplot(payload, table, column, *, orient="v", with_=None, conn=None, ax=Non
     if not conn:
         conn = sql.connection.ConnectionManager.current
 
-    payload["connection_info"] = conn._get_database_information()
+    table = _resolve_table(table, conn, with_=with_)
+    payload["connection_info"] = _get_database_information(conn)
 
     ax = plt.gca()
     vert = orient == "v"
@@ -242,7 +297,7 @@ def boxplot(payload, table, column, *, orient="v", with_=None, conn=None, ax=Non
         set_label(column)
         set_ticklabels([column])
     else:
-        stats = [_boxplot_stats(conn, table, col, with_=with_) for col in column]
+        stats = _boxplot_stats_many(conn, table, column, with_=with_)
         ax.bxp(stats, vert=vert)
         ax.set_title(f"Boxplot from {table!r}")
         set_ticklabels(column)
@@ -265,10 +320,32 @@ FROM "{{table}}"
     template = Template(template_)
     query = template.render(table=table, column=column)
 
-    min_, max_ = con.execute(query, with_).fetchone()
+    min_, max_ = plot_cache.fetchone(con, query, with_)
     return min_, max_
 
 
+def _min_max_many(con, table, columns, with_=None, use_backticks=False):
+    """Compute the minimum and maximum of many columns in a single query"""
+    if not con:
+        con = sql.connection.ConnectionManager.current
+    template_ = """
+SELECT
+{%- for column in columns %}
+    MIN("{{column}}"),
+    MAX("{{column}}"){{ "," if not loop.last }}
+{%- endfor %}
+FROM "{{table}}"
+"""
+    if use_backticks:
+        template_ = template_.replace('"', "`")
+
+    template = Template(template_)
+    query = template.render(table=table, columns=columns)
+
+    values = plot_cache.fetchone(con, query, with_)
+    return [tuple(values[idx : idx + 2]) for idx in range(0, len(values), 2)]
+
+
 def _get_bar_width(ax, bins, bin_size, binwidth):
     """
     Return a single bar width based on number of bins
@@ -396,8 +473,9 @@ def histogram(
         ["bins", "breaks", "binwidth"], [bins, breaks, binwidth]
     )
 
+    table = _resolve_table(table, conn, with_=with_)
     ax = ax or plt.gca()
-    payload["connection_info"] = conn._get_database_information()
+    payload["connection_info"] = _get_database_information(conn)
     if category:
         if isinstance(column, list):
             if len(column) > 1:
@@ -412,7 +490,10 @@ def histogram(
         if column is None or len(column) == 0:
             raise ValueError("Column name has not been specified")
 
-        bin_, height, bin_size = _histogram(
+        bin_, height, bin_size = _compute_once(
+            facet,
+            ("histogram", column, bins, _as_tuple(breaks), binwidth),
+            _histogram,
             table,
             column,
             bins,
@@ -504,17 +585,32 @@ def histogram(
             raise exceptions.UsageError(
                 "Multiple columns don't support breaks. Please use bins instead."
             )
-        for i, col in enumerate(column):
-            bin_, height, bin_size = _histogram(
+        if breaks:
+            histograms = [
+                _histogram(
+                    table,
+                    col,
+                    bins,
+                    with_=with_,
+                    conn=conn,
+                    facet=facet,
+                    breaks=breaks,
+                    binwidth=binwidth,
+                )
+                for col in column
+            ]
+        else:
+            histograms = _histogram_many(
                 table,
-                col,
+                column,
                 bins,
                 with_=with_,
                 conn=conn,
                 facet=facet,
-                breaks=breaks,
                 binwidth=binwidth,
             )
+
+        for i, (col, (bin_, height, bin_size)) in enumerate(zip(column, histograms)):
             width = _get_bar_width(ax, bin_, bin_size, binwidth)
 
             if isinstance(color, list):
@@ -550,8 +646,32 @@ def _histogram(
     table, column, bins, with_=None, conn=None, facet=None, breaks=None, binwidth=None
 ):
     """Compute bins and heights"""
+    if isinstance(table, _LocalTable):
+        return table.histogram(
+            column, bins, facet=facet, breaks=breaks, binwidth=binwidth
+        )
+
     if not conn:
         conn = sql.connection.ConnectionManager.current
+
+    if _is_facet_wrap(facet):
+        panels = _compute_once(
+            facet,
+            ("histogram_facets", column, bins, _as_tuple(breaks), binwidth),
+            _histogram_facets,
+            table,
+            column,
+            bins,
+            facet["key"],
+            with_=with_,
+            conn=conn,
+            breaks=breaks,
+            binwidth=binwidth,
+        )
+        data, bin_size = panels[facet["value"]]
+        bin_, height = zip(*data)
+        return bin_, height, bin_size
+
     use_backticks = conn.is_use_backtick_template()
 
     # Snowflake will use UPPERCASE in the table and column name
@@ -571,14 +691,7 @@ def _histogram(
 
     if _are_numeric_values(min_, max_):
         if breaks:
-            if min_ > breaks[-1]:
-                raise exceptions.UsageError(
-                    f"All break points are lower than the min data point of {min_}."
-                )
-            elif max_ < breaks[0]:
-                raise exceptions.UsageError(
-                    f"All break points are higher than the max data point of {max_}."
-                )
+            _validate_breaks(min_, max_, breaks)
 
             cases, bin_size = [], []
             for b_start, b_end in zip(breaks[:-1], breaks[1:]):
@@ -622,23 +735,8 @@ def _histogram(
             query = template.render(
                 table=table, column=column, filter_query=filter_query
             )
-        elif not binwidth and not isinstance(bins, int):
-            raise ValueError(
-                f"bins are '{bins}'. Please specify a valid number of bins."
-            )
         else:
-            # Use bins - 1 instead of bins and round half down instead of floor
-            # to mimic right-closed histogram intervals in R ggplot
-            range_ = max_ - min_
-            if binwidth:
-                bin_size = binwidth
-                if binwidth > range_:
-                    message(
-                        f"Specified binwidth {binwidth} is larger than "
-                        f"the range {range_}. Please choose a smaller binwidth."
-                    )
-            else:
-                bin_size = range_ / (bins - 1)
+            bin_size = _get_bin_size(min_, max_, bins, binwidth)
             template_ = """
                 select
                 ceiling("{{column}}"/{{bin_size}} - 0.5)*{{bin_size}} as bin,
@@ -674,13 +772,127 @@ def _histogram(
 
         query = template.render(table=table, column=column, filter_query=filter_query)
 
-    data = conn.execute(query, with_).fetchall()
+    data = plot_cache.fetchall(conn, query, with_)
 
     bin_, height = zip(*data)
 
     return bin_, height, bin_size
 
 
+def _get_bin_size(min_, max_, bins, binwidth):
+    """Compute the bin size of a numeric column"""
+    if not binwidth and not isinstance(bins, int):
+        raise ValueError(f"bins are '{bins}'. Please specify a valid number of bins.")
+
+    # Use bins - 1 instead of bins and round half down instead of floor
+    # to mimic right-closed histogram intervals in R ggplot
+    range_ = max_ - min_
+
+    if binwidth:
+        if binwidth > range_:
+            message(
+                f"Specified binwidth {binwidth} is larger than "
+                f"the range {range_}. Please choose a smaller binwidth."
+            )
+
+        return binwidth
+
+    return range_ / (bins - 1)
+
+
+@modify_exceptions
+def _histogram_many(
+    table, columns, bins, with_=None, conn=None, facet=None, binwidth=None
+):
+    """
+    Compute bins and heights of many columns. The minimum and maximum of all
+    columns are computed in one query, and the counts of the numeric columns in
+    another one. Non-numeric columns are counted separately (see ``_histogram``)
+
+    Returns
+    -------
+    list
+        A ``(bins, heights, bin_size)`` tuple for each column
+    """
+    if isinstance(table, _LocalTable):
+        return table.histogram_many(columns, bins, facet=facet, binwidth=binwidth)
+
+    if not conn:
+        conn = sql.connection.ConnectionManager.current
+
+    # facet_wrap computes all the panels of each column at once
+    if _is_facet_wrap(facet):
+        return [
+            _histogram(
+                table,
+                column,
+                bins,
+                with_=with_,
+                conn=conn,
+                facet=facet,
+                binwidth=binwidth,
+            )
+            for column in columns
+        ]
+
+    use_backticks = conn.is_use_backtick_template()
+
+    # Snowflake will use UPPERCASE in the table and column name
+    columns_ = [to_upper_if_snowflake_conn(conn, column) for column in columns]
+    table_ = to_upper_if_snowflake_conn(conn, table)
+
+    min_max = _min_max_many(
+        conn, table_, columns_, with_=with_, use_backticks=use_backticks
+    )
+
+    filter_query_2 = f"{facet['key']} == '{facet['value']}'" if facet else None
+    results = [None] * len(columns)
+    numeric = []
+
+    for idx, (column, (min_, max_)) in enumerate(zip(columns_, min_max)):
+        if _are_numeric_values(min_, max_):
+            bin_size = _get_bin_size(min_, max_, bins, binwidth)
+            filter_query = _filter_aggregate(f'"{column}" IS NOT NULL', filter_query_2)
+            numeric.append((idx, column, bin_size, filter_query))
+        else:
+            results[idx] = _histogram(
+                table,
+                columns[idx],
+                bins,
+                with_=with_,
+                conn=conn,
+                facet=facet,
+                binwidth=binwidth,
+            )
+
+    if numeric:
+        template_ = """
+{%- for idx, column, bin_size, filter_query in numeric %}
+select
+{{idx}} as idx,
+ceiling("{{column}}"/{{bin_size}} - 0.5)*{{bin_size}} as bin,
+count(*) as count
+from "{{table}}"
+{{filter_query}}
+group by bin
+{{ "union all" if not loop.last }}
+{%- endfor %}
+order by idx, bin;
+"""
+
+        if use_backticks:
+            template_ = template_.replace('"', "`")
+
+        query = Template(template_).render(table=table_, numeric=numeric)
+        data = plot_cache.fetchall(conn, query, with_)
+
+        for idx, column, bin_size, _ in numeric:
+            bin_, height = zip(*(row[1:] for row in data if row[0] == idx))
+            results[idx] = bin_, height, bin_size
+
+    return results
+
+
 @modify_exceptions
 def _histogram_stacked(
     table,
@@ -694,38 +906,60 @@ def _histogram_stacked(
     breaks=None,
     binwidth=None,
 ):
-    """Compute the corresponding heights of each bin based on the category"""
+    """
+    Compute the corresponding heights of each bin based on the category. The
+    query counts the rows by category and bin index (an integer), and the
+    counts are arranged into one row per category with NumPy
+
+    Returns
+    -------
+    list
+        A ``(category, height_1, ..., height_n)`` tuple for each category, in
+        descending order
+    """
+    if isinstance(table, _LocalTable):
+        return table.histogram_stacked(
+            column,
+            category,
+            bins,
+            bin_size,
+            facet=facet,
+            breaks=breaks,
+            binwidth=binwidth,
+        )
+
     if not conn:
         conn = sql.connection.ConnectionManager.current
 
-    cases = []
     if breaks:
         breaks_filter_query = (
             f'"{column}" >= {breaks[0]} and "{column}" <= {breaks[-1]}'
         )
-        for b_start, b_end in zip(breaks[:-1], breaks[1:]):
-            case = f'SUM(CASE WHEN {column} > {b_start} AND {column} <= {b_end} \
-                    THEN 1 ELSE 0 END) AS "{(b_start+b_end)/2}",'
-            cases.append(case)
-        cases[0] = cases[0].replace(">", ">=", 1)
+        # the filter excludes values outside the breaks, so we only need to
+        # check the upper limit of each interval
+        whens = " ".join(
+            f'WHEN "{column}" <= {b_end} THEN {idx}'
+            for idx, b_end in enumerate(breaks[1:])
+        )
+        bin_index = f"CASE {whens} END"
+        bin_keys = np.arange(len(breaks) - 1)
     else:
         if binwidth:
             bin_size = binwidth
-        tolerance = bin_size / 1000  # Use to avoid floating point error
-        for bin in bins:
-            # Use round half down instead of floor to mimic
-            # right-closed histogram intervals in R ggplot
-            case = (
-                f"SUM(CASE WHEN ABS(CEILING({column}/{bin_size} - 0.5)*{bin_size} "
-                f"- {bin}) <= {tolerance} THEN 1 ELSE 0 END) AS '{bin}',"
-            )
-            cases.append(case)
-
-    cases = " ".join(cases)
+        # Use round half down instead of floor to mimic
+        # right-closed histogram intervals in R ggplot
+        bin_index = f'CEILING("{column}"/{bin_size} - 0.5)'
+        bin_keys = np.rint(np.asarray(bins, dtype=float) / bin_size)
 
     filter_query_1 = f'"{column}" IS NOT NULL'
 
-    filter_query_2 = f"{facet['key']} == '{facet['value']}'" if facet else None
+    # facet_wrap computes all the panels at once, grouping by the facet
+    facet_wrap = _is_facet_wrap(facet)
+
+    if facet and not facet_wrap:
+        filter_query_2 = f"{facet['key']} == '{facet['value']}'"
+    else:
+        filter_query_2 = None
 
     if breaks:
         filter_query = _filter_aggregate(
@@ -736,26 +970,208 @@ def _histogram_stacked(
 
     template = Template(
         """
-        SELECT {{category}},
-        {{cases}}
+        SELECT {% if facet %}{{facet}} AS facet_value, {% endif %}{{category}},
+        {{bin_index}} AS bin_index, COUNT(*) AS count
         FROM "{{table}}"
         {{filter_query}}
-        GROUP BY {{category}}
-        ORDER BY {{category}} DESC;
+        GROUP BY {% if facet %}facet_value, {% endif %}{{category}}, bin_index
+        ORDER BY {% if facet %}facet_value, {% endif %}{{category}} DESC;
         """
     )
     query = template.render(
         table=table,
-        column=column,
-        bin_size=bin_size,
         category=category,
+        bin_index=bin_index,
         filter_query=filter_query,
-        cases=cases,
+        facet=facet["key"] if facet_wrap else None,
     )
 
-    data = conn.execute(query, with_).fetchall()
+    if not facet_wrap:
+        return _pivot_stacked(plot_cache.fetchall(conn, query, with_), bin_keys)
 
-    return data
+    data = _compute_once(
+        facet,
+        ("histogram_stacked", query),
+        lambda: plot_cache.fetchall(conn, query, with_),
+    )
+
+    return _pivot_stacked(
+        [row[1:] for row in data if row[0] == facet["value"]], bin_keys
+    )
+
+
+def _pivot_stacked(data, bin_keys):
+    """
+    Arrange ``(category, bin_index, count)`` rows into a
+    ``(category, height_1, ..., height_n)`` tuple per category (keeping the
+    order in which categories appear), where the heights follow ``bin_keys``
+    """
+    categories = list(dict.fromkeys(row[0] for row in data))
+    heights = np.zeros((len(categories), len(bin_keys)), dtype=int)
+
+    if data and len(bin_keys):
+        positions = {category: idx for idx, category in enumerate(categories)}
+        rows = np.array([positions[row[0]] for row in data])
+        keys = np.array([row[1] for row in data], dtype=float)
+        counts = np.array([row[2] for row in data], dtype=int)
+
+        order = np.argsort(bin_keys)
+        sorted_keys = np.asarray(bin_keys)[order]
+        idx = np.searchsorted(sorted_keys, keys).clip(max=len(sorted_keys) - 1)
+        # ignore the counts of values that aren't in any of the bins
+        found = sorted_keys[idx] == keys
+        np.add.at(heights, (rows[found], order[idx[found]]), counts[found])
+
+    return [(category, *row) for category, row in zip(categories, heights.tolist())]
+
+
+def _is_facet_wrap(facet):
+    """
+    Whether the panel is drawn by facet_wrap, which passes a dictionary
+    (``facet["results"]``) shared by all panels to store the results of the
+    queries that compute all the panels at once
+    """
+    return bool(facet) and facet.get("results") is not None
+
+
+def _compute_once(facet, key, function, *args, **kwargs):
+    """
+    Call ``function`` once per facet_wrap (panels are drawn with the same
+    arguments), other plots call it every time
+    """
+    if not _is_facet_wrap(facet):
+        return function(*args, **kwargs)
+
+    results = facet["results"]
+
+    if key not in results:
+        results[key] = function(*args, **kwargs)
+
+    return results[key]
+
+
+def _as_tuple(values):
+    return tuple(values) if values else values
+
+
+def _validate_breaks(min_, max_, breaks):
+    if min_ > breaks[-1]:
+        raise exceptions.UsageError(
+            f"All break points are lower than the min data point of {min_}."
+        )
+    elif max_ < breaks[0]:
+        raise exceptions.UsageError(
+            f"All break points are higher than the max data point of {max_}."
+        )
+
+
+@modify_exceptions
+def _histogram_facets(
+    table, column, bins, facet_key, with_=None, conn=None, breaks=None, binwidth=None
+):
+    """
+    Compute the bins and heights of every facet_wrap panel with a single query
+    grouped by the facet. Like ``_histogram``, the bins are computed from the
+    range of the whole column, so all panels share them
+
+    Returns
+    -------
+    collections.defaultdict
+        Maps each facet value to a ``(rows, bin_size)`` tuple, where rows is a
+        list of ``(bin, height)`` tuples
+    """
+    if not conn:
+        conn = sql.connection.ConnectionManager.current
+    use_backticks = conn.is_use_backtick_template()
+
+    # Snowflake will use UPPERCASE in the table and column name
+    column = to_upper_if_snowflake_conn(conn, column)
+    table = to_upper_if_snowflake_conn(conn, table)
+    min_, max_ = _min_max(conn, table, column, with_=with_, use_backticks=use_backticks)
+
+    filter_query = f'"{column}" IS NOT NULL'
+    bin_size = None
+    bin_midpoints = None
+
+    if _are_numeric_values(min_, max_):
+        if breaks:
+            _validate_breaks(min_, max_, breaks)
+
+            cases, bin_size = [], []
+            for b_start, b_end in zip(breaks[:-1], breaks[1:]):
+                cases.append(
+                    f'WHEN "{column}" > {b_start} AND "{column}" <= {b_end} '
+                    f"THEN {(b_start + b_end) / 2}"
+                )
+                bin_size.append(b_end - b_start)
+            cases[0] = cases[0].replace(">", ">=", 1)
+            bin_midpoints = [
+                (b_start + b_end) / 2 for b_start, b_end in zip(breaks[:-1], breaks[1:])
+            ]
+            bin_ = f"case {' '.join(cases)} end"
+            filter_query = _filter_aggregate(
+                filter_query,
+                f'"{column}" >= {breaks[0]} and "{column}" <= {breaks[-1]}',
+            )
+        else:
+            bin_size = _get_bin_size(min_, max_, bins, binwidth)
+            bin_ = f'ceiling("{column}"/{bin_size} - 0.5)*{bin_size}'
+            filter_query = _filter_aggregate(filter_query)
+
+        template_ = """
+        select
+            {{facet}} as facet_value, {{bin}} as bin, count(*) as count
+        from "{{table}}"
+        {{filter_query}}
+        group by facet_value, bin
+        order by facet_value, bin;
+        """
+    else:
+        bin_ = f'"{column}"'
+        filter_query = _filter_aggregate(filter_query)
+        template_ = """
+        select
+            {{facet}} as facet_value, {{bin}} as col, count ({{bin}})
+        from "{{table}}"
+        {{filter_query}}
+        group by facet_value, col
+        order by facet_value, col;
+        """
+
+    if use_backticks:
+        template_ = template_.replace('"', "`")
+        bin_ = bin_.replace('"', "`")
+        filter_query = filter_query.replace('"', "`")
+
+    query = Template(template_).render(
+        table=table, facet=facet_key, bin=bin_, filter_query=filter_query
+    )
+
+    panels = {}
+
+    for facet_value, bin, height in plot_cache.fetchall(conn, query, with_):
+        panels.setdefault(facet_value, []).append((bin, height))
+
+    # like _histogram, panels include the bins without values when using breaks
+    if bin_midpoints:
+        panels = {
+            facet_value: _fill_breaks(rows, bin_midpoints)
+            for facet_value, rows in panels.items()
+        }
+        empty = _fill_breaks([], bin_midpoints)
+    else:
+        empty = []
+
+    results = defaultdict(lambda: (empty, bin_size))
+    results.update(
+        {facet_value: (rows, bin_size) for facet_value, rows in panels.items()}
+    )
+    return results
+
+
+def _fill_breaks(rows, bin_midpoints):
+    heights = {float(bin): height for bin, height in rows}
+    return [(mid, heights.get(float(mid), 0)) for mid in bin_midpoints]
 
 
 @modify_exceptions
@@ -795,7 +1211,7 @@ def _bar(table, column, with_=None, conn=None):
     """get x and height for bar plot"""
     if not conn:
         conn = sql.connection.ConnectionManager.current
-    use_backticks = conn.is_use_backtick_template()
+    use_backticks = conn.is_use_backtick_template() if conn else False
 
     if isinstance(column, list):
         if len(column) > 2:
@@ -846,7 +1262,10 @@ def _bar(table, column, with_=None, conn=None):
         template = Template(template_)
         query = template.render(table=table, column=column)
 
-    data = conn.execute(query, with_).fetchall()
+    if isinstance(table, _LocalTable):
+        data = list(zip(*table.counts(column)))
+    else:
+        data = plot_cache.fetchall(conn, query, with_)
 
     x, height = zip(*data)
 
@@ -905,8 +1324,9 @@ def bar(
     if not conn:
         conn = sql.connection.ConnectionManager.current
 
+    table = _resolve_table(table, conn, with_=with_)
     ax = ax or plt.gca()
-    payload["connection_info"] = conn._get_database_information()
+    payload["connection_info"] = _get_database_information(conn)
 
     if column is None:
         raise exceptions.UsageError("Column name has not been specified")
@@ -979,7 +1399,7 @@ def _pie(table, column, with_=None, conn=None):
     """get x and height for pie chart"""
     if not conn:
         conn = sql.connection.ConnectionManager.current
-    use_backticks = conn.is_use_backtick_template()
+    use_backticks = conn.is_use_backtick_template() if conn else False
 
     if isinstance(column, list):
         if len(column) > 2:
@@ -1024,7 +1444,10 @@ def _pie(table, column, with_=None, conn=None):
         template = Template(template_)
         query = template.render(table=table, column=column)
 
-    data = conn.execute(query, with_).fetchall()
+    if isinstance(table, _LocalTable):
+        data = list(zip(*table.counts(column)))
+    else:
+        data = plot_cache.fetchall(conn, query, with_)
 
     labels, size = zip(*data)
 
@@ -1077,8 +1500,9 @@ def pie(
     if not conn:
         conn = sql.connection.ConnectionManager.current
 
+    table = _resolve_table(table, conn, with_=with_)
     ax = ax or plt.gca()
-    payload["connection_info"] = conn._get_database_information()
+    payload["connection_info"] = _get_database_information(conn)
 
     if column is None:
         raise exceptions.UsageError("Column name has not been specified")
@@ -1113,3 +1537,316 @@ def pie(
     ax.set_title(table)
 
     return ax
+
+
+# data frames with up to this number of rows are plotted with NumPy, larger ones
+# are plotted with SQL so the database computes the statistics in parallel
+LOCAL_MAX_ROWS = 1_000_000
+
+# (module, class) of the data frames that can be plotted with NumPy
+_DATA_FRAME_TYPES = [
+    ("pandas", "DataFrame"),
+    ("polars", "DataFrame"),
+    ("pyarrow", "Table"),
+]
+
+
+def _is_data_frame(obj):
+    # if the module hasn't been imported, obj cannot be one of its data frames
+    for module_name, class_name in _DATA_FRAME_TYPES:
+        module = sys.modules.get(module_name)
+
+        if module is not None and isinstance(obj, getattr(module, class_name)):
+            return True
+
+    return False
+
+
+def _resolve_table(table, conn, with_=None):
+    """
+    Returns a ``_LocalTable`` if the plot can be computed with NumPy, otherwise
+    returns ``table`` (and the plot is computed with SQL)
+
+    A plot is computed with NumPy if ``table`` is a data frame, or if it's the
+    name of a data frame in the IPython namespace that a DuckDB connection
+    would query (i.e., there isn't a table with the same name), as long as the
+    data frame has at most ``LOCAL_MAX_ROWS`` rows
+    """
+    if isinstance(table, _LocalTable):
+        return table
+
+    if _is_data_frame(table):
+        return _LocalTable("data frame", table)
+
+    if with_ or not isinstance(table, str) or conn is None:
+        return table
+
+    if conn.capabilities.sqlglot_dialect != "duckdb":
+        return table
+
+    data = _get_user_namespace().get(table)
+
+    if not _is_data_frame(data) or _num_rows(data) > LOCAL_MAX_ROWS:
+        return table
+
+    # DuckDB only queries data frames if there isn't a table with the same name
+    # (checkout waits for queries running in the background in this connection)
+    name = table.replace("'", "''")
+
+    with conn.checkout() as connection:
+        (num_tables,) = connection.raw_execute(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            f"WHERE table_name = '{name}'"
+        ).fetchone()
+
+    return table if num_tables else _LocalTable(table, data)
+
+
+def _get_database_information(conn):
+    # data frames can be plotted without a connection
+    return conn._get_database_information() if conn else None
+
+
+def _get_user_namespace():
+    try:
+        shell = _current._get_sql_magic().shell
+    except RuntimeError:
+        return {}
+
+    return shell.user_ns if shell is not None else {}
+
+
+def _num_rows(data):
+    return data.num_rows if hasattr(data, "num_rows") else len(data)
+
+
+class _LocalTable:
+    """
+    Computes the statistics of a plot with NumPy. It implements the same
+    functions as the SQL backend (e.g., ``_histogram``) and returns the same
+    values, so the drawing code is shared
+
+    Parameters
+    ----------
+    name : str
+        Name used in the plot titles
+
+    data : pandas.DataFrame, polars.DataFrame or pyarrow.Table
+        The data to plot
+    """
+
+    def __init__(self, name, data):
+        self._name = name
+        self._data = data
+
+    def __str__(self):
+        return self._name
+
+    def __repr__(self):
+        return repr(self._name)
+
+    @property
+    def num_rows(self):
+        return _num_rows(self._data)
+
+    def _column(self, column):
+        """Returns the values of a column and a boolean mask of the non-null ones"""
+        series = self._data[column]
+
+        if hasattr(series, "is_valid"):
+            # pyarrow
+            return series.to_numpy(), series.is_valid().to_numpy()
+        elif hasattr(series, "is_not_null"):
+            # polars
+            return series.to_numpy(), series.is_not_null().to_numpy()
+        else:
+            values = series.to_numpy()
+
+            # nullable dtypes (e.g., Int64, Float64) are converted to objects
+            if values.dtype == object and series.dtype.kind in "iuf":
+                values = series.to_numpy(dtype=float, na_value=np.nan)
+
+            return values, series.notna().to_numpy()
+
+    def values(self, *columns, facet=None, nullable=()):
+        """
+        Returns the values of the columns in the rows where they (except the
+        ones in ``nullable``) aren't null and, if passed, the facet matches
+        """
+        arrays, keep = [], np.ones(self.num_rows, dtype=bool)
+
+        for column in columns:
+            values, valid = self._column(column)
+            arrays.append(values)
+
+            if column not in nullable:
+                keep &= valid
+
+        if facet:
+            values, valid = self._column(facet["key"])
+            keep &= valid & (values == facet["value"])
+
+        return [values[keep] for values in arrays]
+
+    def histogram(self, column, bins, facet=None, breaks=None, binwidth=None):
+        """Same as ``_histogram``"""
+        (values,) = self.values(column, facet=facet)
+        bin_size = None
+
+        if _is_numeric(values):
+            min_, max_ = self._min_max(column)
+
+            if breaks:
+                _validate_breaks(min_, max_, breaks)
+                edges = np.asarray(breaks, dtype=float)
+                values = values[(values >= edges[0]) & (values <= edges[-1])]
+                # the first interval is closed, the rest are right-closed
+                heights = np.bincount(
+                    np.searchsorted(edges[1:], values), minlength=len(edges) - 1
+                )
+                bin_ = (edges[:-1] + edges[1:]) / 2
+                bin_size = np.diff(breaks).tolist()
+            else:
+                bin_size = _get_bin_size(min_, max_, bins, binwidth)
+                keys, heights = np.unique(
+                    _bin_keys(values, bin_size), return_counts=True
+                )
+                bin_ = keys * bin_size
+        else:
+            bin_, heights = _value_counts(values)
+
+        return tuple(bin_.tolist()), tuple(heights.tolist()), bin_size
+
+    def histogram_many(self, columns, bins, facet=None, binwidth=None):
+        """Same as ``_histogram_many``"""
+        return [
+            self.histogram(column, bins, facet=facet, binwidth=binwidth)
+            for column in columns
+        ]
+
+    def histogram_stacked(
+        self, column, category, bins, bin_size, facet=None, breaks=None, binwidth=None
+    ):
+        """Same as ``_histogram_stacked``"""
+        values, categories = self.values(
+            column, category, facet=facet, nullable=(category,)
+        )
+
+        if breaks:
+            keep = (values >= breaks[0]) & (values <= breaks[-1])
+            values, categories = values[keep], categories[keep]
+            keys = np.searchsorted(np.asarray(breaks[1:], dtype=float), values)
+            bin_keys = np.arange(len(breaks) - 1)
+        else:
+            bin_size = binwidth or bin_size
+            keys = _bin_keys(values, bin_size)
+            bin_keys = np.rint(np.asarray(bins, dtype=float) / bin_size)
+
+        is_null = np.array([value is None for value in categories], dtype=bool)
+        is_null |= _is_nan(categories)
+
+        rows = []
+
+        # like ORDER BY category DESC, NULLs go first
+        if is_null.any():
+            bins_, counts = np.unique(keys[is_null], return_counts=True)
+            rows.extend((None, key, count) for key, count in zip(bins_, counts))
+
+        labels, codes = np.unique(categories[~is_null], return_inverse=True)
+        bins_, inverse = np.unique(keys[~is_null], return_inverse=True)
+        pairs, counts = np.unique(codes * len(bins_) + inverse, return_counts=True)
+
+        for pair, count in sorted(
+            zip(pairs.tolist(), counts.tolist()), key=lambda item: -item[0]
+        ):
+            code, key = divmod(pair, len(bins_))
+            rows.append((labels[code], bins_[key], count))
+
+        return _pivot_stacked(rows, bin_keys)
+
+    def boxplot_stats(self, columns, whis=1.5, autorange=False, max_fliers=MAX_FLIERS):
+        """Same as ``_boxplot_stats_many``"""
+        all_stats = []
+
+        for column in columns:
+            (values,) = self.values(column)
+            values = np.sort(values.astype(float))
+            q1, med, q3 = (_percentile_disc(values, q) for q in (0.25, 0.50, 0.75))
+            iqr = q3 - q1
+            # COUNT(*) in the SQL backend
+            N = self.num_rows
+
+            if iqr == 0 and autorange:
+                loval, hival = values[0], values[-1]
+            elif np.iterable(whis) and not isinstance(whis, str):
+                loval, hival = (_percentile_disc(values, q / 100) for q in whis)
+            elif np.isreal(whis):
+                loval, hival = q1 - whis * iqr, q3 + whis * iqr
+            else:
+                raise ValueError("whis must be a float or list of percentiles")
+
+            whislo = values[values >= min(loval, q1)].min()
+            whishi = values[values <= max(hival, q3)].max()
+            fliers = values[(values < whislo) | (values > whishi)]
+            # same as the SQL backend: keep the ones farthest from the median
+            fliers = fliers[np.argsort(-np.abs(fliers - med), kind="stable")]
+
+            all_stats.append(
+                {
+                    "mean": values.mean(),
+                    "iqr": iqr,
+                    "cilo": med - 1.57 * iqr / np.sqrt(N),
+                    "cihi": med + 1.57 * iqr / np.sqrt(N),
+                    "whislo": whislo,
+                    "whishi": whishi,
+                    "fliers": fliers[:max_fliers],
+                    "q1": q1,
+                    "med": med,
+                    "q3": q3,
+                }
+            )
+
+        return all_stats
+
+    def counts(self, column):
+        """Same as ``_bar`` and ``_pie``: labels and heights"""
+        if isinstance(column, list):
+            x, height = self.values(*column)
+            return tuple(x.tolist()), tuple(height.tolist())
+
+        (values,) = self.values(column)
+        labels, heights = _value_counts(values)
+        return tuple(labels.tolist()), tuple(heights.tolist())
+
+    def _min_max(self, column):
+        # like MIN/MAX in SQL, the range is computed from the whole column
+        (values,) = self.values(column)
+        return values.min(), values.max()
+
+
+def _is_numeric(values):
+    return np.issubdtype(values.dtype, np.number)
+
+
+def _is_nan(values):
+    if _is_numeric(values):
+        return np.isnan(values.astype(float))
+
+    return np.array([value != value for value in values], dtype=bool)
+
+
+def _bin_keys(values, bin_size):
+    # Use round half down instead of floor to mimic
+    # right-closed histogram intervals in R ggplot
+    return np.ceil(values / bin_size - 0.5)
+
+
+def _value_counts(values):
+    return np.unique(values, return_counts=True)
+
+
+def _percentile_disc(sorted_values, q):
+    """Same as percentile_disc: the first value whose cumulative distribution is
+    greater than or equal to q"""
+    idx = max(int(np.ceil(q * len(sorted_values))) - 1, 0)
+    return sorted_values[idx]
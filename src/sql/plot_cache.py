@@ -0,0 +1,176 @@
+"""
+In-memory cache for the aggregates that ``%sqlplot`` and ``ggplot`` fetch from
+the database (histogram bins, bar/pie counts, boxplot statistics), so changing
+only the style of a chart (e.g., ``cmap``, ``color`` or ``orient``) doesn't rerun
+the queries. Entries are keyed by the connection, the rendered query (including
+the ``with_`` CTEs), the number of write statements the connection has
+executed (so any write invalidates the entries of that connection) and the
+modification time of the files the query reads (the database file and its
+write-ahead log, or files queried directly, e.g., ``SELECT * FROM "data.csv"``).
+Queries that read data frames (DuckDB replacement scans) are not cached. Writes
+from other sessions or processes can't be detected, so the cache is disabled by
+default, enable it with ``%config SqlMagic.plot_cache = True``
+"""
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from sql import _current, query_util, util
+
+# maximum number of query results kept in memory
+MAX_ENTRIES = 128
+
+
+class PlotDataCache:
+    """
+    Least recently used cache of query results
+
+    Parameters
+    ----------
+    max_entries : int
+        Maximum number of entries, the least recently used one is evicted when
+        a new entry exceeds it
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            return default
+
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def set(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = PlotDataCache()
+
+_MISSING = object()
+
+
+def _get_key(conn, query, with_, method):
+    """
+    Returns the key of the query and fetch method, None if it cannot be cached
+    (it reads a data frame or sqlglot cannot parse it)
+    """
+    rendered = conn._resolve_cte(query, with_) if with_ else query
+    fingerprint = _fingerprint(conn, rendered)
+
+    if fingerprint is None:
+        return None
+
+    # a weak reference so the cache doesn't keep closed connections alive (and a
+    # new connection that reuses the id of a deleted one doesn't match its entries)
+    return (weakref.ref(conn), conn._write_generation, rendered, fingerprint, method)
+
+
+def _fingerprint(conn, query):
+    """
+    Returns the modification times of the database file (and its write-ahead
+    log) and of the files that the query reads, None if the query reads a
+    variable in the user's namespace (e.g., a data frame)
+    """
+    try:
+        expressions = query_util.parse(query, conn.capabilities.sqlglot_dialect)
+    except SqlglotError:
+        return None
+
+    names = set()
+
+    for expression in expressions:
+        if expression is None:
+            continue
+
+        for table in expression.find_all(exp.Table):
+            names.add(".".join(part.name for part in table.parts))
+
+        # e.g., read_csv_auto('data.csv')
+        for literal in expression.find_all(exp.Literal):
+            if literal.is_string:
+                names.add(literal.this)
+
+    if names & set(_get_user_namespace()):
+        return None
+
+    database_file = util.get_database_file(conn)
+    files = [database_file, f"{database_file}-wal", f"{database_file}.wal"]
+    files = files if database_file else []
+
+    for name in sorted(names):
+        try:
+            if name and Path(name).is_file():
+                files.append(name)
+        except OSError:
+            continue
+
+    return tuple(util.get_mtime(file) for file in files)
+
+
+def _get_user_namespace():
+    try:
+        return _current._get_sql_magic().shell.user_ns
+    except (RuntimeError, AttributeError):
+        return {}
+
+
+def _is_enabled():
+    try:
+        return _current._get_sql_magic().plot_cache
+    except RuntimeError:
+        return False
+
+
+def _execute(conn, query, with_, method):
+    with conn.checkout() as connection:
+        result = connection.execute(query, with_)
+        return result.fetchall() if method == "fetchall" else result.fetchone()
+
+
+def _fetch(conn, query, with_, method):
+    key = _get_key(conn, query, with_, method) if _is_enabled() else None
+
+    if key is None:
+        return _execute(conn, query, with_, method)
+
+    value = _cache.get(key, _MISSING)
+
+    if value is _MISSING:
+        value = _execute(conn, query, with_, method)
+        _cache.set(key, value)
+
+    return value
+
+
+def fetchall(conn, query, with_=None):
+    """Returns all the rows of the query, only runs it if it isn't cached"""
+    return _fetch(conn, query, with_, "fetchall")
+
+
+def fetchone(conn, query, with_=None):
+    """Returns the first row of the query, only runs it if it isn't cached"""
+    return _fetch(conn, query, with_, "fetchone")
+
+
+def clear():
+    """Remove all the entries"""
+    _cache.clear()
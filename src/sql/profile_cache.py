@@ -0,0 +1,166 @@
+"""
+On-disk cache for the statistics computed by ``%sqlcmd profile`` (disabled unless
+``SqlMagic.profile_cache_filename`` is set). Entries are keyed by the connection,
+schema, table and profiling options, and store a cheap fingerprint of the table
+(e.g., its row count and modification time). A cached report is only returned if
+the fingerprint hasn't changed, so we only cache tables of databases that update
+the fingerprint as soon as the table changes
+"""
+import json
+import sqlite3
+from pathlib import Path
+
+from sql import util
+
+
+class ProfileCache:
+    """
+    Stores profiling reports in a SQLite database
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path to the SQLite database (created if it doesn't exist)
+    """
+
+    def __init__(self, path):
+        self._path = Path(path)
+
+    def _connect(self):
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self._path))
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS profiles "
+            "(key TEXT PRIMARY KEY, fingerprint TEXT, report TEXT)"
+        )
+        return connection
+
+    def get(self, key, fingerprint):
+        """
+        Returns the cached report for ``key`` or None if there isn't one or if it
+        was computed when the table had a different fingerprint
+        """
+        connection = self._connect()
+
+        try:
+            row = connection.execute(
+                "SELECT report FROM profiles WHERE key = ? AND fingerprint = ?",
+                (key, fingerprint),
+            ).fetchone()
+        finally:
+            connection.close()
+
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key, fingerprint, report):
+        """Store a report (a JSON-serializable dictionary)"""
+        # values that JSON can't represent (e.g., dates) are only displayed, so we
+        # store their string representation
+        serialized = json.dumps(report, default=str)
+        connection = self._connect()
+
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?)",
+                    (key, fingerprint, serialized),
+                )
+        finally:
+            connection.close()
+
+
+def get_cache(conn):
+    """
+    Returns the ``ProfileCache`` for the connection, or None if it cannot be
+    cached (the cache is disabled, it's a DBAPI connection, or an in-memory
+    database)
+    """
+    if conn.is_dbapi_connection or conn._config is None:
+        return None
+
+    path = conn._config.profile_cache_filename
+
+    if not path or util.get_database_file(conn) is False:
+        return None
+
+    return ProfileCache(path)
+
+
+def get_cache_key(conn, table_name, schema=None, sample=None, approx=False):
+    """Returns the cache key for a table and the profiling options"""
+    database_file = util.get_database_file(conn)
+    # resolve relative paths so the same url in different directories doesn't
+    # point to the same entry
+    location = str(database_file) if database_file else conn.url
+
+    return json.dumps(
+        {
+            "connection": location,
+            "schema": schema,
+            "table": table_name,
+            "sample": sample,
+            "approx": approx,
+        },
+        sort_keys=True,
+    )
+
+
+def get_fingerprint(conn, table_name, schema=None):
+    """
+    Returns a string that changes when the table changes, or None if we cannot
+    compute it cheaply for the dialect (and thus, the report isn't cached)
+    """
+    dialect = conn.capabilities.sqlglot_dialect
+    database_file = util.get_database_file(conn)
+
+    if database_file:
+        return _fingerprint_database_file(conn, table_name, schema, database_file)
+
+    if dialect in _METADATA_FINGERPRINTS:
+        return _fingerprint_metadata(conn, table_name, schema, dialect)
+
+    return None
+
+
+def _fingerprint_database_file(conn, table_name, schema, database_file):
+    table = f"{schema}.{table_name}" if schema else table_name
+    (count,) = conn.raw_execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+
+    # writes might only go to the write-ahead log until there's a checkpoint, and
+    # DuckDB can query files directly (e.g., SELECT * FROM "data.csv")
+    modified = [
+        util.get_mtime(database_file),
+        util.get_mtime(f"{database_file}-wal"),
+        util.get_mtime(f"{database_file}.wal"),
+        util.get_mtime(table_name.strip("\"'")),
+    ]
+
+    return json.dumps([count, modified])
+
+
+# queries to get the row count and modification time of a table from the catalog.
+# Other databases are not cached since their catalogs aren't updated right away
+# (e.g., MySQL caches information_schema.tables statistics for up to a day, and
+# PostgreSQL updates pg_stat_user_tables asynchronously)
+_METADATA_FINGERPRINTS = {
+    "snowflake": (
+        "SELECT row_count, last_altered FROM information_schema.tables "
+        "WHERE table_name = UPPER(:table) "
+        "AND table_schema = COALESCE(UPPER(:schema), CURRENT_SCHEMA())"
+    ),
+}
+
+
+def _fingerprint_metadata(conn, table_name, schema, dialect):
+    try:
+        row = conn.raw_execute(
+            _METADATA_FINGERPRINTS[dialect],
+            parameters={"table": table_name.strip("\"'"), "schema": schema},
+        ).fetchone()
+    except Exception:
+        return None
+
+    if row is None or any(value is None for value in row):
+        return None
+
+    return json.dumps(list(row), default=str)
@@ -0,0 +1,658 @@
+"""
+Compute the statistics displayed by ``%sqlcmd profile``. Instead of running a few
+queries per column, each statistic is computed for many columns in the same query
+so the table is scanned a constant number of times (regardless of the number of
+columns)
+"""
+import math
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from sqlglot.errors import SqlglotError
+
+from sql import exceptions, query_util
+
+# maximum number of columns whose statistics are computed in a single query (some
+# databases limit the number of expressions in a SELECT clause, e.g., SQLite's
+# default limit is 2000)
+COLUMNS_PER_QUERY = 100
+
+# embedded databases: they already use all cores for a single query and in-memory
+# databases aren't shared across connections, so we always profile sequentially
+SEQUENTIAL_DIALECTS = {"duckdb", "sqlite"}
+
+# dialects that support GROUP BY GROUPING SETS, we use it to find the most frequent
+# value of many columns in a single pass over the table (the rest run one GROUP BY
+# per column)
+GROUPING_SETS_DIALECTS = {
+    "duckdb",
+    "postgres",
+    "snowflake",
+    "tsql",
+    "oracle",
+    "spark",
+    "databricks",
+    "presto",
+    "trino",
+}
+
+# numeric statistics that require stddev_pop and percentile_disc
+SPECIAL_NUMERIC_KEYS = ["std", "25%", "50%", "75%"]
+
+# clauses to sample a table (keys are sqlglot dialects), if a dialect doesn't
+# have a clause to sample a number of rows, we use DEFAULT_SAMPLE_ROWS. Clauses
+# with a {seed} return the same rows every time, so each query of the profile
+# reads the sampled table directly. The rest return different rows each time, so
+# the sample is stored in a temporary table first (see sampled_table)
+SAMPLE_CLAUSES = {
+    "duckdb": {
+        "rows": "USING SAMPLE {amount} ROWS",
+        "percent": "USING SAMPLE {amount}%",
+    },
+    "postgres": {"percent": "TABLESAMPLE SYSTEM ({amount}) REPEATABLE ({seed})"},
+    "tsql": {
+        "rows": "TABLESAMPLE ({amount} ROWS) REPEATABLE ({seed})",
+        "percent": "TABLESAMPLE ({amount} PERCENT) REPEATABLE ({seed})",
+    },
+    "snowflake": {
+        "rows": "SAMPLE ({amount} ROWS)",
+        "percent": "SAMPLE ({amount}) SEED ({seed})",
+    },
+    "bigquery": {
+        "rows": "ORDER BY RAND() LIMIT {amount}",
+        "percent": "TABLESAMPLE SYSTEM ({amount} PERCENT)",
+    },
+    "oracle": {
+        "rows": "ORDER BY DBMS_RANDOM.VALUE FETCH FIRST {amount} ROWS ONLY",
+        "percent": "SAMPLE ({amount}) SEED ({seed})",
+    },
+    "mysql": {"rows": "ORDER BY RAND() LIMIT {amount}"},
+}
+
+DEFAULT_SAMPLE_ROWS = "ORDER BY RANDOM() LIMIT {amount}"
+
+# approximate (sketch-based) versions of COUNT(DISTINCT ...)
+APPROX_COUNT_DISTINCT = {
+    "duckdb": "approx_count_distinct({column})",
+    "snowflake": "APPROX_COUNT_DISTINCT({column})",
+    "bigquery": "APPROX_COUNT_DISTINCT({column})",
+    "tsql": "APPROX_COUNT_DISTINCT({column})",
+    "oracle": "APPROX_COUNT_DISTINCT({column})",
+    "spark": "approx_count_distinct({column})",
+    "databricks": "approx_count_distinct({column})",
+    "redshift": "APPROXIMATE COUNT(DISTINCT {column})",
+}
+
+# approximate versions of percentile_disc
+APPROX_PERCENTILE = {
+    "duckdb": "approx_quantile({column}, {q})",
+    "snowflake": "APPROX_PERCENTILE({column}, {q})",
+    "spark": "percentile_approx({column}, {q})",
+    "databricks": "percentile_approx({column}, {q})",
+    "redshift": "APPROXIMATE percentile_disc({q}) WITHIN GROUP (ORDER BY {column})",
+    "tsql": "APPROX_PERCENTILE_DISC({q}) WITHIN GROUP (ORDER BY {column})",
+}
+
+PERCENTILE = "percentile_disc({q}) WITHIN GROUP (ORDER BY {column})"
+
+# placeholder for the profiled table in queries rendered with sqlglot
+_TABLE = "jupysql_profile_table"
+
+
+def parse_sample(sample):
+    """
+    Parse the value passed to ``--sample``, it can be a number of rows (e.g.,
+    ``1000``) or a percentage (e.g., ``"10%"``)
+
+    Returns
+    -------
+    tuple
+        ``("rows", int)`` or ``("percent", float)``, None if ``sample`` is None
+    """
+    if sample is None:
+        return None
+
+    value = str(sample).strip()
+
+    try:
+        if value.endswith("%"):
+            kind, amount = "percent", float(value[:-1])
+            valid = 0 < amount <= 100
+        else:
+            kind, amount = "rows", int(value)
+            valid = amount > 0
+    except ValueError:
+        valid = False
+
+    if not valid:
+        raise exceptions.UsageError(
+            f"Invalid sample: {sample!r}. Pass a positive number of rows "
+            "(e.g., 1000) or a percentage between 0 and 100 (e.g., 10%)"
+        )
+
+    return kind, amount
+
+
+def sample_table(conn, table_name, sample, seed=0):
+    """
+    Returns a derived table that returns a random sample of ``table_name`` (as
+    returned by ``parse_sample``), using the sampling clause of the dialect
+    """
+    clause = _sample_clause(conn, sample)
+    clause = clause.format(amount=sample[1], seed=seed)
+    return f"(SELECT * FROM {table_name} {clause}) profile_sample"
+
+
+@contextmanager
+def sampled_table(conn, table_name, sample, seed=None):
+    """
+    Yields the table to profile: ``table_name`` if ``sample`` is None, otherwise,
+    a sample that returns the same rows to all the queries of the profile. If the
+    sampling clause of the dialect takes a seed, it's a derived table (see
+    ``sample_table``), otherwise, the sample is stored in a temporary table that
+    is dropped when the block ends (raises a UsageError if the dialect doesn't
+    support temporary tables, e.g., BigQuery)
+    """
+    if sample is None:
+        yield table_name
+        return
+
+    if seed is None:
+        seed = random.randrange(2**31)
+
+    if "{seed}" in _sample_clause(conn, sample):
+        yield sample_table(conn, table_name, sample, seed=seed)
+        return
+
+    if not conn.capabilities.temporary_tables:
+        dialect = conn.capabilities.sqlglot_dialect
+        raise exceptions.UsageError(
+            f"Sampling is not supported for {dialect}: the sampling clause "
+            "returns different rows each time and the sample cannot be stored "
+            "in a temporary table"
+        )
+
+    name = f"profile_sample_{uuid.uuid4().hex[:8]}"
+    query = f"SELECT * FROM {sample_table(conn, table_name, sample, seed=seed)}"
+
+    with conn.temporary_table(name, query) as name:
+        yield name
+
+
+def _sample_clause(conn, sample):
+    kind, _ = sample
+    dialect = conn.capabilities.sqlglot_dialect
+    clauses = SAMPLE_CLAUSES.get(dialect, {})
+
+    if kind == "rows":
+        clause = clauses.get("rows", DEFAULT_SAMPLE_ROWS)
+    elif "percent" in clauses:
+        clause = clauses["percent"]
+    else:
+        raise exceptions.UsageError(
+            f"Sampling a percentage of the rows is not supported for {dialect}, "
+            "pass a number of rows instead (e.g., --sample 1000)"
+        )
+
+    return clause
+
+
+def describe_estimates(conn, computed, sample=None, approx=False):
+    """
+    Returns a dictionary that maps the statistics that are estimates to a
+    description of their error
+
+    Parameters
+    ----------
+    computed : set
+        The statistics that were computed (as returned by ``compute_statistics``)
+
+    sample : tuple, default None
+        The sample (as returned by ``parse_sample``)
+
+    approx : bool, default False
+        Whether approximate algorithms were used
+    """
+    estimates = {}
+    dialect = conn.capabilities.sqlglot_dialect
+
+    if sample is not None:
+        kind, amount = sample
+        size = f"{amount} rows" if kind == "rows" else f"{amount}% of the rows"
+
+        for stat in computed:
+            estimates[stat] = f"computed on a random sample of {size}"
+
+        if "mean" in computed and "std" in computed:
+            estimates["mean"] = (
+                f"{estimates['mean']}, 95% margin of error: "
+                "1.96 &times; std / &radic;count"
+            )
+
+    if approx and "unique" in computed and dialect in APPROX_COUNT_DISTINCT:
+        estimates["unique"] = _join(
+            estimates.get("unique"),
+            "HyperLogLog estimate, relative error usually below 2%",
+        )
+
+    if approx and dialect in APPROX_PERCENTILE:
+        for stat in ["25%", "50%", "75%"]:
+            if stat in computed:
+                estimates[stat] = _join(
+                    estimates.get(stat),
+                    "approximate quantile, rank error usually below 1%",
+                )
+
+    return estimates
+
+
+def _join(first, second):
+    return second if first is None else f"{first}; {second}"
+
+
+def get_columns_and_first_row(conn, table_name):
+    """
+    Returns the column names and the values in the first row of the table (a tuple
+    of None values if the table is empty), we use the values to determine which
+    columns are numeric
+    """
+    result = conn.raw_execute(f"SELECT * FROM {table_name} LIMIT 1")
+
+    if conn.is_dbapi_connection:
+        columns = [i[0] for i in result.description]
+    else:
+        columns = list(result.keys())
+
+    row = result.fetchone()
+
+    if row is None:
+        row = (None,) * len(columns)
+
+    return columns, tuple(row)
+
+
+def compute_statistics(
+    conn,
+    table_name,
+    columns,
+    numeric_columns,
+    sample=None,
+    approx=False,
+    concurrency=None,
+):
+    """
+    Compute the statistics for all the columns in a table
+
+    Parameters
+    ----------
+    conn
+        The connection to use
+
+    table_name : str
+        The table to profile (it might be prefixed by the schema)
+
+    columns : list
+        The names of all the columns
+
+    numeric_columns : list
+        The names of the numeric columns, we compute mean, std and percentiles
+        for them. We compute top and freq for the rest
+
+    sample : tuple, default None
+        If not None, compute the statistics on a random sample of the table (as
+        returned by ``parse_sample``), all the statistics are computed on the
+        same rows (see ``sampled_table``)
+
+    approx : bool, default False
+        Use approximate algorithms (when the dialect supports them) for the
+        number of unique values and percentiles
+
+    concurrency : int, default None
+        Maximum number of queries to run at the same time (each one in a separate
+        connection from the engine's pool). If None, it uses
+        ``SqlMagic.profile_concurrency``
+
+    Returns
+    -------
+    table_stats : dict
+        Maps column names to a dictionary with the statistics
+
+    computed : set
+        Names of the statistics that could be computed for at least one column
+    """
+    categorical_columns = [c for c in columns if c not in numeric_columns]
+    dialect = conn.capabilities.sqlglot_dialect
+
+    if approx and dialect in APPROX_COUNT_DISTINCT:
+        count_distinct = APPROX_COUNT_DISTINCT[dialect]
+    else:
+        count_distinct = "COUNT(DISTINCT {column})"
+
+    if approx and dialect in APPROX_PERCENTILE:
+        percentile = APPROX_PERCENTILE[dialect]
+    elif conn.capabilities.percentile_disc:
+        percentile = PERCENTILE
+    else:
+        percentile = None
+
+    def summary_expressions(column):
+        return [
+            f"MIN({column})",
+            f"MAX({column})",
+            f"COUNT({column})",
+            count_distinct.format(column=column),
+        ]
+
+    def mean_expressions(column):
+        return [f"AVG({column})"]
+
+    def special_expressions(column):
+        return [f"stddev_pop({column})"] + [
+            percentile.format(column=column, q=q) for q in ("0.25", "0.50", "0.75")
+        ]
+
+    special_columns = numeric_columns if percentile is not None else []
+
+    # the concurrency is computed once the sample exists: pooled connections
+    # can't see a sample stored in a temporary table
+    with sampled_table(conn, table_name, sample) as table_name:
+        if concurrency is None:
+            concurrency = get_concurrency(conn)
+
+        # submit all the queries first so they can run concurrently
+        with QueryExecutor(conn, concurrency) as executor:
+            pending = [
+                executor.submit(categorical_columns, *_top_query(table_name, dialect)),
+                executor.submit(columns, *_aggregates(table_name, summary_expressions)),
+                executor.submit(
+                    numeric_columns, *_aggregates(table_name, mean_expressions)
+                ),
+                executor.submit(
+                    special_columns, *_aggregates(table_name, special_expressions)
+                ),
+            ]
+            top, summary, mean, special = [get_results() for get_results in pending]
+
+    table_stats = {column: dict() for column in columns}
+    computed = set()
+
+    for column, values in top.items():
+        if values is not None:
+            table_stats[column]["freq"] = values[1]
+            table_stats[column]["top"] = values[0]
+            computed.update(["freq", "top"])
+
+    for column, values in summary.items():
+        if values is None:
+            continue
+
+        min_, max_, count, unique = values
+
+        computed.update(["count", "min", "max", "unique"])
+        table_stats[column]["count"] = count
+        table_stats[column]["unique"] = unique
+
+        try:
+            table_stats[column]["min"] = round(min_, 4)
+            table_stats[column]["max"] = round(max_, 4)
+        except TypeError:
+            # e.g., numeric values stored as strings
+            pass
+
+    for column, values in mean.items():
+        table_stats[column]["mean"] = math.nan
+
+        if values is not None:
+            computed.add("mean")
+
+            try:
+                table_stats[column]["mean"] = _format_number(values[0])
+            except TypeError:
+                # all values are NULL
+                pass
+
+    for column, values in special.items():
+        for key in SPECIAL_NUMERIC_KEYS:
+            table_stats[column][key] = math.nan
+
+        if values is not None:
+            computed.update(SPECIAL_NUMERIC_KEYS)
+
+            try:
+                formatted = [_format_number(value) for value in values]
+            except TypeError:
+                # e.g., all values are NULL
+                continue
+
+            table_stats[column].update(zip(SPECIAL_NUMERIC_KEYS, formatted))
+
+    return table_stats, computed
+
+
+def _format_number(value):
+    return format(float(value), ".4f")
+
+
+def get_concurrency(conn):
+    """
+    Returns the number of profiling queries that can run at the same time for the
+    connection (``SqlMagic.profile_concurrency``), it's always 1 for DBAPI
+    connections, embedded databases, connections with temporary objects or
+    uncommitted changes (pooled connections can't see them) and connections
+    without autocommit (they aren't pooled, see ``SQLAlchemyConnection.checkout``)
+    """
+    if (
+        conn.is_dbapi_connection
+        or conn.capabilities.sqlglot_dialect in SEQUENTIAL_DIALECTS
+        or conn._config is None
+        or conn.has_session_state
+        or not conn._autocommit
+    ):
+        return 1
+
+    return conn._config.profile_concurrency
+
+
+class QueryExecutor:
+    """
+    Runs the profiling queries. If ``concurrency`` is 1, queries run one after
+    another on the connection. Otherwise, they run in a thread pool and each
+    thread checks out its own connection (see ``SQLAlchemyConnection.checkout``,
+    only available for SQLAlchemy connections)
+
+    Parameters
+    ----------
+    conn
+        The connection to use
+
+    concurrency : int
+        Maximum number of queries to run at the same time
+    """
+
+    def __init__(self, conn, concurrency=1):
+        self._conn = conn
+
+        if concurrency > 1 and not conn.is_dbapi_connection:
+            self._pool = ThreadPoolExecutor(max_workers=concurrency)
+        else:
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def submit(self, columns, build_query, read_results):
+        """
+        Schedule the queries to compute a statistic for the columns (one query per
+        chunk of ``COLUMNS_PER_QUERY`` columns). Returns a function that returns a
+        dictionary that maps column names (in the same order as ``columns``) to
+        the results (None if the query failed for such column)
+        """
+        chunks = [
+            columns[start : start + COLUMNS_PER_QUERY]
+            for start in range(0, len(columns), COLUMNS_PER_QUERY)
+        ]
+
+        if self._pool is None:
+            results = [
+                self._compute(chunk, build_query, read_results) for chunk in chunks
+            ]
+            return lambda: _merge(results)
+
+        futures = [
+            self._pool.submit(self._compute, chunk, build_query, read_results)
+            for chunk in chunks
+        ]
+        return lambda: _merge(future.result() for future in futures)
+
+    def _compute(self, chunk, build_query, read_results):
+        """
+        Run the query for a chunk of columns. If the query fails, we run it once
+        per column so one column (e.g., with an unsupported data type) doesn't
+        prevent computing the statistics of the rest
+        """
+        try:
+            return self._run(chunk, build_query, read_results)
+        except Exception:
+            if len(chunk) == 1:
+                return {chunk[0]: None}
+
+        results = {}
+
+        for column in chunk:
+            try:
+                results.update(self._run([column], build_query, read_results))
+            except Exception:
+                results[column] = None
+
+        return results
+
+    def _run(self, columns, build_query, read_results):
+        query = build_query(columns)
+
+        if self._pool is None:
+            return read_results(self._conn.raw_execute(query), columns)
+
+        with self._conn.checkout(pooled=True) as connection:
+            return read_results(connection.raw_execute(query), columns)
+
+
+def _merge(results):
+    merged = {}
+
+    for result in results:
+        merged.update(result)
+
+    return merged
+
+
+def _aggregates(table_name, expressions):
+    """
+    Returns the functions to build and read the results of a query that computes
+    aggregations over the table. ``expressions`` is a function that takes a column
+    name and returns a list of aggregate SQL expressions
+    """
+
+    def build_query(chunk):
+        select = ",\n".join(
+            expression for column in chunk for expression in expressions(column)
+        )
+        return f"SELECT {select}\nFROM {table_name}"
+
+    def read_results(result, chunk):
+        values = iter(result.fetchone())
+        return {column: [next(values) for _ in expressions(column)] for column in chunk}
+
+    return build_query, read_results
+
+
+def _top_query(table_name, dialect=None):
+    """
+    Returns the functions to build and read the results of a query that computes
+    the most frequent value (and its frequency) of each column. If the dialect
+    supports grouping sets, the table is scanned once for all the columns,
+    otherwise, there's a GROUP BY per column. Queries are rendered for the
+    dialect with sqlglot (e.g., SQL Server uses TOP instead of LIMIT)
+    """
+
+    def build_query_grouping_sets(chunk):
+        grouping = [f"GROUPING({column}) = 0" for column in chunk]
+        column_idx = " ".join(
+            f"WHEN {condition} THEN {idx}" for idx, condition in enumerate(grouping)
+        )
+        frequency = " ".join(
+            f"WHEN {condition} THEN COUNT({column})"
+            for condition, column in zip(grouping, chunk)
+        )
+        tops = ", ".join(f"top_{idx}" for idx in range(len(chunk)))
+        columns = ", ".join(
+            f"{column} AS top_{idx}" for idx, column in enumerate(chunk)
+        )
+        sets = ", ".join(f"({column})" for column in chunk)
+
+        query = (
+            f"SELECT column_idx, {tops}, frequency FROM ("
+            f"SELECT column_idx, {tops}, frequency, ROW_NUMBER() OVER "
+            "(PARTITION BY column_idx ORDER BY frequency DESC) AS rn FROM ("
+            f"SELECT CASE {column_idx} END AS column_idx, {columns}, "
+            f"CASE {frequency} END AS frequency "
+            f"FROM {_TABLE} GROUP BY GROUPING SETS ({sets})"
+            ") AS grouped) AS ranked WHERE rn = 1"
+        )
+        return _render(query, dialect, table_name)
+
+    def read_results_grouping_sets(result, chunk):
+        top = {column: None for column in chunk}
+
+        for idx, *values, frequency in result.fetchall():
+            top[chunk[idx]] = (values[idx], frequency)
+
+        return top
+
+    def build_query(chunk):
+        query = "\nUNION ALL\n".join(
+            f"SELECT {idx} AS column_idx, top, frequency FROM ("
+            f"SELECT {column} AS top, COUNT({column}) AS frequency "
+            f"FROM {_TABLE} GROUP BY {column} "
+            f"ORDER BY frequency DESC LIMIT 1) AS top_{idx}"
+            for idx, column in enumerate(chunk)
+        )
+        return _render(query, dialect, table_name)
+
+    if dialect in GROUPING_SETS_DIALECTS:
+        return build_query_grouping_sets, read_results_grouping_sets
+
+    return build_query, _read_top
+
+
+def _render(query, dialect, table_name):
+    """
+    Render a query for the dialect and replace the ``_TABLE`` placeholder with
+    the table. The table is added after rendering since sqlglot doesn't support
+    all the sampling clauses (e.g., it drops PostgreSQL's TABLESAMPLE). Returns
+    the query as is if sqlglot cannot parse it
+    """
+    if dialect is not None:
+        try:
+            query = query_util.transpile(query, write=dialect, read=dialect)
+        except SqlglotError:
+            pass
+
+    return query.replace(_TABLE, table_name)
+
+
+def _read_top(result, chunk):
+    top = {column: None for column in chunk}
+
+    for idx, value, frequency in result.fetchall():
+        top[chunk[idx]] = (value, frequency)
+
+    return top
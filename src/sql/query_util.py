@@ -1,5 +1,103 @@
-from sqlglot import parse_one, exp
-from sqlglot.errors import ParseError
+from functools import lru_cache
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError, SqlglotError
+
+
+# maximum number of (query, dialect) pairs whose parsed expressions and
+# transpiled strings are kept in memory
+PARSE_CACHE_SIZE = 512
+
+# statements whose tables extract_reads_and_writes can find, the rest (e.g., SET,
+# COPY or PRAGMA) may have side effects we can't see
+_WRITE_STATEMENTS = (exp.Insert, exp.Update, exp.Delete, exp.Drop, exp.AlterTable)
+_CREATE_KINDS = {"TABLE", "VIEW", "INDEX"}
+
+
+def parse(query, dialect=None):
+    """Parse a query with sqlglot. Results are cached by query and dialect, so
+    parsing the same query again (e.g., when re-running a cell, or the internal
+    queries issued by %sqlplot and %sqlcmd) does not parse it again
+
+    Parameters
+    ----------
+    query : str
+        SQL query (may contain more than one statement)
+
+    dialect : str, default None
+        The sqlglot dialect to parse the query with
+
+    Returns
+    -------
+    tuple
+        One sqlglot expression per statement. The expressions are shared with the
+        cache so they must not be modified (use ``.copy()`` first)
+
+    Raises
+    ------
+    sqlglot.errors.ParseError
+        If sqlglot cannot parse the query (errors are not cached)
+    """
+    return _parse(_normalize(query), dialect)
+
+
+def transpile(query, write, read=None):
+    """Translate a query to another dialect, results are cached by query and
+    dialects
+
+    Parameters
+    ----------
+    query : str
+        SQL query (may contain more than one statement)
+
+    write : str
+        The sqlglot dialect to translate the query to
+
+    read : str, default None
+        The sqlglot dialect to parse the query with
+
+    Returns
+    -------
+    str
+        The statements in the ``write`` dialect, separated by ``;\\n``
+    """
+    return _transpile(_normalize(query), write, read)
+
+
+def cache_info():
+    """
+    Returns the hits, misses and size of the parse and transpile caches
+
+    Returns
+    -------
+    dict
+        A dictionary with "parse" and "transpile" keys, each value is a
+        ``functools._CacheInfo`` with ``hits``, ``misses``, ``maxsize`` and
+        ``currsize``
+    """
+    return {"parse": _parse.cache_info(), "transpile": _transpile.cache_info()}
+
+
+def cache_clear():
+    """Clear the parse and transpile caches and reset their counters"""
+    _parse.cache_clear()
+    _transpile.cache_clear()
+
+
+def _normalize(query):
+    # don't touch whitespace inside the query since it might be part of a literal
+    return query.strip()
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(query, dialect):
+    return tuple(sqlglot.parse(query, read=dialect))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _transpile(query, write, read):
+    return ";\n".join([e.sql(dialect=write) for e in _parse(query, read)])
 
 
 def extract_tables_from_query(query):
@@ -18,7 +116,12 @@ def extract_tables_from_query(query):
         [] if error in parsing the query
     """
     try:
-        tables = [table.name for table in parse_one(query).find_all(exp.Table)]
+        expressions = parse(query)
+
+        if not expressions or expressions[0] is None:
+            raise ParseError(f"No expression was parsed from '{query}'")
+
+        tables = [table.name for table in expressions[0].find_all(exp.Table)]
         return tables
     except ParseError:
         # TODO : Instead of returning [] replace with call to
@@ -27,3 +130,64 @@ def extract_tables_from_query(query):
         # fixtures. (#546). This function can also be moved to util.py
         # after #545 is resolved.
         return []
+
+
+def extract_reads_and_writes(statement, dialect=None):
+    """
+    Find the tables that a statement reads and the table it writes
+
+    Parameters
+    ----------
+    statement : str
+        A single SQL statement
+
+    dialect : str, default None
+        The sqlglot dialect to parse the statement with
+
+    Returns
+    -------
+    tuple or None
+        A ``(reads, writes)`` tuple of frozensets with lowercase table names
+        (without the schema, so tables with the same name in different schemas
+        are considered the same table). None if the statement cannot be parsed or
+        it's not a query, ``CREATE TABLE/VIEW/INDEX``, ``INSERT``, ``UPDATE``,
+        ``DELETE``, ``DROP`` or ``ALTER TABLE`` statement. Temporary tables also
+        return None since they're only visible in the connection that creates them
+    """
+    try:
+        expressions = parse(statement, dialect)
+    except SqlglotError:
+        return None
+
+    if len(expressions) != 1 or expressions[0] is None:
+        return None
+
+    expression = expressions[0]
+    # SELECT ... INTO creates a table
+    is_query = isinstance(expression, (exp.Select, exp.Union)) and not (
+        expression.args.get("into")
+    )
+
+    if isinstance(expression, exp.Create):
+        if (
+            expression.args.get("kind") not in _CREATE_KINDS
+            or expression.find(exp.TemporaryProperty) is not None
+        ):
+            return None
+    elif not is_query and not isinstance(expression, _WRITE_STATEMENTS):
+        return None
+
+    # the written table may be wrapped (e.g., in an exp.Schema or exp.Index)
+    target = None if is_query else expression.this.find(exp.Table)
+
+    if not is_query and target is None:
+        return None
+
+    ctes = {cte.alias_or_name.lower() for cte in expression.find_all(exp.CTE)}
+    reads = frozenset(
+        table.name.lower()
+        for table in expression.find_all(exp.Table)
+        if table is not target and table.name.lower() not in ctes
+    )
+    writes = frozenset() if target is None else frozenset([target.name.lower()])
+    return reads, writes
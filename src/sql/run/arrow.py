@@ -0,0 +1,278 @@
+"""
+Columnar storage for ResultSet backed by pyarrow record batches
+"""
+try:
+    import pyarrow as pa
+except ModuleNotFoundError:
+    pa = None
+
+
+# number of rows requested per fetchmany call when fetching all results into
+# the buffer (we never call fetchall to avoid materializing all rows at once)
+ARROW_FETCH_BATCH_SIZE = 10_000
+
+
+class ArrowBuffer:
+    """
+    Stores fetched rows as a list of ``pyarrow.RecordBatch`` objects so a large
+    result set doesn't keep one Python object per row. Each call to ``extend``
+    converts the rows (typically a ``fetchmany`` batch) into a record batch and
+    discards the row objects.
+
+    Parameters
+    ----------
+    field_names : list
+        Column names (must be unique)
+    """
+
+    def __init__(self, field_names):
+        self._field_names = list(field_names)
+        self._batches = []
+        self._types = [None] * len(self._field_names)
+        self._num_rows = 0
+        self._table = None
+
+    def extend(self, rows):
+        """Convert rows into a record batch and append it to the buffer
+
+        Raises
+        ------
+        pyarrow.ArrowException
+            If the values cannot be converted (e.g., a column with mixed types)
+        """
+        rows = list(rows)
+
+        if not rows or not self._field_names:
+            return
+
+        columns = list(zip(*rows))
+        arrays = []
+
+        for idx, values in enumerate(columns):
+            type_ = self._types[idx]
+            array = pa.array(values, type=type_)
+
+            if type_ is None and not pa.types.is_null(array.type):
+                self._types[idx] = array.type
+
+            arrays.append(array)
+
+        self._batches.append(
+            pa.RecordBatch.from_arrays(arrays, names=self._field_names)
+        )
+        self._num_rows += len(rows)
+        self._table = None
+
+    def to_table(self):
+        """Returns a ``pyarrow.Table`` with all the rows in the buffer"""
+        if self._table is not None:
+            return self._table
+
+        schema = pa.schema(
+            [
+                (name, type_ or pa.null())
+                for name, type_ in zip(self._field_names, self._types)
+            ]
+        )
+
+        batches = [_cast_null_columns(batch, schema) for batch in self._batches]
+        self._table = pa.Table.from_batches(batches, schema=schema)
+        return self._table
+
+    def columns(self):
+        """Returns a list with one tuple of values per column"""
+        return [tuple(column.to_pylist()) for column in self.to_table().columns]
+
+    def to_rows(self):
+        """Returns a list of tuples (one per row)"""
+        return list(self)
+
+    def __len__(self):
+        return self._num_rows
+
+    def __iter__(self):
+        for batch in self._batches:
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+    def __getitem__(self, key):
+        table = self.to_table()
+
+        if isinstance(key, slice):
+            return [self._row_at(table, idx) for idx in range(self._num_rows)[key]]
+
+        if not isinstance(key, int):
+            raise TypeError(
+                f"ArrowBuffer indices must be integers or slices, not {type(key)}"
+            )
+
+        if key < 0:
+            key += self._num_rows
+
+        if not 0 <= key < self._num_rows:
+            raise IndexError("ArrowBuffer index out of range")
+
+        return self._row_at(table, key)
+
+    def __eq__(self, other):
+        return self.to_rows() == other
+
+    @staticmethod
+    def _row_at(table, idx):
+        return tuple(column[idx].as_py() for column in table.columns)
+
+
+def _cast_null_columns(batch, schema):
+    """
+    Replace columns that were all NULL when the batch was created with NULL arrays
+    of the type inferred from the other batches
+    """
+    if batch.schema.equals(schema):
+        return batch
+
+    arrays = [
+        pa.nulls(len(column), type=field.type)
+        if pa.types.is_null(column.type)
+        else column
+        for column, field in zip(batch.columns, schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ArrowResultProxy:
+    """
+    Pretends to be a DBAPI cursor but fetches rows from the record batches returned
+    by an Arrow-native driver. Batches are kept after reading them so the full
+    results can be returned as a ``pyarrow.Table`` without running the query again
+
+    Parameters
+    ----------
+    cursor
+        The cursor (or SQLAlchemy result) that produced the results
+
+    batches : iterable
+        Iterable of ``pyarrow.RecordBatch`` (e.g., a ``pyarrow.RecordBatchReader``)
+    """
+
+    def __init__(self, cursor, batches):
+        self._cursor = cursor
+        self._schema = getattr(batches, "schema", None)
+        self._batches = iter(batches)
+        self._read = []
+        self._retain = True
+        self._exhausted = False
+        # position of the next row to return: index in self._read and offset
+        self._idx = 0
+        self._offset = 0
+
+        description = getattr(cursor, "description", None)
+
+        # sqlalchemy results don't have a description
+        if description is None:
+            description = [(key,) for key in cursor.keys()]
+
+        self.description = description
+        self.rowcount = getattr(cursor, "rowcount", -1)
+
+    def keys(self):
+        return [column[0] for column in self.description]
+
+    def _read_batch(self):
+        """Read the next batch from the driver, returns False if there are no more"""
+        if self._exhausted:
+            return False
+
+        try:
+            batch = next(self._batches)
+        except StopIteration:
+            self._exhausted = True
+            return False
+
+        self._read.append(batch)
+        return True
+
+    def _iter_rows(self, size=None):
+        remaining = size
+
+        while remaining is None or remaining > 0:
+            if self._idx == len(self._read) and not self._read_batch():
+                return
+
+            batch = self._read[self._idx]
+            available = batch.num_rows - self._offset
+
+            if available <= 0:
+                if self._retain:
+                    self._idx += 1
+                else:
+                    del self._read[self._idx]
+
+                self._offset = 0
+                continue
+
+            length = available if remaining is None else min(remaining, available)
+            chunk = batch.slice(self._offset, length)
+            self._offset += length
+
+            if remaining is not None:
+                remaining -= length
+
+            yield from zip(*(_to_pylist(column) for column in chunk.columns))
+
+    def fetchmany(self, size=1):
+        return list(self._iter_rows(size))
+
+    def fetchall(self):
+        return list(self._iter_rows())
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def stop_retaining(self):
+        """
+        Discard the batches once all their rows have been fetched, after calling
+        this, ``fetch_arrow_table`` no longer returns the fetched rows
+        """
+        self._retain = False
+        del self._read[: self._idx]
+        self._idx = 0
+
+    def fetch_arrow_table(self):
+        """
+        Returns a ``pyarrow.Table`` with all the results (including the rows that
+        were already fetched). Rows that haven't been fetched can still be fetched
+        after calling this
+        """
+        while self._read_batch():
+            pass
+
+        if self._read:
+            return pa.Table.from_batches(self._read)
+        elif self._schema is not None:
+            return self._schema.empty_table()
+        else:
+            return pa.table({key: pa.array([]) for key in self.keys()})
+
+    def close(self):
+        self._cursor.close()
+
+
+def _to_pylist(column):
+    """
+    Convert an arrow column into a list of Python values of the same types the
+    driver returns when fetching rows. DuckDB returns HUGEINT (e.g., the results of
+    SUM on integers) and Snowflake returns NUMBER(38, 0) as ``decimal128(38, 0)``,
+    but both drivers return ``int``
+    """
+    type_ = column.type
+
+    if pa.types.is_decimal(type_) and type_.precision == 38 and type_.scale == 0:
+        try:
+            return column.cast(pa.int64()).to_pylist()
+        except pa.ArrowInvalid:
+            # values that don't fit in an int64
+            return [
+                None if value is None else int(value) for value in column.to_pylist()
+            ]
+
+    return column.to_pylist()
@@ -0,0 +1,198 @@
+"""
+Handles to queries that run in the background (``%%sql --async``)
+"""
+import asyncio
+import html
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(thread_name_prefix="jupysql-async")
+
+    return _executor
+
+
+class QueryHandle:
+    """
+    A query running in a background thread. Queries run in a connection borrowed
+    from the pool of the ``%sql`` connection, so other queries don't wait for
+    them. If the pool can't see the temporary tables or uncommitted changes of
+    the ``%sql`` connection (or it's an in-memory database), they run in the
+    ``%sql`` connection and other queries wait for them to finish (see
+    ``SQLAlchemyConnection.checkout``)
+
+    Parameters
+    ----------
+    conn : sql.connection.AbstractConnection
+        The connection that runs the query
+
+    sql : str
+        The SQL code (only used to display the handle)
+
+    run : callable
+        Function that runs the query and returns the result, it's called with
+        two keyword arguments: ``on_checkout`` (to call with the borrowed
+        connection) and ``on_rows`` (to call with the ``ResultSet`` after fetching
+        each batch of rows), the handle uses them to interrupt the query and to
+        display the rows fetched so far
+    """
+
+    def __init__(self, conn, sql, run):
+        self._conn = conn
+        self._sql = sql
+        self._run = run
+        self._started = None
+        self._finished = None
+        self._interrupted = False
+        self._connection = None
+        self._preview = None
+        self._future = _get_executor().submit(self._target)
+
+    def _target(self):
+        self._started = perf_counter()
+
+        try:
+            return self._run(on_checkout=self._on_checkout, on_rows=self._on_rows)
+        finally:
+            self._finished = perf_counter()
+
+    def _on_checkout(self, connection):
+        self._connection = connection
+
+    def _on_rows(self, result_set):
+        """
+        Store a copy of the first rows (up to displaylimit) fetched so far, it's
+        copied in the query's thread, so displaying the handle doesn't read the
+        rows while they're being fetched
+        """
+        displaylimit = result_set._config.displaylimit
+
+        if self._preview is None or len(self._preview[1]) < displaylimit:
+            rows = list(result_set._displayed_rows())
+        else:
+            rows = self._preview[1]
+
+        self._preview = (result_set, rows, len(result_set._results))
+
+    @property
+    def status(self):
+        """
+        One of: 'pending' (waiting for a thread), 'running', 'done', 'failed'
+        or 'cancelled'
+        """
+        if self._future.cancelled():
+            return "cancelled"
+
+        if not self._future.done():
+            return "pending" if self._started is None else "running"
+
+        if self._future.exception() is None:
+            return "done"
+
+        return "cancelled" if self._interrupted else "failed"
+
+    @property
+    def elapsed(self):
+        """Seconds since the query started running (0 if it hasn't started)"""
+        if self._started is None:
+            return 0.0
+
+        end = self._finished if self._finished is not None else perf_counter()
+        return end - self._started
+
+    def done(self):
+        """Returns True if the query finished, failed or was cancelled"""
+        return self._future.done()
+
+    def result(self, timeout=None):
+        """
+        Wait for the query to finish and return its result (a ``ResultSet`` or a
+        data frame). Raises the query's error if it failed
+
+        Parameters
+        ----------
+        timeout : float, default None
+            Maximum number of seconds to wait (raises ``TimeoutError``)
+        """
+        return self._future.result(timeout=timeout)
+
+    def cancel(self):
+        """
+        Cancel the query. If it's already running, interrupt it (only supported
+        by some drivers). Returns False if the query cannot be cancelled
+        """
+        if self._future.cancel():
+            return True
+
+        if self._future.done():
+            return False
+
+        connection = self._connection if self._connection is not None else self._conn
+        self._interrupted = connection.interrupt()
+        return self._interrupted
+
+    def __await__(self):
+        return asyncio.wrap_future(self._future).__await__()
+
+    def _summary(self):
+        return f"status={self.status!r}, elapsed={self.elapsed:.1f}s"
+
+    def _error(self):
+        if not self._future.done() or self._future.cancelled():
+            return None
+
+        return self._future.exception()
+
+    def _render_preview(self, html):
+        """Render the rows fetched so far (None if there aren't any)"""
+        if self._preview is None or self.done():
+            return None
+
+        result_set, rows, num_rows = self._preview
+        table = result_set._table.render(rows, html=html)
+        footer = f"{num_rows} rows fetched so far"
+
+        if html:
+            return f'{table}\n<span style="font-style:italic;">{footer}</span>'
+
+        return f"{table}\n{footer}"
+
+    def __repr__(self):
+        text = f"QueryHandle({self._summary()})"
+        preview = self._render_preview(html=False)
+
+        if self.status == "done":
+            text += f"\n{self.result()!r}"
+        elif self._error() is not None:
+            text += f"\n{type(self._error()).__name__}: {self._error()}"
+        elif preview is not None:
+            text += f"\n{preview}"
+
+        return text
+
+    def _repr_html_(self):
+        header = (
+            "<p><strong>Background query</strong> "
+            f"({html.escape(self._summary())})</p>"
+        )
+
+        if self.status == "done":
+            result = self.result()
+            repr_html = getattr(result, "_repr_html_", None)
+            body = (
+                repr_html() if repr_html else f"<pre>{html.escape(repr(result))}</pre>"
+            )
+        elif self._error() is not None:
+            error = self._error()
+            body = f"<pre>{html.escape(f'{type(error).__name__}: {error}')}</pre>"
+        else:
+            preview = self._render_preview(html=True)
+            body = preview or f"<pre>{html.escape(self._sql.strip())}</pre>"
+
+        return header + body
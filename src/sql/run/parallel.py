@@ -0,0 +1,216 @@
+"""
+Run the independent statements of a cell at the same time
+(``%config SqlMagic.statement_concurrency``)
+"""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import sqlalchemy
+
+from sql import query_util
+
+# sqlite allows a single writer, so its statements run one after another
+SEQUENTIAL_DIALECTS = {"sqlite"}
+
+# queries that list the views of all the schemas (keys are sqlglot dialects), the
+# rest use SQLAlchemy's inspector. Some versions of the dialects' inspectors don't
+# return the views (e.g., duckdb-engine with duckdb 0.7)
+_INFORMATION_SCHEMA_VIEWS = (
+    "SELECT table_name FROM information_schema.tables WHERE table_type LIKE '%VIEW'"
+)
+
+VIEW_QUERIES = {
+    "duckdb": _INFORMATION_SCHEMA_VIEWS,
+    "mysql": _INFORMATION_SCHEMA_VIEWS,
+    "tsql": _INFORMATION_SCHEMA_VIEWS,
+    "snowflake": _INFORMATION_SCHEMA_VIEWS,
+    "redshift": _INFORMATION_SCHEMA_VIEWS,
+    "trino": _INFORMATION_SCHEMA_VIEWS,
+    "presto": _INFORMATION_SCHEMA_VIEWS,
+    # information_schema doesn't list materialized views
+    "postgres": (
+        f"{_INFORMATION_SCHEMA_VIEWS} UNION SELECT matviewname FROM pg_matviews"
+    ),
+}
+
+_CREATE_VIEW = re.compile(
+    r"\bCREATE\s+(?:OR\s+REPLACE\s+)?(?:MATERIALIZED\s+)?VIEW\b", re.IGNORECASE
+)
+
+
+def get_concurrency(conn, config):
+    """
+    Returns the number of statements that can run at the same time in the
+    connection (``SqlMagic.statement_concurrency``), it's always 1 for DBAPI
+    connections, in-memory databases, SQLite, connections with temporary
+    objects or uncommitted changes (pooled connections can't see them) and
+    connections without autocommit (they aren't pooled)
+    """
+    if (
+        conn.is_dbapi_connection
+        or conn.is_in_memory
+        or conn.capabilities.sqlglot_dialect in SEQUENTIAL_DIALECTS
+        or conn.has_session_state
+        or not conn._autocommit
+    ):
+        return 1
+
+    return config.statement_concurrency
+
+
+def get_view_names(conn):
+    """
+    Returns the lowercase names of the views in all the schemas of the database
+    (None if they cannot be listed). They're listed in a connection from the
+    engine's pool, so we don't start a transaction in the connection (e.g.,
+    DuckDB wouldn't see the tables created by the pooled connections).
+
+    Dialects in ``VIEW_QUERIES`` query the database, the rest use SQLAlchemy's
+    inspector, which might not return the views, so we return None if it
+    doesn't find any (and the statements run one after another)
+    """
+    query = VIEW_QUERIES.get(conn.capabilities.sqlglot_dialect)
+
+    try:
+        with conn.connection_sqlalchemy.engine.connect() as connection:
+            if query is not None:
+                rows = connection.execute(sqlalchemy.text(query)).fetchall()
+                return frozenset(name.lower() for (name,) in rows)
+
+            inspector = sqlalchemy.inspect(connection)
+            names = frozenset(
+                name.lower()
+                for schema in inspector.get_schema_names()
+                for name in inspector.get_view_names(schema=schema)
+            )
+    except Exception:
+        return None
+
+    return names or None
+
+
+def find_dependencies(statements, dialect=None, views=frozenset()):
+    """
+    Find the statements that each statement must wait for: the previous ones
+    that write a table it reads or writes, or read a table it writes
+
+    Parameters
+    ----------
+    statements : list of str
+        The statements in the order they appear in the cell
+
+    dialect : str, default None
+        The sqlglot dialect to parse the statements with
+
+    views : frozenset, default frozenset()
+        Lowercase names of the views in the database (see ``get_view_names``)
+
+    Returns
+    -------
+    list or None
+        A list with the indexes of the dependencies of each statement. None if
+        any statement is not supported by ``query_util.extract_reads_and_writes``
+        (e.g., a ``SET`` statement), creates a view or reads or writes one in
+        ``views`` (we don't know the tables that a view reads), in such case,
+        the statements must run one after another
+    """
+    accesses = []
+
+    for statement in statements:
+        if _CREATE_VIEW.search(statement):
+            return None
+
+        access = query_util.extract_reads_and_writes(statement, dialect)
+
+        if access is None or (access[0] | access[1]) & views:
+            return None
+
+        accesses.append(access)
+
+    dependencies = []
+
+    for index, (reads, writes) in enumerate(accesses):
+        dependencies.append(
+            [
+                previous
+                for previous, (previous_reads, previous_writes) in enumerate(
+                    accesses[:index]
+                )
+                if writes & (previous_reads | previous_writes)
+                or reads & previous_writes
+            ]
+        )
+
+    return dependencies
+
+
+def run_concurrently(conn, statements, dependencies, concurrency, parameters=None):
+    """
+    Run the statements in a thread pool, each one in a connection borrowed from
+    the engine's pool (see ``SQLAlchemyConnection.checkout``). A statement starts
+    once its dependencies finish. If a statement fails, the ones that haven't
+    started are skipped and the error of the first failed statement (in the
+    order of the cell) is raised
+
+    Parameters
+    ----------
+    conn : sql.connection.SQLAlchemyConnection
+        The connection to use
+
+    statements : list of str
+        The statements to run
+
+    dependencies : list
+        The indexes of the dependencies of each statement (see
+        ``find_dependencies``)
+
+    concurrency : int
+        Maximum number of statements to run at the same time
+
+    parameters : dict, default None
+        Parameters to use in the statements
+
+    Returns
+    -------
+    list
+        The number of rows affected by each statement (-1 if unknown)
+    """
+    failed = threading.Event()
+
+    def run(index):
+        # the pool runs the statements in order, so the dependencies of a
+        # statement are already running (or finished) when it waits for them
+        for dependency in dependencies[index]:
+            futures[dependency].exception()
+
+        if failed.is_set():
+            return None
+
+        try:
+            with conn.checkout(pooled=True) as connection:
+                # let interrupt() (e.g., from a statement timeout) reach it
+                conn._running_checkouts.add(connection)
+
+                try:
+                    result = connection.raw_execute(
+                        statements[index], parameters=parameters
+                    )
+                    return getattr(result, "rowcount", -1)
+                finally:
+                    conn._running_checkouts.discard(connection)
+        except Exception:
+            failed.set()
+            raise
+
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index in range(len(statements)):
+            futures.append(pool.submit(run, index))
+
+    for future in futures:
+        if future.exception() is not None:
+            raise future.exception()
+
+    return [future.result() for future in futures]
@@ -1,8 +1,7 @@
-import re
 import operator
 from functools import reduce
+from itertools import chain
 from io import StringIO
-from html import unescape
 from collections.abc import Iterable
 
 
@@ -10,34 +9,46 @@ import prettytable
 
 from sql.column_guesser import ColumnGuesserMixin
 from sql.run.csv import CSVWriter, CSVResultDescriptor
+from sql.run.arrow import ArrowBuffer, ArrowResultProxy, ARROW_FETCH_BATCH_SIZE, pa
+from sql.connection.capabilities import get_arrow_batches
 from sql.telemetry import telemetry
-from sql.run.table import CustomPrettyTable
+from sql import exceptions
+from sql.run.table import TableRenderer
 from sql._current import _config_feedback_all
 
 
 class ResultSet(ColumnGuesserMixin):
     """
     Results of a SQL query. Fetches rows lazily (only the necessary rows to show the
-    preview based on the current configuration)
+    preview based on the current configuration). If ``pooled`` is True, the
+    results come from a connection borrowed from ``conn``'s pool, so other queries
+    in ``conn`` don't affect them
     """
 
-    def __init__(self, sqlaproxy, config, statement=None, conn=None):
+    def __init__(self, sqlaproxy, config, statement=None, conn=None, pooled=False):
         self._closed = False
         self._config = config
         self._statement = statement
-        self._sqlaproxy = sqlaproxy
         self._conn = conn
-        self._dialect = conn._get_sqlglot_dialect()
+        self._pooled = pooled
+
+        self._sqlaproxy = self._wrap_arrow_results(sqlaproxy)
+        self._dialect = conn.capabilities.sqlglot_dialect
         self._keys = None
         self._field_names = None
-        self._results = []
         # https://peps.python.org/pep-0249/#description
         self._is_dbapi_results = hasattr(sqlaproxy, "description")
 
         # note that calling this will fetch the keys
-        self._pretty_table = self._init_table()
+        self._table = self._init_table()
+
+        if self._config.result_storage == "arrow":
+            self._results = ArrowBuffer(self.field_names)
+        else:
+            self._results = []
 
         self._mark_fetching_as_done = False
+        self._streamed = False
 
         if self._config.autolimit == 1:
             # if autolimit is 1, we only want to fetch one row
@@ -52,9 +63,24 @@ class ResultSet(ColumnGuesserMixin):
 
         self._finished_init = True
 
-        if conn:
+        if conn and not pooled:
             conn._result_sets.append(self)
 
+    def _wrap_arrow_results(self, sqlaproxy):
+        """
+        If the driver returns results as arrow, read them through the record
+        batches so we can build data frames without running the query again
+        """
+        if not self._conn.capabilities.arrow:
+            return sqlaproxy
+
+        batches = get_arrow_batches(sqlaproxy, dialect=self._conn.dialect)
+
+        if batches is None:
+            return sqlaproxy
+
+        return ArrowResultProxy(sqlaproxy, batches)
+
     @property
     def sqlaproxy(self):
         conn = self._conn
@@ -64,7 +90,9 @@ class ResultSet(ColumnGuesserMixin):
         # so we need to check for that and re-open the results if needed
         if conn.dialect == "mssql" and conn.driver == "pyodbc" and self._closed:
             self._conn._result_sets.close_all()
-            self._sqlaproxy = self._conn.raw_execute(self._statement)
+            self._sqlaproxy = self._wrap_arrow_results(
+                self._conn.raw_execute(self._statement)
+            )
             self._sqlaproxy.fetchmany(size=len(self._results))
             self._conn._result_sets.append(self)
 
@@ -83,9 +111,12 @@ class ResultSet(ColumnGuesserMixin):
             hasattr(self, "_finished_init")
             # this only applies to duckdb + sqlalchemy with outdated results
             and is_duckdb_sqlalchemy
+            and not self._pooled
             and not is_last_result
         ):
-            self._sqlaproxy = self._conn.raw_execute(self._statement)
+            self._sqlaproxy = self._wrap_arrow_results(
+                self._conn.raw_execute(self._statement)
+            )
             self._sqlaproxy.fetchmany(size=len(self._results))
 
             # ensure we make his result set the last one
@@ -95,11 +126,19 @@ class ResultSet(ColumnGuesserMixin):
 
     def _extend_results(self, elements):
         """Store the DB fetched results into the internal list of results"""
-        to_add = self._config.displaylimit - len(self._results)
-        self._results.extend(elements)
-        self._pretty_table.add_rows(
-            elements if self._config.displaylimit == 0 else elements[:to_add]
-        )
+        if self._is_columnar():
+            try:
+                self._results.extend(elements)
+            except pa.ArrowException:
+                # values that arrow cannot represent (e.g., a column with mixed
+                # types in SQLite), switch to storing rows for this result set
+                self._results = self._results.to_rows() + list(elements)
+        else:
+            self._results.extend(elements)
+
+    def _is_columnar(self):
+        """True if the fetched rows are stored in an ArrowBuffer"""
+        return isinstance(self._results, ArrowBuffer)
 
     def mark_fetching_as_done(self):
         self._mark_fetching_as_done = True
@@ -142,9 +181,15 @@ class ResultSet(ColumnGuesserMixin):
 
         return self._keys
 
+    def _displayed_rows(self):
+        if self._config.displaylimit == 0:
+            return self._results
+
+        return self._results[: self._config.displaylimit]
+
     def _repr_html_(self):
         self.fetch_for_repr_if_needed()
-        result = self._pretty_table.get_html_string()
+        result = self._table.render(self._displayed_rows(), html=True)
         return self._add_footer(result, html=True)
 
     def _add_footer(self, result, *, html):
@@ -167,11 +212,6 @@ class ResultSet(ColumnGuesserMixin):
 
             result = f"{result}{data_frame_footer}"
 
-        # to create clickable links
-        result = unescape(result)
-        _cell_with_spaces_pattern = re.compile(r"(<td>)( {2,})")
-        result = _cell_with_spaces_pattern.sub(_nonbreaking_spaces, result)
-
         if self._config.displaylimit != 0 and not self._done_fetching():
             displaylimit_footer = (
                 (
@@ -201,7 +241,7 @@ class ResultSet(ColumnGuesserMixin):
 
     def __str__(self):
         self.fetch_for_repr_if_needed()
-        result = str(self._pretty_table)
+        result = self._table.render(self._displayed_rows(), html=False)
         return self._add_footer(result, html=False)
 
     def __repr__(self) -> str:
@@ -233,10 +273,90 @@ class ResultSet(ColumnGuesserMixin):
         )
         raise AttributeError(err_msg)
 
+    def iter_batches(self, size=1000):
+        """Iterate over the results in lists of at most ``size`` rows
+
+        Rows are fetched from the database as the iterator advances and they are
+        not stored in the result set, so this can process results that don't fit
+        in memory. The results can only be consumed once: after calling this,
+        methods that need all the rows (e.g., ``len()``, ``.DataFrame()``) raise
+        an error
+        """
+        if not isinstance(size, int) or size < 1:
+            raise exceptions.ValueError(
+                f"size must be a positive integer, got: {size!r}"
+            )
+
+        self._raise_if_streamed()
+
+        # NOTE: use the property since it refreshes outdated results
+        sqlaproxy = self.sqlaproxy
+        exhausted = self._done_fetching()
+
+        self._streamed = True
+        self.mark_fetching_as_done()
+
+        if isinstance(sqlaproxy, ArrowResultProxy):
+            sqlaproxy.stop_retaining()
+
+        return self._iter_batches(sqlaproxy, list(self._results), size, exhausted)
+
+    def iter_rows(self, size=1000):
+        """Iterate over the results one row at a time, fetching ``size`` rows
+        from the database at once. Same as ``iter_batches``, the rows are not
+        stored and the results can only be consumed once
+        """
+        return chain.from_iterable(self.iter_batches(size))
+
+    def _iter_batches(self, sqlaproxy, rows, size, exhausted):
+        autolimit = self._config.autolimit
+        remaining = autolimit - len(rows) if autolimit else None
+        exhausted = exhausted or (remaining is not None and remaining <= 0)
+
+        # the rows we fetched for the preview go first
+        batch = rows
+
+        while len(batch) >= size:
+            yield batch[:size]
+            batch = batch[size:]
+
+        while not exhausted:
+            to_fetch = size - len(batch)
+
+            if remaining is not None:
+                to_fetch = min(to_fetch, remaining)
+
+            returned = sqlaproxy.fetchmany(size=to_fetch)
+            batch.extend(returned)
+
+            if remaining is not None:
+                remaining -= len(returned)
+
+            exhausted = len(returned) < to_fetch or remaining == 0
+
+            if len(batch) == size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def _raise_if_streamed(self):
+        if self._streamed:
+            raise exceptions.RuntimeError(
+                "The results have already been consumed by "
+                "iter_batches() or iter_rows(), run the query again to "
+                "retrieve them"
+            )
+
     def dict(self):
         """Returns a single dict built from the result set
 
         Keys are column names; values are a tuple"""
+        if self._is_columnar():
+            self.fetchall()
+            return dict(zip(self.keys, self._results.columns()))
+
         return dict(zip(self.keys, zip(*self)))
 
     def dicts(self):
@@ -245,19 +365,38 @@ class ResultSet(ColumnGuesserMixin):
             yield dict(zip(self.keys, row))
 
     @telemetry.log_call("data-frame", payload=True)
-    def DataFrame(self, payload):
-        """Returns a Pandas DataFrame instance built from the result set."""
+    def DataFrame(self, payload, chunksize=None):
+        """Returns a Pandas DataFrame instance built from the result set.
+
+        If ``chunksize`` is passed, returns a generator of data frames with at most
+        ``chunksize`` rows each instead (see ``iter_batches``)
+        """
         payload["connection_info"] = self._conn._get_database_information()
         import pandas as pd
 
+        if chunksize is not None:
+            return _iter_data_frames(
+                self, chunksize, pd.DataFrame, {"columns": self.keys}
+            )
+
         return _convert_to_data_frame(self, "df", pd.DataFrame)
 
     @telemetry.log_call("polars-data-frame")
-    def PolarsDataFrame(self, **polars_dataframe_kwargs):
-        """Returns a Polars DataFrame instance built from the result set."""
+    def PolarsDataFrame(self, chunksize=None, **polars_dataframe_kwargs):
+        """Returns a Polars DataFrame instance built from the result set.
+
+        If ``chunksize`` is passed, returns a generator of data frames with at most
+        ``chunksize`` rows each instead (see ``iter_batches``)
+        """
         import polars as pl
 
         polars_dataframe_kwargs["schema"] = self.keys
+
+        if chunksize is not None:
+            return _iter_data_frames(
+                self, chunksize, pl.DataFrame, polars_dataframe_kwargs
+            )
+
         return _convert_to_data_frame(self, "pl", pl.DataFrame, polars_dataframe_kwargs)
 
     @telemetry.log_call("pie")
@@ -411,6 +550,10 @@ class ResultSet(ColumnGuesserMixin):
                 self.mark_fetching_as_done()
 
     def fetch_for_repr_if_needed(self):
+        # the results were consumed by iter_batches(), show the preview
+        if self._streamed:
+            return
+
         if self._config.displaylimit == 0:
             self.fetchall()
 
@@ -420,18 +563,24 @@ class ResultSet(ColumnGuesserMixin):
             self.fetchmany(missing)
 
     def fetchall(self):
-        if not self._done_fetching():
+        self._raise_if_streamed()
+
+        if self._is_columnar():
+            # fetch in batches so we never hold all the rows as Python objects
+            while not self._done_fetching():
+                self.fetchmany(ARROW_FETCH_BATCH_SIZE)
+
+        elif not self._done_fetching():
             self._extend_results(self.sqlaproxy.fetchall())
             self.mark_fetching_as_done()
 
     def _init_table(self):
-        pretty = CustomPrettyTable(self.field_names)
-
         if isinstance(self._config.style, str):
-            _style = prettytable.__dict__[self._config.style.upper()]
-            pretty.set_style(_style)
+            style = prettytable.__dict__[self._config.style.upper()]
+        else:
+            style = None
 
-        return pretty
+        return TableRenderer(self.field_names, style=style)
 
     def close(self):
         self._sqlaproxy.close()
@@ -455,59 +604,82 @@ def _convert_to_data_frame(
     result_set, converter_name, constructor, constructor_kwargs=None
 ):
     """
-    Convert the result set to a pandas DataFrame, using native DuckDB methods if
-    possible
+    Convert the result set to a pandas or polars DataFrame. If the driver returned
+    the results as arrow, the data frame is built from the record batches,
+    otherwise, from the fetched rows. The statement is never executed again
     """
     constructor_kwargs = constructor_kwargs or {}
 
-    # maybe create accessors in the connection objects?
-    if result_set._conn.is_dbapi_connection:
-        native_connection = result_set.sqlaproxy
-    else:
-        native_connection = result_set._conn._connection.connection
+    result_set._raise_if_streamed()
 
-    has_converter_method = hasattr(native_connection, converter_name)
+    # NOTE: use the property since it refreshes outdated results
+    sqlaproxy = result_set.sqlaproxy
 
-    # native duckdb connection
-    if has_converter_method:
-        # we need to re-execute the statement because if we fetched some rows
-        # already, .df() will return None. But only if it's a select statement
-        # otherwise we might end up re-execute INSERT INTO or CREATE TABLE
-        # statements
-        is_select = _statement_is_select(result_set._statement)
+    if isinstance(sqlaproxy, ArrowResultProxy):
+        table = sqlaproxy.fetch_arrow_table()
+        return _arrow_to_data_frame(
+            table, table.column_names, converter_name, constructor, constructor_kwargs
+        )
 
-        if is_select:
-            native_connection.execute(result_set._statement)
+    if result_set._is_columnar():
+        result_set.fetchall()
 
-        return getattr(native_connection, converter_name)()
-    else:
-        if converter_name == "df":
-            constructor_kwargs["columns"] = result_set.keys
+        # the result set might have switched to storing rows if arrow could not
+        # represent the values
+        if result_set._is_columnar():
+            # the buffer stores the unique field names
+            table = result_set._results.to_table()
+            return _arrow_to_data_frame(
+                table, result_set.keys, converter_name, constructor, constructor_kwargs
+            )
 
-        frame = constructor(
-            (tuple(row) for row in result_set),
-            **constructor_kwargs,
-        )
+    if converter_name == "df":
+        constructor_kwargs["columns"] = result_set.keys
 
-        return frame
+    frame = constructor(
+        (tuple(row) for row in result_set),
+        **constructor_kwargs,
+    )
 
+    return frame
 
-def _nonbreaking_spaces(match_obj):
-    """
-    Make spaces visible in HTML by replacing all `` `` with ``&nbsp;``
 
-    Call with a ``re`` match object.  Retain group 1, replace group 2
-    with nonbreaking spaces.
+def _arrow_to_data_frame(table, names, converter_name, constructor, constructor_kwargs):
     """
-    spaces = "&nbsp;" * len(match_obj.group(2))
-    return "%s%s" % (match_obj.group(1), spaces)
+    Convert an arrow table with the results to a data frame whose columns are
+    called ``names``, which might have duplicates like the data frames built from
+    rows (e.g., ``SELECT 1 AS a, 2 AS a``). Arrow conversions don't handle
+    duplicate names, so the table uses unique names and the columns are renamed
+    afterwards (polars raises an error if there are duplicates, like it does when
+    building the data frame from rows)
+    """
+    names = list(names)
+    table = table.rename_columns(unduplicate_field_names(names))
 
+    if converter_name == "df":
+        frame = table.to_pandas()
+    else:
+        kwargs = {k: v for k, v in constructor_kwargs.items() if k != "schema"}
+        frame = constructor(table, **kwargs)
 
-def _statement_is_select(statement):
-    statement_ = statement.lower().strip()
-    # duckdb also allows FROM without SELECT
-    return (
-        statement_.startswith("select")
-        or statement_.startswith("from")
-        or statement_.startswith("with")
-    )
+    frame.columns = names
+    return frame
+
+
+def _iter_data_frames(result_set, chunksize, constructor, constructor_kwargs):
+    """
+    Returns a generator of data frames built from successive batches of at most
+    ``chunksize`` rows
+    """
+    batches = result_set.iter_batches(chunksize)
+
+    # NOTE: iter_batches validates chunksize and consumes the results, so we call
+    # it before returning the generator
+    def frames():
+        for batch in batches:
+            yield constructor(
+                (tuple(row) for row in batch),
+                **constructor_kwargs,
+            )
+
+    return frames()
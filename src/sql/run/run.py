@@ -1,13 +1,19 @@
+import sys
+from collections.abc import Iterable, Mapping
+from itertools import islice
+
 import sqlparse
 
 from sql import exceptions, display
+from sql.run import parallel
+from sql.run.arrow import ARROW_FETCH_BATCH_SIZE
 from sql.run.resultset import ResultSet
 from sql.run.pgspecial import handle_postgres_special
 
 
 # TODO: conn also has access to config, we should clean this up to provide a clean
 # way to access the config
-def run_statements(conn, sql, config, parameters=None):
+def run_statements(conn, sql, config, parameters=None, chunksize=None, timeout=None):
     """
     Run a SQL query (supports running multiple SQL statements) with the given
     connection. This is the function that's called when executing SQL magic.
@@ -22,12 +28,99 @@ def run_statements(conn, sql, config, parameters=None):
 
     config
         Configuration object
+
+    parameters : dict, default None
+        Parameters to use in the query
+
+    chunksize : int, default None
+        If not None, return a generator of data frames with at most ``chunksize``
+        rows each
+
+    timeout : float, default None
+        If not None, cancel the query if it runs for more than ``timeout``
+        seconds
     """
     if not sql.strip():
         return "Connected: %s" % conn.name
 
-    for statement in sqlparse.split(sql):
-        first_word = sql.strip().split()[0].lower()
+    # wait if the connection is running a query in the background (--async)
+    with conn._lock(), conn._timeout(timeout):
+        result_set = _execute_statements(conn, conn, sql, config, parameters)
+        return select_df_type(result_set, config, chunksize=chunksize)
+
+
+def run_statements_in_checkout(
+    conn, sql, config, parameters=None, timeout=None, on_checkout=None, on_rows=None
+):
+    """
+    Run a SQL query in a connection borrowed with ``conn.checkout(pooled=True)``
+    (``%%sql --async``), so ``%sql`` can keep using the connection while the query
+    runs. The borrowed connection is returned at the end, so all the rows are
+    fetched here
+
+    Parameters
+    ----------
+    conn : sql.connection.AbstractConnection
+        The connection to use
+
+    sql : str
+        SQL query to execution
+
+    config
+        Configuration object
+
+    parameters : dict, default None
+        Parameters to use in the query
+
+    timeout : float, default None
+        If not None, cancel the query if it runs for more than ``timeout``
+        seconds
+
+    on_checkout : callable, default None
+        Called with the borrowed connection before running the query (e.g., to
+        interrupt it)
+
+    on_rows : callable, default None
+        Called with the ``ResultSet`` after fetching each batch of rows (the first
+        batch has up to ``displaylimit`` rows), to show the rows fetched so far
+    """
+    if not sql.strip():
+        return "Connected: %s" % conn.name
+
+    with conn.checkout(pooled=True) as connection:
+        if on_checkout is not None:
+            on_checkout(connection)
+
+        with conn._timeout(timeout, connection=connection):
+            result_set = _execute_statements(conn, connection, sql, config, parameters)
+
+            if config.autopandas or config.autopolars:
+                return select_df_type(result_set, config)
+
+            size = config.displaylimit or ARROW_FETCH_BATCH_SIZE
+
+            while not result_set._done_fetching():
+                result_set.fetchmany(size)
+                size = ARROW_FETCH_BATCH_SIZE
+
+                if on_rows is not None:
+                    on_rows(result_set)
+
+            return result_set
+
+
+def _execute_statements(conn, connection, sql, config, parameters):
+    """
+    Run the statements in ``connection`` (``conn`` or a connection borrowed from
+    it) and return a ``ResultSet`` with the results of the last one
+    """
+    statements = sqlparse.split(sql)
+
+    if len(statements) > 2:
+        statements = _run_independent_statements(conn, statements, config, parameters)
+
+    for statement in statements:
+        first_word = statement.split()[0].lower()
 
         if first_word == "begin":
             raise exceptions.RuntimeError("JupySQL does not support transactions")
@@ -38,17 +131,178 @@ def run_statements(conn, sql, config, parameters=None):
 
         # regular query
         else:
-            result = conn.raw_execute(statement, parameters=parameters)
+            # let the database stop once it has enough rows
+            if config.autolimit and config.autolimit_pushdown:
+                statement = conn._limit_query(statement, config.autolimit)
+
+            result = connection.raw_execute(statement, parameters=parameters)
+
+            _display_rows_affected(getattr(result, "rowcount", None), config)
+
+    return ResultSet(result, config, statement, conn, pooled=connection is not conn)
+
+
+def run_executemany(conn, sql, data, config, timeout=None):
+    """
+    Run a statement once per row of ``data`` (``%%sql --executemany``). Rows are
+    sent to the driver in batches of ``config.executemany_batch_size`` rows, each
+    batch is committed after it runs (if autocommit is enabled), so if a batch
+    fails, the changes made by the previous batches are kept
 
-            if (
-                config.feedback >= 1
-                and hasattr(result, "rowcount")
-                and result.rowcount > 0
-            ):
-                display.message_success(f"{result.rowcount} rows affected.")
+    Parameters
+    ----------
+    conn : sql.connection.AbstractConnection
+        The connection to use
 
-    result_set = ResultSet(result, config, statement, conn)
-    return select_df_type(result_set, config)
+    sql : str
+        A single SQL statement with :name parameters
+
+    data
+        A pandas or polars data frame, an Arrow table, or an iterable of
+        dictionaries (one per row) that map parameter names to values
+
+    config
+        Configuration object
+
+    timeout : float, default None
+        If not None, cancel the statement if it runs for more than ``timeout``
+        seconds
+    """
+    statements = sqlparse.split(sql)
+
+    if len(statements) != 1:
+        raise exceptions.UsageError(
+            "--executemany requires a single statement, "
+            f"got {len(statements)} statements"
+        )
+
+    num_rows = 0
+
+    def batches():
+        nonlocal num_rows
+
+        for batch in _iter_parameter_batches(data, config.executemany_batch_size):
+            yield batch
+            # the connection asks for the next batch once this one ran
+            num_rows += len(batch)
+
+    try:
+        with conn._lock(), conn._timeout(timeout):
+            rowcount = conn.executemany(statements[0], batches())
+    except Exception:
+        if num_rows:
+            display.message_warning(
+                f"The statement ran for the first {num_rows} rows before the "
+                "error, their changes were not rolled back."
+            )
+
+        raise
+
+    if config.feedback >= 1:
+        if rowcount >= 0:
+            display.message_success(f"{rowcount} rows affected.")
+        else:
+            display.message_success(f"Executed the statement for {num_rows} rows.")
+
+
+def _pandas_rows(frame, start, batch_size):
+    chunk = frame.iloc[start : start + batch_size]
+    # convert NaN to None and NumPy scalars to Python objects
+    return chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+
+
+def _polars_rows(frame, start, batch_size):
+    return frame.slice(start, batch_size).to_dicts()
+
+
+def _arrow_rows(table, start, batch_size):
+    return table.slice(start, batch_size).to_pylist()
+
+
+# (module, class) of the data frames that --executemany converts in slices, so
+# we never convert the whole data frame at once
+_DATA_FRAME_TYPES = [
+    ("pandas", "DataFrame", _pandas_rows),
+    ("polars", "DataFrame", _polars_rows),
+    ("pyarrow", "Table", _arrow_rows),
+]
+
+
+def _iter_parameter_batches(data, batch_size):
+    """Yields lists with at most ``batch_size`` dictionaries (one per row)"""
+    for module_name, class_name, get_rows in _DATA_FRAME_TYPES:
+        # if the module hasn't been imported, data cannot be one of its objects
+        module = sys.modules.get(module_name)
+
+        if module is not None and isinstance(data, getattr(module, class_name)):
+            for start in range(0, len(data), batch_size):
+                yield get_rows(data, start, batch_size)
+
+            return
+
+    if isinstance(data, (str, bytes, Mapping)) or not isinstance(data, Iterable):
+        raise exceptions.TypeError(
+            "--executemany expects a data frame or a list of dictionaries, "
+            f"got: {type(data).__name__}"
+        )
+
+    rows = iter(data)
+
+    while True:
+        batch = list(islice(rows, batch_size))
+
+        if not batch:
+            return
+
+        for row in batch:
+            if not isinstance(row, Mapping):
+                raise exceptions.TypeError(
+                    "--executemany expects a list of dictionaries, found an "
+                    f"element of type: {type(row).__name__}"
+                )
+
+        yield batch
+
+
+def _run_independent_statements(conn, statements, config, parameters):
+    """
+    Run all the statements but the last one at the same time (respecting the
+    dependencies between them) if ``SqlMagic.statement_concurrency`` is greater
+    than 1. Returns the statements that are left to run in the connection
+    """
+    concurrency = parallel.get_concurrency(conn, config)
+
+    if concurrency == 1:
+        return statements
+
+    # the last statement returns the results, so it runs in the connection after
+    # the rest finish
+    *independent, last = statements
+    views = parallel.get_view_names(conn)
+
+    if views is None:
+        return statements
+
+    dependencies = parallel.find_dependencies(
+        independent, conn.capabilities.sqlglot_dialect, views
+    )
+
+    if dependencies is None:
+        return statements
+
+    rowcounts = parallel.run_concurrently(
+        conn, independent, dependencies, concurrency, parameters=parameters
+    )
+
+    for rowcount in rowcounts:
+        _display_rows_affected(rowcount, config)
+
+    return [last]
+
+
+def _display_rows_affected(rowcount, config):
+    if config.feedback >= 1 and rowcount is not None and rowcount > 0:
+        display.message_success(f"{rowcount} rows affected.")
 
 
 def is_postgres_or_redshift(dialect):
@@ -56,11 +310,21 @@ def is_postgres_or_redshift(dialect):
     return "postgres" in str(dialect) or "redshift" in str(dialect)
 
 
-def select_df_type(resultset, config):
+def select_df_type(resultset, config, chunksize=None):
     """
     Converts the input resultset to either a Pandas DataFrame
-    or Polars DataFrame based on the config settings.
+    or Polars DataFrame based on the config settings. If ``chunksize`` is passed,
+    returns a generator of data frames (Polars if autopolars is enabled, otherwise
+    Pandas) with at most ``chunksize`` rows each
     """
+    if chunksize is not None:
+        if config.autopolars:
+            return resultset.PolarsDataFrame(
+                chunksize=chunksize, **config.polars_dataframe_kwargs
+            )
+
+        return resultset.DataFrame(chunksize=chunksize)
+
     if config.autopandas:
         return resultset.DataFrame()
     elif config.autopolars:
@@ -1,13 +1,113 @@
+import re
+from html import unescape
+
 import prettytable
 
 
+_cell_with_spaces_pattern = re.compile(r"(<td>)( {2,})")
+
+
 class CustomPrettyTable(prettytable.PrettyTable):
     def add_rows(self, data):
-        for row in data:
-            formatted_row = []
-            for cell in row:
-                if isinstance(cell, str) and cell.startswith("http"):
-                    formatted_row.append("<a href={}>{}</a>".format(cell, cell))
-                else:
-                    formatted_row.append(cell)
-            self.add_row(formatted_row)
+        for row in _format_links(data):
+            self.add_row(row)
+
+
+class TableRenderer:
+    """
+    Renders the rows displayed by a ResultSet as a text or HTML table. Only the
+    displayed rows are formatted and the rendered string is cached until the
+    number of displayed rows changes
+
+    Parameters
+    ----------
+    field_names : list
+        Column names
+
+    style : int, default None
+        A prettytable style (e.g., prettytable.DEFAULT)
+    """
+
+    def __init__(self, field_names, style=None):
+        self._field_names = field_names
+        self._style = style
+        self._num_rows = None
+        self._rendered = {}
+
+    def render(self, rows, *, html):
+        """Returns the rows as an HTML (if html=True) or a text table
+
+        Parameters
+        ----------
+        rows : sequence
+            The rows to display. Since ResultSet only appends rows, two sequences
+            with the same length are assumed to contain the same rows
+        """
+        if len(rows) != self._num_rows:
+            self._num_rows = len(rows)
+            self._rendered = {}
+
+        if html not in self._rendered:
+            self._rendered[html] = self._render(rows, html=html)
+
+        return self._rendered[html]
+
+    def _render(self, rows, *, html):
+        table = CustomPrettyTable(self._field_names)
+
+        if self._style is not None:
+            table.set_style(self._style)
+
+        table.add_rows(rows)
+
+        # to create clickable links
+        result = unescape(table.get_html_string() if html else str(table))
+
+        if html:
+            result = _cell_with_spaces_pattern.sub(_nonbreaking_spaces, result)
+
+        return result
+
+
+def _format_links(rows):
+    """
+    Wrap the values that start with http in an <a> tag. Checks the values one
+    column at a time, and only creates new rows if a column contains links.
+
+    This isn't vectorized: it's a per-cell ``str.startswith`` check in Python,
+    but it only runs on the displayed rows (up to ``displaylimit``) and the
+    rendered table is cached by ``TableRenderer``, converting the rows to arrow
+    or pandas to check each column would cost more than it saves
+    """
+    rows = list(rows)
+
+    if not rows:
+        return rows
+
+    columns = list(zip(*rows))
+    has_links = False
+
+    for idx, column in enumerate(columns):
+        if any(isinstance(value, str) and value.startswith("http") for value in column):
+            columns[idx] = [_format_link(value) for value in column]
+            has_links = True
+
+    return list(zip(*columns)) if has_links else rows
+
+
+def _format_link(value):
+    if isinstance(value, str) and value.startswith("http"):
+        return "<a href={}>{}</a>".format(value, value)
+
+    return value
+
+
+def _nonbreaking_spaces(match_obj):
+    """
+    Make spaces visible in HTML by replacing all `` `` with ``&nbsp;``
+
+    Call with a ``re`` match object.  Retain group 1, replace group 2
+    with nonbreaking spaces.
+    """
+    spaces = "&nbsp;" * len(match_obj.group(2))
+    return "%s%s" % (match_obj.group(1), spaces)
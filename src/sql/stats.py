@@ -3,7 +3,7 @@ from sqlalchemy.exc import ProgrammingError
 
 import sql.connection
 from sql.util import flatten
-from sql import exceptions
+from sql import exceptions, plot_cache
 
 
 def _summary_stats(conn, table, column, with_=None):
@@ -30,7 +30,7 @@ FROM "{{table}}"
     )
     query = template_percentile.render(table=table, column=column)
 
-    percentiles = list(conn.execute(query, with_).fetchone())
+    percentiles = list(plot_cache.fetchone(conn, query, with_))
 
     template = Template(
         """
@@ -42,7 +42,7 @@ FROM "{{table}}"
     )
     query = template.render(table=table, column=column)
 
-    other = list(conn.execute(query, with_).fetchone())
+    other = list(plot_cache.fetchone(conn, query, with_))
 
     keys = ["q1", "med", "q3", "mean", "N"]
 
@@ -64,7 +64,7 @@ FROM "{{table}}"
     )
     query = template_percentile.render(table=table, column=column)
 
-    percentiles = list(conn.execute(query, with_).fetchone())
+    percentiles = list(plot_cache.fetchone(conn, query, with_))
 
     template = Template(
         """
@@ -76,7 +76,7 @@ FROM "{{table}}"
     )
     query = template.render(table=table, column=column)
 
-    other = list(conn.execute(query, with_).fetchone())
+    other = list(plot_cache.fetchone(conn, query, with_))
 
     keys = ["q1", "med", "q3", "mean", "N"]
 
@@ -89,7 +89,7 @@ def _summary_stats_parallel(conn, table, column, with_=None):
     if not conn:
         conn = sql.connection.ConnectionManager.current
 
-    driver = conn._get_database_information()["driver"]
+    driver = conn.capabilities.driver
 
     template = Template(
         """
@@ -105,7 +105,7 @@ def _summary_stats_parallel(conn, table, column, with_=None):
     query = template.render(table=table, column=column)
 
     try:
-        values = conn.execute(query, with_).fetchone()
+        values = plot_cache.fetchone(conn, query, with_)
     except ProgrammingError as e:
         print(e)
         raise exceptions.RuntimeError(
@@ -116,3 +116,51 @@ def _summary_stats_parallel(conn, table, column, with_=None):
 
     keys = ["q1", "med", "q3", "mean", "N"]
     return {k: float(v) for k, v in zip(keys, flatten(values))}
+
+
+def _summary_stats_many(conn, table, columns, with_=None):
+    """
+    Compute percentiles, mean and count for many columns. Dialects that support
+    percentile_disc as an aggregate function (see
+    ``ConnectionCapabilities.percentile_disc``) compute them in a single query
+    """
+    if not conn:
+        conn = sql.connection.ConnectionManager.current
+
+    # redshift only supports percentile_disc as an aggregate with APPROXIMATE
+    if not conn.capabilities.percentile_disc or conn.dialect == "redshift":
+        return [_summary_stats(conn, table, column, with_=with_) for column in columns]
+
+    template = Template(
+        """
+SELECT
+{%- for column in columns %}
+percentile_disc(0.25) WITHIN GROUP (ORDER BY "{{column}}"),
+percentile_disc(0.50) WITHIN GROUP (ORDER BY "{{column}}"),
+percentile_disc(0.75) WITHIN GROUP (ORDER BY "{{column}}"),
+AVG("{{column}}"),
+{%- endfor %}
+COUNT(*)
+FROM "{{table}}"
+"""
+    )
+    query = template.render(table=table, columns=columns)
+
+    try:
+        values = plot_cache.fetchone(conn, query, with_)
+    except ProgrammingError as e:
+        raise exceptions.RuntimeError(
+            "\nEnsure that percentile_disc function is available on "
+            f"{conn.capabilities.driver}."
+        ) from e
+
+    keys = ["q1", "med", "q3", "mean"]
+    N = float(values[-1])
+
+    return [
+        {
+            **{k: float(v) for k, v in zip(keys, values[idx * 4 : (idx + 1) * 4])},
+            "N": N,
+        }
+        for idx in range(len(columns))
+    ]
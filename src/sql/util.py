@@ -295,7 +295,8 @@ def fetch_sql_with_pagination(
     SELECT * FROM {table} {order_by}
     OFFSET {offset} ROWS FETCH NEXT {n_rows} ROWS ONLY"""
 
-    rows = ConnectionManager.current.execute(query).fetchall()
+    with ConnectionManager.current.checkout() as conn:
+        rows = conn.execute(query).fetchall()
 
     columns = ConnectionManager.current.raw_execute(
         f"SELECT * FROM {table} WHERE 1=0"
@@ -421,12 +422,7 @@ def get_line_content_from_toml(file_path, line_number):
 
 
 def to_upper_if_snowflake_conn(conn, upper):
-    return (
-        upper.upper()
-        if callable(conn._get_sqlglot_dialect)
-        and conn._get_sqlglot_dialect() == "snowflake"
-        else upper
-    )
+    return upper.upper() if conn.capabilities.sqlglot_dialect == "snowflake" else upper
 
 
 @requires(["toml"])
@@ -527,3 +523,30 @@ def validate_mutually_exclusive_args(arg_names, args):
             f"{pretty_print(specified_args)} are specified. "
             "You can only specify one of them."
         )
+
+
+def get_database_file(conn):
+    """
+    For embedded databases (SQLite, DuckDB) opened with a SQLAlchemy connection,
+    returns the absolute path to the database file, or False if it's an in-memory
+    database. Returns None for other databases and DBAPI connections (we cannot
+    tell which file they opened)
+    """
+    if conn.is_dbapi_connection:
+        return None
+
+    if conn.capabilities.sqlglot_dialect not in {"sqlite", "duckdb"}:
+        return None
+
+    database = conn.connection_sqlalchemy.engine.url.database
+
+    if not database or database == ":memory:":
+        return False
+
+    return Path(database).resolve()
+
+
+def get_mtime(path):
+    """Returns the modification time of a file (in ns), None if it doesn't exist"""
+    path = Path(path)
+    return path.stat().st_mtime_ns if path.is_file() else None
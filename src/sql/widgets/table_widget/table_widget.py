@@ -61,7 +61,9 @@ class TableWidget:
         rows = parse_sql_results_to_json(rows, columns)
 
         query = f"SELECT count(*) FROM {table}"
-        n_total = ConnectionManager.current.raw_execute(query).fetchone()[0]
+
+        with ConnectionManager.current.checkout() as conn:
+            n_total = conn.raw_execute(query).fetchone()[0]
         table_name = table.strip('"').strip("'")
 
         n_pages = math.ceil(n_total / rows_per_page)
@@ -12,6 +12,7 @@ from sql._testing import TestingShell
 from sql import connection
 from sql import store
 from sql import _current
+from sql import plot_cache
 
 PATH_TO_TESTS = Path(__file__).absolute().parent
 PATH_TO_TMP_ASSETS = PATH_TO_TESTS / "tmp"
@@ -24,7 +25,7 @@ def isolate_tests(monkeypatch):
     Fixture to ensure connections are isolated between tests, preventing tests
     from accidentally closing connections created by other tests.
 
-    Also clear up any stored snippets.
+    Also clear up any stored snippets and cached plot data.
     """
     # reset connections
     connections = {}
@@ -34,6 +35,8 @@ def isolate_tests(monkeypatch):
     # reset store
     store.store = store.SQLStore()
 
+    plot_cache.clear()
+
     yield
 
     # close connections
@@ -99,6 +102,13 @@ def ip_empty(ip_no_magics):
     ConnectionManager.close_all()
 
 
+@pytest.fixture
+def plot_cache_enabled(ip_empty):
+    ip_empty.run_cell("%config SqlMagic.plot_cache = True")
+    yield
+    ip_empty.run_cell("%config SqlMagic.plot_cache = False")
+
+
 @pytest.fixture
 def sql_magic():
     ip_session = TestingShell.preconfigured_shell()
@@ -215,6 +215,7 @@ def test_dbapi_connection_sets_right_dialect(dynamic_db, dialect, request):
 def test_duckdb_autocommit_on_with_manual_commit(tmp_empty, monkeypatch):
     class Config:
         autocommit = True
+        stream_results = 0
 
     engine = create_engine("duckdb:///my.db")
 
@@ -256,6 +257,7 @@ def test_postgres_autocommit_on_with_manual_commit(setup_postgreSQL, monkeypatch
 
     class Config:
         autocommit = True
+        stream_results = 0
 
     monkeypatch.setattr(
         connection, "set_sqlalchemy_isolation_level", Mock(return_value=False)
@@ -297,6 +299,7 @@ CREATE TABLE numbers (
 def test_duckdb_autocommit_off(tmp_empty):
     class Config:
         autocommit = False
+        stream_results = 0
 
     engine = create_engine("duckdb:///my.db")
     conn = SQLAlchemyConnection(engine=engine, config=Config)
@@ -335,6 +338,7 @@ def test_autocommit_on_with_sqlalchemy_that_supports_isolation_level(setup_postg
 
     class Config:
         autocommit = True
+        stream_results = 0
 
     url = _testing.DatabaseConfigHelper.get_database_url("postgreSQL")
 
@@ -373,6 +377,7 @@ def test_mssql_with_pytds(setup_MSSQL, autocommit_value):
 
     class Config:
         autocommit = autocommit_value
+        stream_results = 0
 
     url = _testing.DatabaseConfigHelper.get_database_url("mssql_pytds")
 
@@ -16,7 +16,7 @@ import pandas as pd
     "autocommit",
     [True, False],
 )
-def test_sqlalchemy_connection_converts_to_data_frames_natively(
+def test_sqlalchemy_connection_converts_to_data_frames_without_reexecuting(
     monkeypatch,
     ip_with_duckdb_sqlalchemy_empty,
     method,
@@ -47,12 +47,12 @@ def test_sqlalchemy_connection_converts_to_data_frames_natively(
 
     out = ip_with_duckdb_sqlalchemy_empty.run_cell(f"results.{method}()")
 
-    mock_sqlalchemy_conn._connection.connection.execute.assert_called_once_with(
-        "SELECT * FROM weather"
-    )
+    # the data frame is built from the arrow results, no need to re-run the query
+    mock_sqlalchemy_conn._connection.connection.execute.assert_not_called()
+    mock_sqlalchemy_conn.raw_execute.assert_not_called()
     getattr(
         mock_sqlalchemy_conn._connection.connection, expected_native_method
-    ).assert_called_once_with()
+    ).assert_not_called()
     assert isinstance(out.result, expected_type)
     assert out.result.shape == (2, 2)
 
@@ -68,7 +68,7 @@ def test_sqlalchemy_connection_converts_to_data_frames_natively(
     "autocommit",
     [True, False],
 )
-def test_native_connection_converts_to_data_frames_natively(
+def test_native_connection_converts_to_data_frames_without_reexecuting(
     monkeypatch,
     ip_with_duckdb_native_empty,
     method,
@@ -89,13 +89,14 @@ def test_native_connection_converts_to_data_frames_natively(
 
     results = ip_with_duckdb_native_empty.run_cell("results").result
 
-    mock_native_connection = Mock(wraps=results.sqlaproxy)
-    monkeypatch.setattr(results, "_sqlaproxy", mock_native_connection)
+    mock_native_connection = Mock(wraps=results.sqlaproxy._cursor)
+    monkeypatch.setattr(results.sqlaproxy, "_cursor", mock_native_connection)
 
     out = ip_with_duckdb_native_empty.run_cell(f"results.{method}()")
 
-    mock_native_connection.execute.assert_called_once_with("SELECT * FROM weather")
-    getattr(mock_native_connection, expected_native_method).assert_called_once_with()
+    # the data frame is built from the arrow results, no need to re-run the query
+    mock_native_connection.execute.assert_not_called()
+    getattr(mock_native_connection, expected_native_method).assert_not_called()
     assert isinstance(out.result, expected_type)
     assert out.result.shape == (2, 2)
 
@@ -13,6 +13,9 @@ class Config:
     style = "DEFAULT"
     autolimit = 0
     displaylimit = 10
+    result_storage = "rows"
+    stream_results = 0
+    autolimit_pushdown = False
 
 
 def test_resultset(setup_postgreSQL):
@@ -38,6 +38,10 @@ class ConfigAutocommit:
     style = "DEFAULT"
     autolimit = 0
     displaylimit = 10
+    result_storage = "rows"
+    stream_results = 0
+    autolimit_pushdown = False
+    statement_concurrency = 1
 
 
 class ConfigNoAutocommit(ConfigAutocommit):
@@ -173,6 +173,10 @@ def test_args(ip, sql_magic):
         "save": None,
         "with_": ["author_one"],
         "no_execute": False,
+        "chunksize": None,
+        "async_": False,
+        "timeout": None,
+        "executemany": None,
     }
 
 
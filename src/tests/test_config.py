@@ -23,7 +23,7 @@ def get_default_testing_configs(sql):
     with their default values.
     """
     cfg = get_default_configs(sql)
-    # we're overriding this in conftest.py
+    # we're overriding these in conftest.py
     cfg["dsn_filename"] = "default.ini"
     return cfg
 
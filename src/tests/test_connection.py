@@ -1,5 +1,7 @@
+import dataclasses
 import os
 import sys
+import time
 from unittest.mock import ANY, Mock, patch
 import pytest
 
@@ -12,6 +14,7 @@ import sqlite3
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
 from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
 
 import sql.connection
 from sql.connection import (
@@ -22,6 +25,8 @@ from sql.connection import (
     default_alias_for_engine,
     ResultSetCollection,
 )
+from sql.connection.capabilities import ConnectionCapabilities
+from sql.connection.connection import get_pool_kwargs
 from sql.warnings import JupySQLRollbackPerformed
 
 
@@ -226,6 +231,52 @@ def test_is_use_backtick_template_sqlglot_empty_identifiers(mock_database, monke
     assert conn.is_use_backtick_template() is False
 
 
+def test_capabilities_sqlalchemy_duckdb():
+    conn = SQLAlchemyConnection(engine=create_engine("duckdb://"))
+
+    capabilities = conn.capabilities
+
+    assert capabilities.dialect == "duckdb"
+    assert capabilities.driver == "duckdb_engine"
+    assert capabilities.sqlglot_dialect == "duckdb"
+    assert capabilities.use_backticks is False
+    assert set(capabilities.identifiers) == {"", '"'}
+    assert capabilities.percentile_disc is True
+    assert capabilities.arrow is True
+
+
+def test_capabilities_sqlalchemy_sqlite():
+    conn = SQLAlchemyConnection(engine=create_engine("sqlite://"))
+
+    capabilities = conn.capabilities
+
+    assert capabilities.sqlglot_dialect == "sqlite"
+    assert capabilities.use_backticks is True
+    assert "`" in capabilities.identifiers
+    assert capabilities.percentile_disc is False
+    assert capabilities.arrow is False
+
+
+def test_capabilities_are_computed_once(monkeypatch):
+    from_connection = Mock(wraps=ConnectionCapabilities.from_connection)
+    monkeypatch.setattr(ConnectionCapabilities, "from_connection", from_connection)
+    conn = SQLAlchemyConnection(engine=create_engine("sqlite://"))
+
+    conn.is_use_backtick_template()
+    conn.get_curr_identifiers()
+    conn._transpile_query("SELECT 1")
+
+    assert conn.capabilities is conn.capabilities
+    from_connection.assert_called_once_with(conn)
+
+
+def test_capabilities_are_immutable():
+    conn = SQLAlchemyConnection(engine=create_engine("sqlite://"))
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        conn.capabilities.sqlglot_dialect = "duckdb"
+
+
 # Mock the missing package
 # Ref: https://stackoverflow.com/a/28361013
 def test_missing_duckdb_dependencies(cleanup, monkeypatch):
@@ -704,6 +755,113 @@ def test_raw_execute_doesnt_transpile_sql_query(fixture_name, request):
     assert calls == expected_calls
 
 
+@pytest.mark.parametrize(
+    "stream_results, expected",
+    [
+        (0, {}),
+        (100, {"stream_results": True, "max_row_buffer": 100}),
+    ],
+)
+def test_raw_execute_stream_results(monkeypatch, stream_results, expected):
+    class Config:
+        autocommit = True
+
+    Config.stream_results = stream_results
+
+    conn = SQLAlchemyConnection(engine=create_engine("sqlite://"), config=Config)
+    mock_execute = Mock(wraps=conn._connection.execute)
+    monkeypatch.setattr(conn._connection, "execute", mock_execute)
+
+    conn.raw_execute("CREATE TABLE foo (bar INT)")
+    conn.raw_execute("INSERT INTO foo VALUES (42), (43)")
+    result = conn.raw_execute("SELECT * FROM foo")
+
+    options = [
+        dict(call[0][0].get_execution_options())
+        for call in mock_execute.call_args_list
+        if str(call[0][0]) != "commit"
+    ]
+
+    # only SELECT statements are streamed
+    assert options == [{}, {}, expected]
+    assert result.fetchall() == [(42,), (43,)]
+
+
+@pytest.mark.parametrize(
+    "autocommit, expected",
+    [
+        (True, None),
+        (False, {"stream_results": True, "max_row_buffer": 100}),
+    ],
+)
+def test_stream_results_postgres_autocommit(monkeypatch, capsys, autocommit, expected):
+    class Config:
+        stream_results = 100
+
+    Config.autocommit = autocommit
+
+    conn = SQLAlchemyConnection(engine=create_engine("sqlite://"), config=Config)
+    monkeypatch.setattr(conn, "_dialect", "postgresql")
+    monkeypatch.setattr(
+        conn, "_get_dbapi_connection", Mock(return_value=Mock(autocommit=autocommit))
+    )
+
+    assert conn._get_execution_options() == expected
+    assert conn._get_execution_options() == expected
+
+    out = capsys.readouterr().out
+    # psycopg2 can't use server-side cursors in autocommit mode
+    assert out.count("Ignoring stream_results") == int(autocommit)
+
+
+@pytest.mark.parametrize(
+    "dialect, query, expected",
+    [
+        ("duckdb", "SELECT * FROM t", "SELECT * FROM t LIMIT 10"),
+        ("duckdb", "FROM t", "SELECT * FROM t LIMIT 10"),
+        ("duckdb", "SELECT * FROM t LIMIT 50", "SELECT * FROM t LIMIT 10"),
+        ("duckdb", "SELECT * FROM t LIMIT 5", "SELECT * FROM t LIMIT 5"),
+        (
+            "duckdb",
+            "WITH a AS (SELECT * FROM t) SELECT * FROM a",
+            "WITH a AS (SELECT * FROM t) SELECT * FROM a LIMIT 10",
+        ),
+        ("postgres", "SELECT * FROM t LIMIT :n", "SELECT * FROM t LIMIT :n"),
+        ("tsql", "SELECT * FROM t", "SELECT TOP 10 * FROM t"),
+        ("tsql", "SELECT TOP 5 * FROM t", "SELECT TOP 5 * FROM t"),
+        ("oracle", "SELECT * FROM t", "SELECT * FROM t FETCH FIRST 10 ROWS ONLY"),
+        ("duckdb", "INSERT INTO t VALUES (1)", "INSERT INTO t VALUES (1)"),
+        ("duckdb", "CREATE TABLE t (x INT)", "CREATE TABLE t (x INT)"),
+        ("duckdb", "SELECT 1; SELECT 2", "SELECT 1; SELECT 2"),
+        ("duckdb", "SELECT * FROM", "SELECT * FROM"),
+        ("duckdb", "SELECT * FROM t LIMIT 10.5", "SELECT * FROM t LIMIT 10.5"),
+        ("duckdb", "SELECT * FROM t LIMIT 1e3", "SELECT * FROM t LIMIT 1e3"),
+    ],
+    ids=[
+        "select",
+        "from-first",
+        "larger-limit",
+        "smaller-limit",
+        "cte",
+        "placeholder-limit",
+        "top",
+        "smaller-top",
+        "fetch-first",
+        "insert",
+        "create-table",
+        "multiple-statements",
+        "invalid",
+        "decimal-limit",
+        "scientific-notation-limit",
+    ],
+)
+def test_limit_query(monkeypatch, dialect, query, expected):
+    conn = SQLAlchemyConnection(engine=create_engine("duckdb://"))
+    monkeypatch.setattr(conn, "_get_sqlglot_dialect", lambda: dialect)
+
+    assert conn._limit_query(query, 10) == expected
+
+
 @pytest.fixture
 def mock_sqlalchemy_execute(monkeypatch):
     conn = SQLAlchemyConnection(engine=create_engine("duckdb://"))
@@ -982,6 +1140,37 @@ def test_execute_rollback_if_server_closes_connection(monkeypatch):
     mock_rollback.assert_called_once_with()
 
 
+@pytest.mark.parametrize(
+    "is_sqlalchemy_one, expected_call",
+    [
+        (True, "execute"),
+        (False, "rollback"),
+    ],
+)
+def test_rollback(monkeypatch, is_sqlalchemy_one, expected_call):
+    conn = SQLAlchemyConnection(engine=create_engine("sqlite://"))
+    connection = Mock()
+    monkeypatch.setattr(
+        sql.connection.connection, "IS_SQLALCHEMY_ONE", is_sqlalchemy_one
+    )
+
+    conn._rollback(connection)
+
+    getattr(connection, expected_call).assert_called_once()
+
+
+def test_executemany_failed_rollback_keeps_the_original_error(tmp_empty):
+    conn = SQLAlchemyConnection(engine=create_engine("sqlite:///my.db"))
+    conn.raw_execute("CREATE TABLE numbers (x INT PRIMARY KEY)")
+    conn._requires_manual_commit = True
+    conn._rollback = Mock(side_effect=RuntimeError("cannot roll back"))
+
+    with pytest.raises(exc.IntegrityError, match="UNIQUE constraint failed"):
+        conn.executemany("INSERT INTO numbers VALUES (:x)", [[{"x": 1}, {"x": 1}]])
+
+    conn._rollback.assert_called_once_with()
+
+
 def test_ignore_internalerror_if_it_doesnt_match_the_selected_patterns(monkeypatch):
     conn = SQLAlchemyConnection(engine=create_engine("duckdb://"))
 
@@ -1042,3 +1231,315 @@ def test_database_in_directory_that_doesnt_exist(tmp_empty, uri, expected):
         SQLAlchemyConnection(engine=create_engine(uri))
 
     assert expected in str(excinfo.value)
+
+
+@pytest.mark.parametrize(
+    "config_options, pool_options, expected",
+    [
+        ({}, None, {}),
+        (
+            {"pool_class": "QueuePool", "pool_size": 2, "max_overflow": 0},
+            None,
+            {"poolclass": QueuePool, "pool_size": 2, "max_overflow": 0},
+        ),
+        (
+            {"pool_class": "QueuePool", "pool_pre_ping": True, "pool_recycle": 60},
+            {"pool_class": "NullPool"},
+            {"poolclass": NullPool, "pool_pre_ping": True, "pool_recycle": 60},
+        ),
+    ],
+)
+def test_get_pool_kwargs(config_options, pool_options, expected):
+    class Config:
+        pass
+
+    for key, value in config_options.items():
+        setattr(Config, key, value)
+
+    assert get_pool_kwargs(Config, pool_options) == expected
+
+
+def test_get_pool_kwargs_invalid_pool_class():
+    with pytest.raises(UsageError) as excinfo:
+        get_pool_kwargs(None, {"pool_class": "StaticPool"})
+
+    assert excinfo.value.error_type == "ValueError"
+    assert "Invalid pool_class: 'StaticPool'" in str(excinfo.value)
+
+
+@pytest.mark.parametrize(
+    "pool_options, connect_str, expected",
+    [
+        (
+            {"pool_class": "NullPool", "max_overflow": 3},
+            None,
+            "max_overflow can only be used with pool_class='QueuePool', but the "
+            "pool class is 'NullPool'",
+        ),
+        (
+            {"pool_size": 2, "max_overflow": 3},
+            "sqlite://",
+            "pool_size and max_overflow can only be used with "
+            "pool_class='QueuePool', but the pool class is 'SingletonThreadPool'",
+        ),
+    ],
+)
+def test_get_pool_kwargs_options_that_dont_fit_the_pool(
+    pool_options, connect_str, expected
+):
+    with pytest.raises(UsageError) as excinfo:
+        get_pool_kwargs(None, pool_options, connect_str)
+
+    assert excinfo.value.error_type == "ValueError"
+    assert expected in str(excinfo.value)
+
+
+def test_get_pool_kwargs_default_queue_pool():
+    assert get_pool_kwargs(None, {"pool_size": 2}, "sqlite:///my.db") == {
+        "pool_size": 2
+    }
+
+
+def test_from_connect_str_with_options_that_dont_fit_the_pool(tmp_empty):
+    with pytest.raises(UsageError) as excinfo:
+        ConnectionManager.from_connect_str(
+            "sqlite:///my.db",
+            pool_options={"pool_class": "NullPool", "max_overflow": 3},
+        )
+
+    assert "Set pool_class='QueuePool' or unset max_overflow" in str(excinfo.value)
+    assert "questdb" not in str(excinfo.value).lower()
+
+
+def test_checkout_uses_the_session_connection_by_default(tmp_empty):
+    conn = ConnectionManager.from_connect_str("sqlite:///my.db")
+
+    with conn.checkout() as borrowed:
+        assert borrowed is conn
+
+
+def test_checkout_borrows_a_connection_from_the_pool(tmp_empty):
+    conn = ConnectionManager.from_connect_str("sqlite:///my.db")
+    conn.raw_execute("CREATE TABLE numbers (x INT)")
+    generation = conn._write_generation
+
+    with conn.checkout(pooled=True) as first, conn.checkout(pooled=True) as second:
+        first.raw_execute("INSERT INTO numbers VALUES (1)")
+        # a different connection sees the committed rows
+        assert second.execute("SELECT * FROM numbers").fetchall() == [(1,)]
+        assert first._connection is not conn.connection_sqlalchemy
+        assert second._connection is not first._connection
+
+    assert conn._write_generation == generation + 1
+    # only the connection used by %sql is checked out
+    assert conn.connection_sqlalchemy.engine.pool.checkedout() == 1
+
+
+def test_checkout_resolves_ctes(ip_empty, tmp_empty):
+    ip_empty.run_cell("%sql duckdb:///my.db")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(5)")
+    ip_empty.run_cell("%sql --save small SELECT * FROM numbers WHERE x < 2")
+
+    with ConnectionManager.current.checkout() as conn:
+        result = conn.execute("SELECT COUNT(*) FROM small", with_=["small"])
+        assert result.fetchone() == (2,)
+
+
+@pytest.mark.parametrize("connect_str", ["sqlite://", "duckdb://"])
+def test_checkout_in_memory_database(connect_str):
+    conn = ConnectionManager.from_connect_str(connect_str)
+
+    with conn.checkout(pooled=True) as borrowed:
+        assert borrowed is conn
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "CREATE TEMP TABLE t AS SELECT 1 AS x",
+        "CREATE TEMPORARY VIEW v AS SELECT 1 AS x",
+    ],
+)
+def test_checkout_with_temporary_objects(tmp_empty, statement):
+    conn = ConnectionManager.from_connect_str("sqlite:///my.db")
+    conn.raw_execute(statement)
+
+    assert conn.has_session_state
+
+    with conn.checkout(pooled=True) as borrowed:
+        assert borrowed is conn
+
+
+@pytest.mark.parametrize(
+    "dialect, expected_name, expected_statement",
+    [
+        (
+            "duckdb",
+            "sample",
+            "CREATE TEMPORARY TABLE sample AS SELECT 1",
+        ),
+        (
+            "tsql",
+            "#sample",
+            "SELECT * INTO #sample FROM (SELECT 1) AS temporary_table_query",
+        ),
+        (
+            "oracle",
+            "ORA$PTT_sample",
+            "CREATE PRIVATE TEMPORARY TABLE ORA$PTT_sample ON COMMIT PRESERVE "
+            "DEFINITION AS SELECT 1",
+        ),
+    ],
+)
+def test_temporary_table(dialect, expected_name, expected_statement, monkeypatch):
+    conn = DBAPIConnection(duckdb.connect())
+    monkeypatch.setattr(
+        conn,
+        "_capabilities",
+        dataclasses.replace(conn.capabilities, sqlglot_dialect=dialect),
+    )
+    raw_execute = Mock()
+    monkeypatch.setattr(conn, "raw_execute", raw_execute)
+
+    with conn.temporary_table("sample", "SELECT 1") as name:
+        assert name == expected_name
+        raw_execute.assert_called_once_with(expected_statement)
+
+    raw_execute.assert_called_with(f"DROP TABLE {expected_name}")
+
+
+def test_temporary_table_not_supported(monkeypatch):
+    conn = DBAPIConnection(duckdb.connect())
+    monkeypatch.setattr(
+        conn,
+        "_capabilities",
+        dataclasses.replace(
+            conn.capabilities, sqlglot_dialect="bigquery", temporary_tables=False
+        ),
+    )
+
+    with pytest.raises(UsageError, match="not supported for bigquery"):
+        with conn.temporary_table("sample", "SELECT 1"):
+            pass
+
+
+def test_checkout_with_uncommitted_changes(tmp_empty):
+    conn = ConnectionManager.from_connect_str("sqlite:///my.db")
+    conn.raw_execute("CREATE TABLE numbers (x INT)")
+    conn.raw_execute("BEGIN")
+    conn.raw_execute("INSERT INTO numbers VALUES (1)")
+
+    assert conn.has_session_state
+
+    with conn.checkout(pooled=True) as borrowed:
+        assert borrowed is conn
+
+    conn.raw_execute("COMMIT")
+
+    assert not conn.has_session_state
+
+    with conn.checkout(pooled=True) as borrowed:
+        assert borrowed is not conn
+        assert borrowed.execute("SELECT * FROM numbers").fetchall() == [(1,)]
+
+
+def test_checkout_without_autocommit(tmp_empty):
+    class Config:
+        autocommit = False
+        stream_results = 0
+
+    conn = SQLAlchemyConnection(create_engine("sqlite:///my.db"), config=Config)
+
+    # the user can't commit the changes made in a pooled connection
+    with conn.checkout(pooled=True) as borrowed:
+        assert borrowed is conn
+
+
+def test_pooled_connection_commits_like_the_parent(tmp_empty, monkeypatch):
+    monkeypatch.setattr(
+        sql.connection.connection,
+        "set_sqlalchemy_isolation_level",
+        Mock(return_value=False),
+    )
+    conn = ConnectionManager.from_connect_str("sqlite:///my.db")
+    conn.raw_execute("CREATE TABLE numbers (x INT)")
+    commit = Mock(wraps=conn._commit)
+    monkeypatch.setattr(conn, "_commit", commit)
+
+    with conn.checkout(pooled=True) as first, conn.checkout(pooled=True) as second:
+        assert first._requires_manual_commit
+        first.raw_execute("INSERT INTO numbers VALUES (1)")
+
+        commit.assert_called_once_with(first._connection)
+        assert second.execute("SELECT * FROM numbers").fetchall() == [(1,)]
+
+
+def test_pooled_connection_rolls_back_aborted_transactions(tmp_empty):
+    conn = ConnectionManager.from_connect_str("sqlite:///my.db")
+
+    with conn.checkout(pooled=True) as borrowed:
+        connection = Mock(wraps=borrowed._connection)
+        connection.execute.side_effect = [
+            exc.PendingRollbackError("Can't reconnect", None, None),
+            "result",
+        ]
+        borrowed._connection = connection
+
+        with pytest.warns(JupySQLRollbackPerformed):
+            assert borrowed.raw_execute("SELECT 1") == "result"
+
+        connection.rollback.assert_called_once_with()
+
+
+def test_autocommit_has_no_session_state(tmp_empty):
+    conn = ConnectionManager.from_connect_str("sqlite:///my.db")
+    conn.raw_execute("CREATE TABLE numbers (x INT)")
+    conn.raw_execute("SELECT * FROM numbers")
+
+    assert not conn.has_session_state
+
+    conn.raw_execute("BEGIN")
+
+    assert conn.has_session_state
+
+
+def test_checkout_dbapi_connection():
+    conn = DBAPIConnection(duckdb.connect())
+
+    with conn.checkout() as borrowed:
+        assert borrowed is conn
+
+
+def test_interrupt_not_supported():
+    # duckdb<0.8 doesn't implement interrupt()
+    conn = DBAPIConnection(Mock(spec=["cursor", "commit", "rollback", "close"]))
+
+    assert not conn.interrupt()
+
+
+def test_timeout_waits_if_the_driver_cannot_interrupt(monkeypatch, capsys):
+    conn = DBAPIConnection(sqlite3.connect(""))
+    monkeypatch.setattr(conn, "interrupt", Mock(return_value=False))
+
+    # the query finishes, so there is no error
+    with conn._timeout(0.05):
+        time.sleep(0.2)
+
+    conn.interrupt.assert_called_once_with()
+    assert "does not support cancelling queries" in capsys.readouterr().out
+
+
+def test_timeout_rolls_back_interrupted_queries():
+    sqlite_connection = sqlite3.connect("")
+    conn = DBAPIConnection(sqlite_connection)
+
+    with pytest.raises(UsageError, match="exceeding the timeout") as excinfo:
+        with conn._timeout(0.2):
+            conn.raw_execute(
+                "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+                "SELECT COUNT(*) FROM c"
+            )
+
+    assert excinfo.value.error_type == "QueryTimeoutError"
+    assert isinstance(excinfo.value.__cause__, sqlite3.OperationalError)
+    assert conn.raw_execute("SELECT 1").fetchall() == [(1,)]
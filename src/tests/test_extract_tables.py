@@ -1,4 +1,5 @@
 import pytest
+from sql import query_util
 from sql.query_util import extract_tables_from_query
 
 
@@ -83,3 +84,75 @@ def test_invalid_query():
     query = "SELECT city frm Customers"
     tables = extract_tables_from_query(query)
     assert [] == tables
+
+
+@pytest.fixture
+def clear_cache():
+    query_util.cache_clear()
+    yield
+    query_util.cache_clear()
+
+
+def test_parse_is_cached(clear_cache):
+    first = query_util.parse("SELECT * FROM numbers")
+    second = query_util.parse("  SELECT * FROM numbers\n")
+
+    assert first is second
+    assert query_util.cache_info()["parse"].hits == 1
+    assert query_util.cache_info()["parse"].misses == 1
+
+
+def test_parse_cache_is_keyed_by_dialect(clear_cache):
+    query_util.parse("SELECT * FROM numbers")
+    query_util.parse("SELECT * FROM numbers", "duckdb")
+
+    assert query_util.cache_info()["parse"].hits == 0
+    assert query_util.cache_info()["parse"].misses == 2
+
+
+def test_transpile_is_cached(clear_cache):
+    query = "SELECT * FROM numbers LIMIT 5"
+
+    assert query_util.transpile(query, write="tsql") == "SELECT TOP 5 * FROM numbers"
+    assert query_util.transpile(query, write="tsql") == "SELECT TOP 5 * FROM numbers"
+
+    info = query_util.cache_info()
+    assert info["transpile"].hits == 1
+    assert info["transpile"].misses == 1
+    assert info["parse"].misses == 1
+
+
+def test_extract_tables_from_query_reuses_parsed_query(clear_cache):
+    extract_tables_from_query("SELECT * FROM a JOIN b ON a.x = b.x")
+    tables = extract_tables_from_query("SELECT * FROM a JOIN b ON a.x = b.x")
+
+    assert tables == ["a", "b"]
+    assert query_util.cache_info()["parse"].hits == 1
+
+
+@pytest.mark.parametrize(
+    "statement, expected",
+    [
+        ("SELECT * FROM a JOIN b ON a.x = b.x", ({"a", "b"}, set())),
+        ("WITH t AS (SELECT * FROM a) SELECT * FROM t", ({"a"}, set())),
+        ("CREATE TABLE a AS SELECT * FROM B", ({"b"}, {"a"})),
+        ("CREATE TABLE a (x INT)", (set(), {"a"})),
+        ("CREATE VIEW v AS SELECT * FROM a", ({"a"}, {"v"})),
+        ("INSERT INTO a (x) SELECT x FROM b", ({"b"}, {"a"})),
+        ("UPDATE a SET x = 1 WHERE y IN (SELECT y FROM b)", ({"b"}, {"a"})),
+        ("DELETE FROM s.a WHERE x = 1", (set(), {"a"})),
+        ("DROP TABLE a", (set(), {"a"})),
+        ("CREATE TEMP TABLE a AS SELECT 1", None),
+        ("SELECT * INTO a FROM b", None),
+        ("SET threads = 4", None),
+        ("CREATE SEQUENCE s", None),
+        ("SELECT * FROM", None),
+    ],
+)
+def test_extract_reads_and_writes(statement, expected):
+    result = query_util.extract_reads_and_writes(statement, "duckdb")
+
+    if expected is None:
+        assert result is None
+    else:
+        assert result == tuple(frozenset(tables) for tables in expected)
@@ -2,9 +2,12 @@ from sql.ggplot import ggplot, aes, geom_boxplot, geom_histogram, facet_wrap
 from matplotlib.testing.decorators import image_comparison, _cleanup_cm
 import pytest
 from pathlib import Path
+from unittest.mock import Mock
 from urllib.request import urlretrieve
 from IPython.core.error import UsageError
 
+from sql.connection import ConnectionManager
+
 
 @pytest.fixture
 def short_trips_data(ip, yellow_trip_data):
@@ -457,6 +460,30 @@ def test_facet_wrap_default_with_dummy(nulls_data):
     )
 
 
+@pytest.mark.parametrize(
+    "geom, expected",
+    [
+        # the geom draws the single panel plot before facet_wrap is added (min/max
+        # and counts), then: facet values and counts of all panels (the min/max
+        # is cached, since plot_cache is enabled)
+        (geom_histogram(bins=10), 4),
+        # same as above plus the counts by fill
+        (geom_histogram(bins=10, fill="name"), 5),
+    ],
+    ids=["histogram", "stacked"],
+)
+def test_facet_wrap_number_of_queries(
+    nulls_data, plot_cache_enabled, monkeypatch, geom, expected
+):
+    conn = ConnectionManager.current
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+
+    ggplot(table="data_nulls.csv", mapping=aes(x="age")) + geom + facet_wrap("model")
+
+    assert execute.call_count == expected
+
+
 @_cleanup_cm()
 @image_comparison(
     baseline_images=["histogram_with_breaks"],
@@ -1,8 +1,11 @@
+import asyncio
+import time
 from unittest.mock import ANY
 import uuid
 import logging
 import platform
 import sqlite3
+import threading
 from pathlib import Path
 import os.path
 import re
@@ -15,9 +18,12 @@ import polars as pl
 import pandas as pd
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool, QueuePool
 from IPython.core.error import UsageError
 from sql.connection import ConnectionManager
+from sql.connection.connection import PooledConnection
 from sql.magic import SqlMagic
+from sql.run.handle import QueryHandle
 from sql.run.resultset import ResultSet
 from sql import magic
 from sql.warnings import JupySQLQuotedNamedParametersWarning
@@ -777,6 +783,101 @@ def test_autopolars_infer_schema_length(ip):
     runsql(ip, "DROP TABLE test_autopolars_infer_schema")
 
 
+def test_chunksize(ip):
+    ip.run_cell(
+        "%sql CREATE TABLE numbers AS SELECT 1 AS n UNION SELECT 2 UNION SELECT 3"
+    )
+    frames = ip.run_cell("%sql --chunksize 2 SELECT * FROM numbers ORDER BY n").result
+
+    assert [frame.n.tolist() for frame in frames] == [[1, 2], [3]]
+
+
+def test_chunksize_autopolars(ip):
+    ip.run_line_magic("config", "SqlMagic.autopolars = True")
+    frames = ip.run_cell("%sql --chunksize 1 SELECT * FROM test").result
+    frames = list(frames)
+
+    assert all(isinstance(frame, pl.DataFrame) for frame in frames)
+    assert [frame.shape for frame in frames] == [(1, 2), (1, 2)]
+
+
+@pytest.mark.parametrize(
+    "cell, error_message",
+    [
+        (
+            "%sql --chunksize 0 SELECT * FROM test",
+            "--chunksize must be a positive integer, got: 0",
+        ),
+        (
+            "%sql --chunksize -1 SELECT * FROM test",
+            "--chunksize must be a positive integer, got: -1",
+        ),
+    ],
+)
+def test_chunksize_invalid_value(ip, cell, error_message):
+    with pytest.raises(UsageError) as excinfo:
+        ip.run_cell(cell)
+
+    assert error_message in str(excinfo.value)
+
+
+def test_chunksize_with_column_local_vars(ip):
+    ip.run_line_magic("config", "SqlMagic.column_local_vars = True")
+
+    with pytest.raises(UsageError) as excinfo:
+        ip.run_cell("%sql --chunksize 1 SELECT * FROM test")
+
+    ip.run_line_magic("config", "SqlMagic.column_local_vars = False")
+
+    assert "Cannot use --chunksize with column_local_vars" in str(excinfo.value)
+
+
+def test_stream_results(ip):
+    ip.run_line_magic("config", "SqlMagic.stream_results = 1")
+    result = ip.run_cell("%sql SELECT * FROM test").result
+    ip.run_line_magic("config", "SqlMagic.stream_results = 0")
+
+    assert list(result) == [(1, "foo"), (2, "bar")]
+
+
+def test_stream_results_invalid_value(ip, caplog):
+    with caplog.at_level(logging.ERROR):
+        ip.run_cell("%config SqlMagic.stream_results = -1")
+
+    assert "-1: stream_results cannot be a negative integer" in caplog.text
+
+
+@pytest.mark.parametrize("value", [0, -1])
+def test_profile_concurrency_invalid_value(ip, caplog, value):
+    with caplog.at_level(logging.ERROR):
+        ip.run_cell(f"%config SqlMagic.profile_concurrency = {value}")
+
+    assert f"{value}: profile_concurrency must be a positive integer" in caplog.text
+
+
+@pytest.mark.parametrize("value", [0, -1])
+def test_statement_concurrency_invalid_value(ip, caplog, value):
+    with caplog.at_level(logging.ERROR):
+        ip.run_cell(f"%config SqlMagic.statement_concurrency = {value}")
+
+    assert f"{value}: statement_concurrency must be a positive integer" in caplog.text
+
+
+def test_statement_concurrency(ip_empty, tmp_empty):
+    ip_empty.run_cell("%config SqlMagic.statement_concurrency = 2")
+    ip_empty.run_cell("%sql duckdb:///my.db")
+
+    result = ip_empty.run_cell(
+        """%%sql
+CREATE TABLE a AS SELECT 1 AS x;
+CREATE TABLE b AS SELECT 2 AS x;
+SELECT * FROM a UNION ALL SELECT * FROM b ORDER BY x
+"""
+    ).result
+
+    assert result.dict() == {"x": (1, 2)}
+
+
 def test_mutex_autopolars_autopandas(ip):
     ip.run_line_magic("config", "SqlMagic.autopolars = False")
     ip.run_line_magic("config", "SqlMagic.autopandas = False")
@@ -1789,3 +1890,413 @@ def test_error_when_ini_file_is_corrupted(
 
     assert error_type in str(excinfo.value)
     assert error_detail in str(excinfo.value)
+
+
+def test_result_storage_arrow(ip):
+    ip.run_cell("%config SqlMagic.result_storage = 'arrow'")
+    result = ip.run_cell("%sql SELECT * FROM author").result
+
+    assert result.dict() == {
+        "first_name": ("William", "Bertold"),
+        "last_name": ("Shakespeare", "Brecht"),
+        "year_of_death": (1616, 1956),
+    }
+    assert result.DataFrame().shape == (2, 3)
+
+
+def test_result_storage_invalid_value(ip, caplog):
+    with caplog.at_level(logging.ERROR):
+        ip.run_cell("%config SqlMagic.result_storage = 'columns'")
+
+    assert "'columns' is not a valid result_storage" in caplog.text
+
+
+def test_pool_options(ip_empty, tmp_empty):
+    ip_empty.run_cell("%config SqlMagic.pool_class = 'QueuePool'")
+    ip_empty.run_cell("%config SqlMagic.pool_size = 2")
+    ip_empty.run_cell("%config SqlMagic.max_overflow = 3")
+    ip_empty.run_cell("%config SqlMagic.pool_recycle = 60")
+    ip_empty.run_cell("%sql sqlite:///my.db")
+
+    pool = ConnectionManager.current.connection_sqlalchemy.engine.pool
+
+    assert isinstance(pool, QueuePool)
+    assert pool.size() == 2
+    assert pool._max_overflow == 3
+    assert pool._recycle == 60
+
+
+def test_pool_options_from_connections_file_section(ip_empty, tmp_empty):
+    Path("connections.ini").write_text(
+        """
+[duck]
+drivername = duckdb
+database = my.db
+pool_class = NullPool
+pool_pre_ping = true
+"""
+    )
+
+    ip_empty.run_cell("%config SqlMagic.dsn_filename = 'connections.ini'")
+    ip_empty.run_cell("%config SqlMagic.pool_class = 'QueuePool'")
+    ip_empty.run_cell("%sql --section duck")
+
+    pool = ConnectionManager.current.connection_sqlalchemy.engine.pool
+
+    # options in the connections file take precedence
+    assert isinstance(pool, NullPool)
+    assert pool._pre_ping
+
+
+def test_pool_class_invalid_value(ip, caplog):
+    with caplog.at_level(logging.ERROR):
+        ip.run_cell("%config SqlMagic.pool_class = 'StaticPool'")
+
+    assert "'StaticPool' is not a valid pool_class" in caplog.text
+
+
+def test_async(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(5)")
+
+    query = "SELECT SUM(x) AS total FROM numbers"
+    handle = ip_empty.run_cell(f"%sql --async {query}").result
+    result = handle.result(timeout=10)
+
+    assert isinstance(result, ResultSet)
+    assert result.dict() == {"total": (10,)}
+    assert handle.status == "done"
+    assert handle.elapsed > 0
+    assert "QueryHandle(status='done'" in repr(handle)
+    assert "<td>10</td>" in handle._repr_html_()
+
+
+def test_async_result_var(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+
+    handle = ip_empty.run_cell(
+        """%%sql --async result <<
+SELECT 42 AS x
+"""
+    ).result
+    handle.result(timeout=10)
+
+    assert ip_empty.user_ns["result"].dict() == {"x": (42,)}
+
+
+def test_async_error(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+
+    handle = ip_empty.run_cell("%sql --async SELECT * FROM missing_table").result
+
+    with pytest.raises(UsageError, match="missing_table"):
+        handle.result(timeout=10)
+
+    assert handle.status == "failed"
+    assert "missing_table" in handle._repr_html_()
+
+
+def test_async_cancel(ip_empty):
+    ip_empty.user_ns["conn"] = sqlite3.connect(":memory:", check_same_thread=False)
+    ip_empty.run_cell("%sql conn")
+
+    handle = ip_empty.run_cell(
+        "%sql --async WITH RECURSIVE c(x) AS "
+        "(SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+    ).result
+
+    # cancelling a pending query doesn't run it, wait until it starts
+    while handle.status == "pending":
+        time.sleep(0.01)
+
+    # interrupting before sqlite starts running the query has no effect
+    while not handle.done():
+        assert handle.cancel()
+        time.sleep(0.05)
+
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        handle.result(timeout=10)
+
+    assert handle.status == "cancelled"
+    # the connection can run other queries
+    assert ip_empty.run_cell("%sql SELECT 1 AS x").result.dict() == {"x": (1,)}
+
+
+def test_async_can_be_awaited(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    handle = ip_empty.run_cell("%sql --async SELECT 1 AS x").result
+
+    async def wait():
+        return await handle
+
+    assert asyncio.run(wait()).dict() == {"x": (1,)}
+
+
+def test_async_runs_in_a_pooled_connection(ip_empty, tmp_empty, monkeypatch):
+    ip_empty.run_cell("%sql duckdb:///numbers.db")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(5)")
+    running = threading.Event()
+    finish = threading.Event()
+    raw_execute = PooledConnection.raw_execute
+
+    def slow_raw_execute(self, query, parameters=None):
+        running.set()
+        finish.wait(timeout=10)
+        return raw_execute(self, query, parameters=parameters)
+
+    monkeypatch.setattr(PooledConnection, "raw_execute", slow_raw_execute)
+
+    handle = ip_empty.run_cell(
+        "%sql --async SELECT SUM(x) AS total FROM numbers"
+    ).result
+    running.wait(timeout=10)
+
+    # %sql doesn't wait for the background query
+    assert ip_empty.run_cell(
+        "%sql SELECT COUNT(*) AS n FROM numbers"
+    ).result.dict() == {"n": (5,)}
+    assert isinstance(handle._connection, PooledConnection)
+
+    finish.set()
+
+    assert handle.result(timeout=10).dict() == {"total": (10,)}
+
+
+def test_async_shows_the_rows_fetched_so_far(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell("%config SqlMagic.displaylimit = 2")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(5)")
+    conn = ConnectionManager.current
+    fetched = threading.Event()
+    finish = threading.Event()
+
+    def run(on_checkout, on_rows):
+        result_set = ResultSet(
+            conn.raw_execute("SELECT * FROM numbers"), SqlMagic(ip_empty), conn=conn
+        )
+        # the result set fetches 2 rows when it's created
+        result_set.fetchmany(1)
+        on_rows(result_set)
+        fetched.set()
+        finish.wait(timeout=10)
+        return result_set
+
+    handle = QueryHandle(conn, "SELECT * FROM numbers", run)
+    fetched.wait(timeout=10)
+
+    assert "3 rows fetched so far" in repr(handle)
+    assert "<td>1</td>" in handle._repr_html_()
+    assert "<td>2</td>" not in handle._repr_html_()
+
+    finish.set()
+    handle.result(timeout=10)
+
+    assert "fetched so far" not in repr(handle)
+
+
+@pytest.mark.parametrize(
+    "cell, error",
+    [
+        ("%sql --async --chunksize 10 SELECT 1", "Cannot use --async with --chunksize"),
+        ("%sql sqlite://\n%sql --async SELECT 1", "not supported for SQLite"),
+    ],
+)
+def test_async_unsupported(ip_empty, cell, error):
+    ip_empty.run_cell("%sql duckdb://")
+
+    with pytest.raises(UsageError, match=error):
+        for line in cell.splitlines():
+            ip_empty.run_cell(line).raise_error()
+
+
+_INFINITE_QUERY = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+    "SELECT COUNT(*) FROM c"
+)
+
+
+def test_timeout(ip_empty):
+    ip_empty.run_cell("%sql sqlite://")
+
+    with pytest.raises(UsageError, match=r"exceeding the timeout \(0.5s\)") as excinfo:
+        ip_empty.run_cell(f"%sql --timeout 0.5 {_INFINITE_QUERY}")
+
+    assert excinfo.value.error_type == "QueryTimeoutError"
+    # the connection can run other queries
+    assert ip_empty.run_cell("%sql SELECT 1 AS x").result.dict() == {"x": (1,)}
+
+
+def test_statement_timeout(ip_empty):
+    ip_empty.user_ns["conn"] = sqlite3.connect(":memory:")
+    ip_empty.run_cell("%sql conn")
+    ip_empty.run_cell("%config SqlMagic.statement_timeout = 0.5")
+
+    with pytest.raises(UsageError, match="exceeding the timeout") as excinfo:
+        ip_empty.run_cell(f"%sql {_INFINITE_QUERY}")
+
+    assert excinfo.value.error_type == "QueryTimeoutError"
+    assert ip_empty.run_cell("%sql SELECT 1 AS x").result.dict() == {"x": (1,)}
+
+
+def test_timeout_overrides_statement_timeout(ip_empty):
+    ip_empty.run_cell("%sql sqlite://")
+    ip_empty.run_cell("%config SqlMagic.statement_timeout = 60")
+
+    with pytest.raises(UsageError, match=r"exceeding the timeout \(0.5s\)"):
+        ip_empty.run_cell(f"%sql --timeout 0.5 {_INFINITE_QUERY}")
+
+
+def test_timeout_does_not_affect_fast_queries(ip_empty):
+    ip_empty.run_cell("%sql sqlite://")
+
+    result = ip_empty.run_cell("%sql --timeout 0.2 SELECT 1 AS x").result
+    # the watchdog is stopped when the query finishes
+    time.sleep(0.4)
+
+    assert result.dict() == {"x": (1,)}
+    assert ip_empty.run_cell("%sql SELECT 2 AS x").result.dict() == {"x": (2,)}
+
+
+def test_timeout_invalid_value(ip_empty):
+    ip_empty.run_cell("%sql sqlite://")
+
+    with pytest.raises(UsageError, match="--timeout cannot be negative, got: -1.0"):
+        ip_empty.run_cell("%sql --timeout -1 SELECT 1")
+
+
+def test_statement_timeout_invalid_value(ip, caplog):
+    with caplog.at_level(logging.ERROR):
+        ip.run_cell("%config SqlMagic.statement_timeout = -1")
+
+    assert "-1.0: statement_timeout cannot be negative" in caplog.text
+
+
+@pytest.fixture
+def table_ab(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell("%sql CREATE TABLE ab (a INT, b VARCHAR)")
+    yield ip_empty
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [{"a": 1, "b": "one"}, {"a": 2, "b": None}, {"a": None, "b": "three"}],
+        pd.DataFrame({"a": [1, 2, None], "b": ["one", None, "three"]}),
+        pl.DataFrame({"a": [1, 2, None], "b": ["one", None, "three"]}),
+    ],
+    ids=["list", "pandas", "polars"],
+)
+def test_executemany(table_ab, capsys, data):
+    table_ab.user_ns["data"] = data
+    table_ab.run_cell("%config SqlMagic.executemany_batch_size = 2")
+
+    table_ab.run_cell("%sql --executemany data INSERT INTO ab VALUES (:a, :b)")
+    result = table_ab.run_cell("%sql SELECT * FROM ab").result
+
+    assert result.dict() == {"a": (1, 2, None), "b": ("one", None, "three")}
+    # duckdb-engine doesn't report the rows affected by executemany
+    assert "Executed the statement for 3 rows." in capsys.readouterr().out
+
+
+def test_executemany_rows_affected(ip_empty, capsys):
+    ip_empty.run_cell("%sql sqlite://")
+    ip_empty.run_cell("%sql CREATE TABLE numbers (x INT)")
+    ip_empty.user_ns["rows"] = [{"x": x} for x in range(5)]
+
+    ip_empty.run_cell("%%sql --executemany rows\nINSERT INTO numbers VALUES (:x)")
+
+    assert "5 rows affected." in capsys.readouterr().out
+    assert ip_empty.run_cell("%sql SELECT SUM(x) AS s FROM numbers").result.dict() == {
+        "s": (10,)
+    }
+
+
+def test_executemany_dbapi_connection(ip_empty, capsys):
+    ip_empty.user_ns["conn"] = sqlite3.connect("")
+    ip_empty.run_cell("%sql conn")
+    ip_empty.run_cell("%sql CREATE TABLE ab (a INT, b VARCHAR)")
+    ip_empty.user_ns["rows"] = [{"b": "one:1", "a": 1}, {"b": "two", "a": 2}]
+
+    # the :name parameters are converted to the driver's paramstyle
+    ip_empty.run_cell("%sql --executemany rows INSERT INTO ab VALUES (:a, :b || ':c')")
+    result = ip_empty.run_cell("%sql SELECT * FROM ab").result
+
+    assert result.dict() == {"a": (1, 2), "b": ("one:1:c", "two:c")}
+    assert "2 rows affected." in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "connect",
+    [
+        "%sql sqlite://",
+        "%sql conn",
+    ],
+    ids=["sqlalchemy", "dbapi"],
+)
+def test_executemany_keeps_the_batches_before_an_error(ip_empty, capsys, connect):
+    ip_empty.user_ns["conn"] = sqlite3.connect("")
+    ip_empty.run_cell(connect)
+    ip_empty.run_cell("%sql CREATE TABLE numbers (x INT PRIMARY KEY)")
+    ip_empty.run_cell("%config SqlMagic.executemany_batch_size = 2")
+    ip_empty.user_ns["rows"] = [{"x": 1}, {"x": 2}, {"x": 1}, {"x": 3}]
+
+    with pytest.raises(Exception, match="UNIQUE constraint failed"):
+        ip_empty.run_cell("%sql --executemany rows INSERT INTO numbers VALUES (:x)")
+
+    assert "ran for the first 2 rows before the error" in capsys.readouterr().out
+    assert ip_empty.run_cell("%sql SELECT * FROM numbers").result.dict() == {
+        "x": (1, 2)
+    }
+
+
+@pytest.mark.parametrize(
+    "cell, error_type, error",
+    [
+        (
+            "%sql --executemany undefined INSERT INTO ab VALUES (:a, :b)",
+            "UsageError",
+            "Expected 'undefined' to be a data frame or a list of dictionaries",
+        ),
+        (
+            "%sql --executemany numbers INSERT INTO ab VALUES (:a, :b)",
+            "TypeError",
+            "found an element of type: int",
+        ),
+        (
+            "%sql --executemany number INSERT INTO ab VALUES (:a, :b)",
+            "TypeError",
+            "expects a data frame or a list of dictionaries, got: int",
+        ),
+        (
+            "%sql --executemany rows INSERT INTO ab VALUES (:a, :b); SELECT 1",
+            "UsageError",
+            "--executemany requires a single statement, got 2 statements",
+        ),
+        (
+            "%sql --executemany rows --async INSERT INTO ab VALUES (:a, :b)",
+            "UsageError",
+            "Cannot use --executemany with --async or --chunksize",
+        ),
+    ],
+)
+def test_executemany_error(table_ab, cell, error_type, error):
+    table_ab.user_ns["numbers"] = [1, 2]
+    table_ab.user_ns["number"] = 1
+    table_ab.user_ns["rows"] = [{"a": 1, "b": "one"}]
+
+    with pytest.raises(UsageError, match=re.escape(error)) as excinfo:
+        table_ab.run_cell(cell)
+
+    assert excinfo.value.error_type == error_type
+    assert table_ab.run_cell("%sql SELECT COUNT(*) AS n FROM ab").result.dict() == {
+        "n": (0,)
+    }
+
+
+@pytest.mark.parametrize("value", [0, -1])
+def test_executemany_batch_size_invalid_value(ip, caplog, value):
+    with caplog.at_level(logging.ERROR):
+        ip.run_cell(f"%config SqlMagic.executemany_batch_size = {value}")
+
+    assert f"{value}: executemany_batch_size must be a positive integer" in caplog.text
@@ -3,9 +3,11 @@ from pathlib import Path
 
 
 import pytest
+from IPython.core.error import UsageError
 
 from sql.parse import (
     connection_str_from_dsn_section,
+    pool_options_from_dsn_section,
     parse,
     without_sql_comment,
     magic_args,
@@ -291,6 +293,10 @@ def complete_with_defaults(mapping):
         "save": None,
         "with_": None,
         "no_execute": False,
+        "chunksize": None,
+        "async_": False,
+        "timeout": None,
+        "executemany": None,
     }
 
     return {**defaults, **mapping}
@@ -424,3 +430,72 @@ def test_connections_file_get_default_connection_url(tmp_empty, content, expecte
 
     cf = ConnectionsFile(path_to_file="conns.ini")
     assert cf.get_default_connection_url() == expected
+
+
+def test_connection_from_dsn_section_with_pool_options(tmp_empty):
+    Path("conns.ini").write_text(
+        """
+[pg]
+drivername = postgresql
+host = localhost
+database = db
+pool_class = QueuePool
+pool_size = 10
+max_overflow = -1
+pool_recycle = 3600
+pool_pre_ping = yes
+"""
+    )
+
+    class Config:
+        dsn_filename = "conns.ini"
+
+    assert connection_str_from_dsn_section("pg", Config) == "postgresql://localhost/db"
+    assert pool_options_from_dsn_section("pg", Config) == {
+        "pool_class": "QueuePool",
+        "pool_size": 10,
+        "max_overflow": -1,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+    }
+
+
+@pytest.mark.parametrize(
+    "key, value",
+    [
+        ("pool_size", "ten"),
+        ("pool_pre_ping", "maybe"),
+    ],
+)
+def test_pool_options_from_dsn_section_invalid_value(tmp_empty, key, value):
+    Path("conns.ini").write_text(
+        f"""
+[duck]
+drivername = duckdb
+{key} = {value}
+"""
+    )
+
+    class Config:
+        dsn_filename = "conns.ini"
+
+    with pytest.raises(UsageError) as excinfo:
+        pool_options_from_dsn_section("duck", Config)
+
+    assert excinfo.value.error_type == "ValueError"
+    assert f"Invalid value for {key!r} in the connections file" in str(excinfo.value)
+
+
+def test_connections_file_get_default_pool_options(tmp_empty):
+    Path("conns.ini").write_text(
+        """
+[default]
+drivername = duckdb
+pool_size = 2
+"""
+    )
+
+    cf = ConnectionsFile(path_to_file="conns.ini")
+
+    assert cf.get_default_connection_url() == "duckdb://"
+    assert cf.get_default_pool_options() == {"pool_size": 2}
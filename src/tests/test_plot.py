@@ -1,13 +1,22 @@
+import os
+import dataclasses
+import threading
 from typing import Iterator
+from unittest.mock import Mock
 from collections.abc import Mapping
 
+import duckdb
 import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow as pa
 from matplotlib import cbook
-from sql import plot
+from sql import plot, plot_cache, stats
 from sql.connection import ConnectionManager
 from pathlib import Path
 import pytest
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from IPython.core.error import UsageError
 import matplotlib
 
 
@@ -108,7 +117,7 @@ x, y
     ip_empty.run_cell("%sql INSTALL 'sqlite_scanner';")
     ip_empty.run_cell("%sql commit")
     ip_empty.run_cell("%sql LOAD 'sqlite_scanner';")
-    result = plot._summary_stats(ConnectionManager.current, "data.csv", column="x")
+    result = stats._summary_stats(ConnectionManager.current, "data.csv", column="x")
     expected = {"q1": 1.0, "med": 2.0, "q3": 5.0, "mean": 3.4, "N": 5.0}
     assert result == expected
 
@@ -122,10 +131,635 @@ def test_summary_stats_missing_file(chinook_db, ip_empty):
     ip_empty.run_cell("%sql commit")
     ip_empty.run_cell("%sql LOAD 'sqlite_scanner';")
     with pytest.raises(OperationalError) as e:
-        plot._summary_stats(ConnectionManager.current, "data.csv", column="x")
+        stats._summary_stats(ConnectionManager.current, "data.csv", column="x")
     assert 'No files found that match the pattern "data.csv"' in str(e)
 
 
+@pytest.fixture
+def outliers_table(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        """%%sql
+CREATE TABLE outliers AS
+SELECT range AS x, ((range % 10) * 1.5)::DOUBLE AS y,
+CASE WHEN range % 25 = 0 THEN 1000 + range ELSE range % 7 END AS z
+FROM range(201)
+"""
+    )
+    df = ip_empty.run_cell("%sql SELECT * FROM outliers").result.DataFrame()
+    yield ConnectionManager.current, df
+
+
+def test_boxplot_stats_many_columns_in_two_queries(outliers_table, monkeypatch):
+    conn, df = outliers_table
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+
+    result = plot._boxplot_stats_many(conn, "outliers", ["x", "y", "z"])
+
+    assert execute.call_count == 2
+
+    for column, column_stats in zip(["x", "y", "z"], result):
+        expected = cbook.boxplot_stats(df[column].astype(float))[0]
+        # fliers are returned in no particular order
+        column_stats["fliers"].sort()
+        expected["fliers"].sort()
+        assert DictOfFloats(column_stats) == DictOfFloats(expected)
+
+
+def test_summary_stats_many_without_percentile_disc(outliers_table, monkeypatch):
+    conn, _ = outliers_table
+    expected = stats._summary_stats_many(conn, "outliers", ["x", "y"])
+    monkeypatch.setattr(
+        conn,
+        "_capabilities",
+        dataclasses.replace(conn.capabilities, percentile_disc=False),
+    )
+    summary_stats = Mock(wraps=stats._summary_stats)
+    monkeypatch.setattr(stats, "_summary_stats", summary_stats)
+
+    result = stats._summary_stats_many(conn, "outliers", ["x", "y"])
+
+    assert summary_stats.call_count == 2
+    assert [DictOfFloats(s) for s in result] == [DictOfFloats(s) for s in expected]
+
+
+def test_summary_stats_many_error(outliers_table, monkeypatch, capsys):
+    conn, _ = outliers_table
+    error = ProgrammingError("SELECT", {}, Exception("no percentile_disc"))
+    monkeypatch.setattr(plot_cache, "fetchone", Mock(side_effect=error))
+
+    with pytest.raises(UsageError) as excinfo:
+        stats._summary_stats_many(conn, "outliers", ["x", "y"])
+
+    assert "Ensure that percentile_disc function is available" in str(excinfo.value)
+    assert excinfo.value.__cause__ is error
+    assert capsys.readouterr().out == ""
+
+
+def test_boxplot_stats_caps_fliers(outliers_table):
+    conn, df = outliers_table
+
+    result = plot._boxplot_stats(conn, "outliers", "z", max_fliers=3)
+
+    # we keep the outliers farthest from the median
+    assert sorted(result["fliers"]) == [1150.0, 1175.0, 1200.0]
+
+
+def test_boxplot_stats_autorange(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        "%sql CREATE TABLE constant AS SELECT * FROM (VALUES (1), (5), (5), (5), (5), "
+        "(5), (9)) t(x)"
+    )
+
+    result = plot._boxplot_stats(
+        ConnectionManager.current, "constant", "x", autorange=True
+    )
+    expected = cbook.boxplot_stats([1, 5, 5, 5, 5, 5, 9], autorange=True)[0]
+
+    assert DictOfFloats(result) == DictOfFloats(expected)
+
+
+@pytest.mark.parametrize(
+    "bins, binwidth",
+    [
+        (10, None),
+        (None, 7.5),
+    ],
+)
+def test_histogram_many_columns_in_two_queries(
+    outliers_table, monkeypatch, bins, binwidth
+):
+    conn, _ = outliers_table
+    expected = [
+        plot._histogram("outliers", column, bins, conn=conn, binwidth=binwidth)
+        for column in ["x", "y", "z"]
+    ]
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+
+    result = plot._histogram_many(
+        "outliers", ["x", "y", "z"], bins, conn=conn, binwidth=binwidth
+    )
+
+    assert result == expected
+    assert execute.call_count == 2
+
+
+def test_histogram_many_with_non_numeric_columns(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        "%sql CREATE TABLE mixed AS SELECT * FROM (VALUES (1, 'a', 2), "
+        "(2, 'b', NULL), (3, 'a', 5)) t(x, s, y)"
+    )
+    conn = ConnectionManager.current
+
+    result = plot._histogram_many("mixed", ["x", "s", "y"], 3, conn=conn)
+
+    assert result == [
+        plot._histogram("mixed", column, 3, conn=conn) for column in ["x", "s", "y"]
+    ]
+    assert result[1][:2] == (("a", "b"), (2, 1))
+
+
+@pytest.fixture
+def facets_table(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        """%%sql
+CREATE TABLE facets AS
+SELECT range AS x, chr((97 + range % 3)::INTEGER) AS facet,
+CASE WHEN range % 2 = 0 THEN 'u' ELSE 'v' END AS category,
+'value_' || (range % 4) AS s
+FROM range(100)
+"""
+    )
+    yield ConnectionManager.current
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"bins": 10},
+        {"bins": None, "binwidth": 15.0},
+        {"bins": None, "breaks": [0, 10, 50, 60]},
+    ],
+    ids=["bins", "binwidth", "breaks"],
+)
+@pytest.mark.parametrize("column", ["x", "s"])
+def test_facet_wrap_histogram_panels(facets_table, column, kwargs):
+    expected = {
+        value: plot._histogram(
+            "facets",
+            column,
+            conn=facets_table,
+            facet={"key": "facet", "value": value},
+            **kwargs,
+        )
+        for value in "abc"
+    }
+    results = {}
+
+    panels = {
+        value: plot._histogram(
+            "facets",
+            column,
+            conn=facets_table,
+            facet={"key": "facet", "value": value, "results": results},
+            **kwargs,
+        )
+        for value in "abc"
+    }
+
+    assert panels == expected
+    assert list(results) == [
+        (
+            "histogram_facets",
+            column,
+            kwargs["bins"],
+            plot._as_tuple(kwargs.get("breaks")),
+            kwargs.get("binwidth"),
+        )
+    ]
+
+
+def test_facet_wrap_histogram_panel_without_values_in_breaks(facets_table):
+    results = {}
+    facet = {"key": "facet", "value": "d", "results": results}
+
+    bin_, height, _ = plot._histogram(
+        "facets", "x", None, conn=facets_table, facet=facet, breaks=[0, 10, 20]
+    )
+
+    assert bin_ == (5.0, 15.0)
+    assert height == (0, 0)
+
+
+def test_facet_wrap_stacked_histogram_panels(facets_table, monkeypatch):
+    bin_, _, bin_size = plot._histogram("facets", "x", 10, conn=facets_table)
+    expected = [
+        plot._histogram_stacked(
+            "facets",
+            "x",
+            "category",
+            bin_,
+            bin_size,
+            conn=facets_table,
+            facet={"key": "facet", "value": value},
+        )
+        for value in "abc"
+    ]
+    execute = Mock(wraps=facets_table.execute)
+    monkeypatch.setattr(facets_table, "execute", execute)
+    results = {}
+
+    panels = [
+        plot._histogram_stacked(
+            "facets",
+            "x",
+            "category",
+            bin_,
+            bin_size,
+            conn=facets_table,
+            facet={"key": "facet", "value": value, "results": results},
+        )
+        for value in "abc"
+    ]
+
+    assert [[tuple(row) for row in rows] for rows in panels] == [
+        [tuple(row) for row in rows] for rows in expected
+    ]
+    assert execute.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        (
+            {"bins": (0.0, 2.5, 5.0), "bin_size": 2.5},
+            [(None, 0, 1, 0), ("v", 1, 1, 1), ("u", 1, 0, 2)],
+        ),
+        (
+            {"bins": (1.5, 4.5), "bin_size": None, "breaks": [0, 3, 6]},
+            [(None, 1, 0), ("v", 2, 1), ("u", 1, 2)],
+        ),
+    ],
+    ids=["bins", "breaks"],
+)
+def test_histogram_stacked(ip_empty, kwargs, expected):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        "%sql CREATE TABLE stacked AS SELECT * FROM (VALUES (0, 'u'), (1, 'v'), "
+        "(2, 'v'), (3, NULL), (4, 'u'), (5, 'v'), (6, 'u'), (NULL, 'u')) t(x, c)"
+    )
+
+    result = plot._histogram_stacked(
+        "stacked", "x", "c", conn=ConnectionManager.current, **kwargs
+    )
+
+    assert result == expected
+
+
+def test_histogram_stacked_query_does_not_grow_with_bins(facets_table, monkeypatch):
+    execute = Mock(wraps=facets_table.execute)
+    monkeypatch.setattr(facets_table, "execute", execute)
+    queries = []
+
+    for bins in [10, 500]:
+        bin_, _, bin_size = plot._histogram("facets", "x", bins, conn=facets_table)
+        plot._histogram_stacked(
+            "facets", "x", "category", bin_, bin_size, conn=facets_table
+        )
+        queries.append(execute.call_args[0][0])
+
+    # only the bin size changes
+    assert abs(len(queries[0]) - len(queries[1])) < 20
+
+
+@pytest.fixture
+def local_df(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(
+        {
+            "x": rng.normal(size=500),
+            "y": rng.integers(0, 20, size=500).astype(float),
+            "category": rng.choice(["a", "b", None], size=500),
+            "label": rng.choice(["p", "q", "r"], size=500),
+        }
+    )
+    df.loc[::13, "x"] = np.nan
+    ip_empty.push({"df": df})
+    yield ConnectionManager.current, df
+
+
+def _assert_close(result, expected):
+    for values, expected_values in zip(result[:2], expected[:2]):
+        assert np.allclose(
+            np.asarray(values, dtype=float), np.asarray(expected_values, dtype=float)
+        )
+
+
+@pytest.mark.parametrize(
+    "to_data_frame",
+    [lambda df: df, pl.from_pandas, pa.Table.from_pandas],
+    ids=["pandas", "polars", "pyarrow"],
+)
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"bins": 10},
+        {"bins": None, "binwidth": 0.5},
+        {"bins": None, "breaks": [-2, -1, 0, 2.5]},
+    ],
+    ids=["bins", "binwidth", "breaks"],
+)
+def test_local_histogram_matches_sql(local_df, to_data_frame, kwargs):
+    conn, df = local_df
+    local = plot._LocalTable("df", to_data_frame(df))
+
+    for column in ["x", "y"]:
+        expected = plot._histogram("df", column, conn=conn, **kwargs)
+        result = plot._histogram(local, column, conn=conn, **kwargs)
+        _assert_close(result, expected)
+        assert result[2] == pytest.approx(expected[2])
+
+    bin_, _, bin_size = plot._histogram("df", "x", conn=conn, **kwargs)
+    kwargs = {key: value for key, value in kwargs.items() if key != "bins"}
+    expected = plot._histogram_stacked(
+        "df", "x", "category", bin_, bin_size, conn=conn, **kwargs
+    )
+    result = plot._histogram_stacked(
+        local, "x", "category", bin_, bin_size, conn=conn, **kwargs
+    )
+
+    assert result == expected
+
+
+def test_local_boxplot_bar_and_pie_match_sql(local_df):
+    conn, df = local_df
+    local = plot._LocalTable("df", df)
+
+    expected = plot._boxplot_stats_many(conn, "df", ["x", "y"])
+    result = plot._boxplot_stats_many(conn, local, ["x", "y"])
+
+    for column_stats, expected_stats in zip(result, expected):
+        column_stats["fliers"].sort()
+        expected_stats["fliers"].sort()
+        assert DictOfFloats(column_stats) == DictOfFloats(expected_stats)
+
+    x, height, *labels = plot._bar("df", "label", conn=conn)
+    assert plot._bar(local, "label", conn=conn) == (
+        *zip(*sorted(zip(x, height))),
+        *labels,
+    )
+    assert plot._pie(local, ["label", "y"], conn=conn) == plot._pie(
+        "df", ["label", "y"], conn=conn
+    )
+
+
+@pytest.mark.parametrize("dtype", ["Int64", "Float64"])
+def test_local_histogram_nullable_dtypes(dtype):
+    df = pd.DataFrame({"x": pd.array([1, 2, None, 4, 5, 5], dtype=dtype)})
+    local = plot._LocalTable("df", df)
+
+    assert local.histogram("x", 3) == ((0.0, 2.0, 4.0), (1, 1, 3), 2.0)
+
+
+def test_resolve_table(local_df, ip_empty, monkeypatch):
+    conn, df = local_df
+
+    local = plot._resolve_table("df", conn)
+
+    assert isinstance(local, plot._LocalTable)
+    assert repr(local) == "'df'"
+    assert isinstance(plot._resolve_table(df, conn), plot._LocalTable)
+    # a saved snippet or a table that doesn't exist
+    assert plot._resolve_table("df", conn, with_=["df"]) == "df"
+    assert plot._resolve_table("another", conn) == "another"
+
+    monkeypatch.setattr(plot, "LOCAL_MAX_ROWS", 100)
+    assert plot._resolve_table("df", conn) == "df"
+
+
+def test_resolve_table_prefers_tables_with_the_same_name(local_df, ip_empty):
+    conn, _ = local_df
+    ip_empty.run_cell("%sql CREATE TABLE df AS SELECT 1 AS x")
+
+    assert plot._resolve_table("df", conn) == "df"
+
+
+def test_resolve_table_waits_for_background_queries(local_df, ip_empty):
+    conn, _ = local_df
+    conn._checkout_lock.acquire()
+    thread = threading.Thread(target=plot._resolve_table, args=("df", conn))
+    thread.start()
+    thread.join(timeout=0.2)
+
+    # the lookup doesn't run while another query uses the connection
+    assert thread.is_alive()
+
+    conn._checkout_lock.release()
+    thread.join()
+
+
+def test_resolve_table_other_databases(ip_empty):
+    ip_empty.run_cell("%sql sqlite://")
+    ip_empty.push({"df": pd.DataFrame({"x": [1, 2, 3]})})
+
+    assert plot._resolve_table("df", ConnectionManager.current) == "df"
+
+
+def test_sqlplot_data_frame_computes_the_plot_locally(local_df, ip_empty, monkeypatch):
+    conn, _ = local_df
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+
+    ax = ip_empty.run_cell("%sqlplot histogram --table df --column x y").result
+
+    assert ax.get_title() == "Histogram from 'df'"
+    # only checks that the table exists
+    assert execute.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        (
+            "%sqlplot histogram --table outliers --column x y --bins 5",
+            "%sqlplot histogram --table outliers --column x y --bins 5",
+        ),
+        (
+            "%sqlplot boxplot --table outliers --column x y",
+            "%sqlplot boxplot --table outliers --column x y --orient h",
+        ),
+        (
+            "%sqlplot bar --table outliers --column x",
+            "%sqlplot bar --table outliers --column x --orient h --show-numbers",
+        ),
+        (
+            "%sqlplot pie --table outliers --column x",
+            "%sqlplot pie --table outliers --column x --show-numbers",
+        ),
+    ],
+    ids=["histogram", "boxplot", "bar", "pie"],
+)
+def test_restyling_a_plot_does_not_rerun_queries(
+    outliers_table, ip_empty, monkeypatch, plot_cache_enabled, first, second
+):
+    conn, _ = outliers_table
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+
+    ip_empty.run_cell(first)
+    call_count = execute.call_count
+    ip_empty.run_cell(second)
+
+    # only checks that the table exists
+    assert call_count > 1
+    assert execute.call_count == call_count + 1
+
+
+def test_plot_data_cache_is_keyed_by_the_snippets(ip_empty, plot_cache_enabled):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(10)")
+    ip_empty.run_cell("%sql --save subset SELECT * FROM numbers WHERE x < 5")
+    conn = ConnectionManager.current
+
+    first = plot._histogram("subset", "x", 5, with_=["subset"], conn=conn)
+    ip_empty.run_cell("%sql --save subset SELECT * FROM numbers WHERE x >= 5")
+    second = plot._histogram("subset", "x", 5, with_=["subset"], conn=conn)
+
+    assert first[0][0] == 0
+    assert second[0][0] == 5
+
+
+def test_plot_data_cache_is_invalidated_by_writes(
+    outliers_table, ip_empty, plot_cache_enabled
+):
+    conn, _ = outliers_table
+
+    _, height, _ = plot._histogram("outliers", "x", 5, conn=conn)
+    ip_empty.run_cell("%sql INSERT INTO outliers VALUES (0, 0, 0)")
+    _, height_after_insert, _ = plot._histogram("outliers", "x", 5, conn=conn)
+
+    assert sum(height_after_insert) == sum(height) + 1
+
+
+def test_plot_data_cache_is_invalidated_by_persist_replace(
+    ip_empty, plot_cache_enabled
+):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.push({"df": pd.DataFrame({"x": ["a"]})})
+    ip_empty.run_cell("%sql --persist df")
+    conn = ConnectionManager.current
+
+    assert plot._bar("df", "x", conn=conn)[:2] == (("a",), (1,))
+
+    ip_empty.push({"df": pd.DataFrame({"x": ["b", "b"]})})
+    ip_empty.run_cell("%sql --persist-replace df")
+
+    assert plot._bar("df", "x", conn=conn)[:2] == (("b",), (2,))
+
+
+def test_plot_data_cache_disabled(
+    outliers_table, ip_empty, monkeypatch, plot_cache_enabled
+):
+    conn, _ = outliers_table
+    plot._histogram("outliers", "x", 5, conn=conn)
+
+    assert len(plot_cache._cache)
+
+    ip_empty.run_cell("%config SqlMagic.plot_cache = False")
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+
+    assert not len(plot_cache._cache)
+
+    plot._histogram("outliers", "x", 5, conn=conn)
+    plot._histogram("outliers", "x", 5, conn=conn)
+
+    assert not len(plot_cache._cache)
+    assert execute.call_count == 4
+
+
+def test_plot_data_cache_is_disabled_by_default(outliers_table, ip_empty):
+    conn, _ = outliers_table
+    plot._histogram("outliers", "x", 5, conn=conn)
+
+    assert not len(plot_cache._cache)
+
+
+def test_plot_data_cache_is_invalidated_when_a_file_changes(
+    ip_empty, tmp_empty, plot_cache_enabled
+):
+    Path("data.csv").write_text("x,y\na,1\na,2\n")
+    ip_empty.run_cell("%sql duckdb://")
+    conn = ConnectionManager.current
+
+    assert plot._bar("data.csv", "x", conn=conn)[:2] == (("a",), (2,))
+    assert len(plot_cache._cache)
+
+    Path("data.csv").write_text("x,y\nb,1\nb,2\nb,3\n")
+    # make sure the modification time changes even on coarse-grained filesystems
+    os.utime("data.csv", ns=(0, 0))
+
+    assert plot._bar("data.csv", "x", conn=conn)[:2] == (("b",), (3,))
+
+
+def test_plot_data_cache_with_dbapi_connection(ip_empty, plot_cache_enabled):
+    ip_empty.push({"duckdb_conn": duckdb.connect()})
+    ip_empty.run_cell("%sql duckdb_conn")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(10)")
+    conn = ConnectionManager.current
+
+    _, height, _ = plot._histogram("numbers", "x", 5, conn=conn)
+
+    assert sum(height) == 10
+    assert len(plot_cache._cache)
+
+
+def test_plot_data_cache_skips_data_frames(ip_empty, plot_cache_enabled):
+    ip_empty.run_cell("%sql duckdb://")
+    conn = ConnectionManager.current
+    # DuckDB finds the data frame in the caller's frame, the cache in the namespace
+    df = pd.DataFrame({"x": ["a"]})
+    ip_empty.push({"df": df})
+
+    assert plot._bar("df", "x", conn=conn)[:2] == (("a",), (1,))
+
+    df = pd.DataFrame({"x": ["b", "b"]})
+    ip_empty.push({"df": df})
+
+    assert plot._bar("df", "x", conn=conn)[:2] == (("b",), (2,))
+    assert not len(plot_cache._cache)
+
+
+def test_plot_temporary_table(ip_empty, tmp_empty):
+    ip_empty.run_cell("%sql sqlite:///my.db")
+    ip_empty.run_cell("%sql CREATE TEMP TABLE t AS SELECT 'a' AS x")
+
+    assert plot._bar("t", "x", conn=ConnectionManager.current)[:2] == (("a",), (1,))
+
+
+def test_plot_data_cache_evicts_least_recently_used(
+    outliers_table, monkeypatch, plot_cache_enabled
+):
+    conn, _ = outliers_table
+    monkeypatch.setattr(plot_cache._cache, "max_entries", 2)
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+
+    plot_cache.fetchall(conn, "SELECT 1")
+    plot_cache.fetchall(conn, "SELECT 2")
+    plot_cache.fetchall(conn, "SELECT 1")
+    plot_cache.fetchall(conn, "SELECT 3")
+
+    assert len(plot_cache._cache) == 2
+    assert execute.call_count == 3
+
+    plot_cache.fetchall(conn, "SELECT 1")
+    plot_cache.fetchall(conn, "SELECT 2")
+
+    assert execute.call_count == 4
+
+
+def test_plot_data_cache_is_keyed_by_the_fetch_method(
+    outliers_table, monkeypatch, plot_cache_enabled
+):
+    conn, _ = outliers_table
+    execute = Mock(wraps=conn.execute)
+    monkeypatch.setattr(conn, "execute", execute)
+    query = "SELECT * FROM range(3)"
+
+    assert plot_cache.fetchone(conn, query) == (0,)
+    assert plot_cache.fetchall(conn, query) == [(0,), (1,), (2,)]
+    assert plot_cache.fetchone(conn, query) == (0,)
+    assert plot_cache.fetchall(conn, query) == [(0,), (1,), (2,)]
+    assert execute.call_count == 2
+
+
 def test_internal_histogram_with_nulls(tmp_empty, ip):
     # sheri, mick missing age
     Path("data.csv").write_text(
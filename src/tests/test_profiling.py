@@ -0,0 +1,428 @@
+import sqlite3
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import duckdb
+import pytest
+from IPython.core.error import UsageError
+
+from sql import profiling, profile_cache
+from sql.connection import ConnectionManager
+
+
+def _create_wide_table(ip, num_columns):
+    columns = ", ".join(
+        f"i AS num_{i}, 'value_' || (i % 3) AS str_{i}" for i in range(num_columns)
+    )
+    ip.run_cell(f"%sql CREATE TABLE wide AS SELECT {columns} FROM range(10) t(i)")
+
+
+@pytest.mark.parametrize("num_columns", [1, 10, 50])
+def test_number_of_queries_does_not_depend_on_the_number_of_columns(
+    ip_empty, monkeypatch, num_columns
+):
+    ip_empty.run_cell("%sql duckdb://")
+    _create_wide_table(ip_empty, num_columns)
+
+    conn = ConnectionManager.current
+    raw_execute = Mock(wraps=conn.raw_execute)
+    monkeypatch.setattr(conn, "raw_execute", raw_execute)
+
+    ip_empty.run_cell("%sqlcmd profile --table wide")
+
+    # check the table exists, first row, top/freq, min/max/count/unique, mean
+    # and std/percentiles
+    assert raw_execute.call_count == 6
+
+
+def test_compute_statistics_falls_back_to_one_query_per_column(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        """%%sql
+CREATE TABLE numbers AS
+SELECT * FROM (VALUES (1, '2.5'), (2, '3.5'), (3, '4.5')) t(number, as_str)
+"""
+    )
+    conn = ConnectionManager.current
+
+    # AVG fails for the VARCHAR column but we still get the mean of the other
+    table_stats, computed = profiling.compute_statistics(
+        conn, "numbers", ["number", "as_str"], ["number", "as_str"]
+    )
+
+    assert "mean" in computed
+    assert table_stats["number"]["mean"] == "2.0000"
+    assert table_stats["number"]["min"] == 1
+    assert table_stats["as_str"]["unique"] == 3
+
+
+def test_compute_statistics_chunks_columns(ip_empty, monkeypatch):
+    monkeypatch.setattr(profiling, "COLUMNS_PER_QUERY", 2)
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell(
+        "%sql CREATE TABLE numbers AS SELECT 1 AS a, 2 AS b, 3 AS c, 'x' AS d"
+    )
+    conn = ConnectionManager.current
+    raw_execute = Mock(wraps=conn.raw_execute)
+    monkeypatch.setattr(conn, "raw_execute", raw_execute)
+
+    table_stats, _ = profiling.compute_statistics(
+        conn, "numbers", ["a", "b", "c", "d"], ["a", "b", "c"]
+    )
+
+    assert [table_stats[column]["max"] for column in "abc"] == [1, 2, 3]
+    assert table_stats["d"]["top"] == "x"
+    # top/freq: 1, min/max/count/unique: 2, mean: 2, std/percentiles: 2
+    assert raw_execute.call_count == 7
+
+
+@pytest.mark.parametrize(
+    "connect, dialect",
+    [
+        [duckdb.connect, "duckdb"],
+        [sqlite3.connect, "sqlite"],
+    ],
+    ids=["grouping-sets", "one-query-per-column"],
+)
+def test_top_query(connect, dialect):
+    conn = connect(":memory:")
+    conn.execute("CREATE TABLE t (x INT, y VARCHAR)")
+    conn.execute("INSERT INTO t VALUES (1, 'a'), (1, 'b'), (2, 'b'), (NULL, 'b')")
+    build_query, read_results = profiling._top_query("t", dialect)
+
+    result = conn.execute(build_query(["x", "y"]))
+
+    assert read_results(result, ["x", "y"]) == {"x": (1, 2), "y": ("b", 3)}
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        ["duckdb", "GROUP BY GROUPING SETS ((x), (y))) AS grouped) AS ranked"],
+        ["oracle", "GROUP BY GROUPING SETS ((x), (y))) grouped) ranked"],
+        ["mysql", "ORDER BY frequency DESC LIMIT 1) AS top_1"],
+    ],
+)
+def test_top_query_is_rendered_for_the_dialect(dialect, expected):
+    build_query, _ = profiling._top_query("t", dialect)
+
+    assert expected in build_query(["x", "y"])
+
+
+def test_top_query_keeps_the_sampling_clause():
+    table = "(SELECT * FROM t TABLESAMPLE SYSTEM (5.0)) profile_sample"
+    build_query, _ = profiling._top_query(table, "postgres")
+
+    assert f"FROM {table} GROUP BY" in build_query(["x"])
+
+
+def test_get_columns_and_first_row_empty_table(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell("%sql CREATE TABLE empty (x INT, y VARCHAR)")
+
+    columns, first_row = profiling.get_columns_and_first_row(
+        ConnectionManager.current, "empty"
+    )
+
+    assert columns == ["x", "y"]
+    assert first_row == (None, None)
+
+
+@pytest.mark.parametrize(
+    "sample, expected",
+    [
+        (None, None),
+        (1000, ("rows", 1000)),
+        ("1000", ("rows", 1000)),
+        ("10%", ("percent", 10.0)),
+        (" 2.5% ", ("percent", 2.5)),
+        ("100%", ("percent", 100.0)),
+    ],
+)
+def test_parse_sample(sample, expected):
+    assert profiling.parse_sample(sample) == expected
+
+
+@pytest.mark.parametrize("sample", ["0", "-10", "abc", "0%", "101%", "10.5", "%"])
+def test_parse_sample_error(sample):
+    with pytest.raises(UsageError, match="Invalid sample") as excinfo:
+        profiling.parse_sample(sample)
+
+    assert excinfo.value.error_type == "UsageError"
+
+
+@pytest.mark.parametrize(
+    "dialect, sample, expected",
+    [
+        (
+            "duckdb",
+            ("rows", 10),
+            "(SELECT * FROM t USING SAMPLE 10 ROWS) profile_sample",
+        ),
+        (
+            "duckdb",
+            ("percent", 5.0),
+            "(SELECT * FROM t USING SAMPLE 5.0%) profile_sample",
+        ),
+        (
+            "postgres",
+            ("percent", 5.0),
+            "(SELECT * FROM t TABLESAMPLE SYSTEM (5.0) REPEATABLE (42)) profile_sample",
+        ),
+        (
+            "sqlite",
+            ("rows", 10),
+            "(SELECT * FROM t ORDER BY RANDOM() LIMIT 10) profile_sample",
+        ),
+        (
+            "oracle",
+            ("rows", 10),
+            "(SELECT * FROM t ORDER BY DBMS_RANDOM.VALUE FETCH FIRST 10 ROWS ONLY) "
+            "profile_sample",
+        ),
+        (
+            "bigquery",
+            ("rows", 10),
+            "(SELECT * FROM t ORDER BY RAND() LIMIT 10) profile_sample",
+        ),
+    ],
+)
+def test_sample_table(dialect, sample, expected):
+    conn = Mock()
+    conn.capabilities.sqlglot_dialect = dialect
+
+    assert profiling.sample_table(conn, "t", sample, seed=42) == expected
+
+
+def test_sample_table_percent_not_supported():
+    conn = Mock()
+    conn.capabilities.sqlglot_dialect = "sqlite"
+
+    with pytest.raises(UsageError, match="not supported for sqlite"):
+        profiling.sample_table(conn, "t", ("percent", 10.0))
+
+
+def test_sampled_table_with_seed():
+    conn = Mock()
+    conn.capabilities.sqlglot_dialect = "postgres"
+
+    with profiling.sampled_table(conn, "t", ("percent", 5.0), seed=42) as table:
+        assert table == profiling.sample_table(conn, "t", ("percent", 5.0), seed=42)
+
+    conn.temporary_table.assert_not_called()
+
+
+def test_sampled_table_without_temporary_tables():
+    conn = Mock()
+    conn.capabilities.sqlglot_dialect = "bigquery"
+    conn.capabilities.temporary_tables = False
+
+    with pytest.raises(UsageError, match="Sampling is not supported for bigquery"):
+        with profiling.sampled_table(conn, "t", ("rows", 10)):
+            pass
+
+    conn.temporary_table.assert_not_called()
+
+
+def _get_rows(report):
+    return {row[0]: row[1:] for row in report._table.rows}
+
+
+def test_profile_sample(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(100)")
+
+    report = ip_empty.run_cell("%sqlcmd profile --table numbers --sample 10").result
+    rows = _get_rows(report)
+
+    assert rows["count*"] == [10]
+    assert "computed on a random sample of 10 rows" in report._table_html
+    assert "95% margin of error" in report._table_html
+
+
+def test_profile_approx(ip_empty):
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(100)")
+
+    report = ip_empty.run_cell("%sqlcmd profile --table numbers --approx").result
+    rows = _get_rows(report)
+
+    assert rows["count"] == [100]
+    assert set(rows) >= {"unique*", "25%*", "50%*", "75%*", "std", "mean"}
+    assert "HyperLogLog estimate" in report._table_html
+
+
+def test_profile_approx_not_supported(ip_empty):
+    ip_empty.run_cell("%sql sqlite://")
+    ip_empty.run_cell("%sql CREATE TABLE numbers (x INT)")
+    ip_empty.run_cell("%sql INSERT INTO numbers VALUES (1), (2), (2)")
+
+    report = ip_empty.run_cell("%sqlcmd profile --table numbers --approx").result
+    rows = _get_rows(report)
+
+    assert rows["unique"] == [2]
+    assert "Estimated statistics" not in report._table_html
+
+
+@pytest.fixture
+def sqlite_file_table(ip_empty, tmp_empty):
+    ip_empty.run_cell("%sql sqlite:///profile.db")
+    ip_empty.run_cell(
+        "%sql CREATE TABLE numbers (a INT, b FLOAT, c INT, d VARCHAR(10), e INT)"
+    )
+    ip_empty.run_cell(
+        "%sql INSERT INTO numbers VALUES (1, 1.5, 3, 'x', 5), (2, 2.5, 1, 'y', 5), "
+        "(3, 3.5, 2, 'x', 5)"
+    )
+    yield ConnectionManager.current
+
+
+def test_concurrent_profiling_returns_the_same_results(sqlite_file_table, monkeypatch):
+    monkeypatch.setattr(profiling, "COLUMNS_PER_QUERY", 2)
+    conn = sqlite_file_table
+    columns = ["a", "b", "c", "d", "e"]
+    numeric = ["a", "b", "c", "e"]
+    connect = Mock(wraps=conn.connection_sqlalchemy.engine.connect)
+    monkeypatch.setattr(conn.connection_sqlalchemy.engine, "connect", connect)
+
+    expected = profiling.compute_statistics(
+        conn, "numbers", columns, numeric, concurrency=1
+    )
+    connect.assert_not_called()
+
+    stats, computed = profiling.compute_statistics(
+        conn, "numbers", columns, numeric, concurrency=3
+    )
+
+    assert (stats, computed) == expected
+    assert list(stats) == columns
+    # top/freq: 1, min/max/count/unique: 3, mean: 2
+    assert connect.call_count == 6
+
+
+def test_get_concurrency(sqlite_file_table, ip_empty):
+    ip_empty.run_cell("%config SqlMagic.profile_concurrency = 4")
+
+    # sqlite is always profiled sequentially
+    assert profiling.get_concurrency(sqlite_file_table) == 1
+
+    conn = Mock()
+    conn.is_dbapi_connection = False
+    conn.capabilities.sqlglot_dialect = "postgres"
+    conn._config.profile_concurrency = 4
+    conn.has_session_state = False
+
+    assert profiling.get_concurrency(conn) == 4
+
+    conn.has_session_state = True
+
+    assert profiling.get_concurrency(conn) == 1
+
+    conn.has_session_state = False
+
+    conn.is_dbapi_connection = True
+
+    assert profiling.get_concurrency(conn) == 1
+
+
+def test_sampled_table_stores_the_sample_in_a_temporary_table(sqlite_file_table):
+    conn = ConnectionManager.current
+
+    with profiling.sampled_table(conn, "numbers", ("rows", 2)) as table:
+        first = conn.raw_execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+        second = conn.raw_execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+
+        assert table.startswith("profile_sample_")
+        assert len(first) == 2
+        assert first == second
+
+    tables = conn.raw_execute(
+        f"SELECT name FROM sqlite_temp_master WHERE name = '{table}'"
+    ).fetchall()
+    assert tables == []
+    # the sample is dropped, so it doesn't prevent using the pool
+    assert not conn.has_session_state
+
+
+@pytest.fixture
+def profile_cache_db(ip_empty, tmp_empty):
+    ip_empty.run_cell("%config SqlMagic.profile_cache_filename = 'cache/profiles.db'")
+    ip_empty.run_cell("%sql duckdb:///numbers.db")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(5)")
+
+    compute_statistics = Mock(wraps=profiling.compute_statistics)
+
+    with patch.object(profiling, "compute_statistics", compute_statistics):
+        yield compute_statistics
+
+
+def test_profile_is_cached(ip_empty, profile_cache_db):
+    first = ip_empty.run_cell("%sqlcmd profile --table numbers").result
+    second = ip_empty.run_cell("%sqlcmd profile --table numbers").result
+
+    assert profile_cache_db.call_count == 1
+    assert Path("cache", "profiles.db").is_file()
+    assert second._table_html == first._table_html
+    assert second._table.rows == first._table.rows
+
+
+def test_profile_cache_is_invalidated_when_the_table_changes(
+    ip_empty, profile_cache_db
+):
+    ip_empty.run_cell("%sqlcmd profile --table numbers")
+    ip_empty.run_cell("%sql INSERT INTO numbers VALUES (100)")
+    report = ip_empty.run_cell("%sqlcmd profile --table numbers").result
+
+    assert profile_cache_db.call_count == 2
+    assert _get_rows(report)["max"] == [100]
+
+
+def test_profile_cache_is_keyed_by_options(ip_empty, profile_cache_db):
+    ip_empty.run_cell("%sqlcmd profile --table numbers")
+    ip_empty.run_cell("%sqlcmd profile --table numbers --approx")
+    ip_empty.run_cell("%sqlcmd profile --table numbers --approx")
+
+    assert profile_cache_db.call_count == 2
+
+
+def test_profile_refresh(ip_empty, profile_cache_db):
+    ip_empty.run_cell("%sqlcmd profile --table numbers")
+    ip_empty.run_cell("%sqlcmd profile --table numbers --refresh")
+    ip_empty.run_cell("%sqlcmd profile --table numbers")
+
+    assert profile_cache_db.call_count == 2
+
+
+def test_profile_cache_disabled(ip_empty, profile_cache_db):
+    ip_empty.run_cell("%config SqlMagic.profile_cache_filename = ''")
+    ip_empty.run_cell("%sqlcmd profile --table numbers")
+    ip_empty.run_cell("%sqlcmd profile --table numbers")
+
+    assert profile_cache_db.call_count == 2
+    assert not Path("cache", "profiles.db").exists()
+
+
+def test_profile_in_memory_database_is_not_cached(ip_empty, tmp_empty):
+    ip_empty.run_cell("%config SqlMagic.profile_cache_filename = 'profiles.db'")
+    ip_empty.run_cell("%sql duckdb://")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(5)")
+
+    ip_empty.run_cell("%sqlcmd profile --table numbers")
+
+    assert not Path("profiles.db").exists()
+
+
+def test_profile_cache_is_disabled_by_default(ip_empty, tmp_empty):
+    ip_empty.run_cell("%sql duckdb:///numbers.db")
+    ip_empty.run_cell("%sql CREATE TABLE numbers AS SELECT range AS x FROM range(5)")
+
+    assert profile_cache.get_cache(ConnectionManager.current) is None
+
+
+@pytest.mark.parametrize("dialect", ["postgres", "mysql"])
+def test_fingerprint_without_reliable_change_marker(dialect):
+    conn = Mock()
+    conn.capabilities.sqlglot_dialect = dialect
+
+    assert profile_cache.get_fingerprint(conn, "numbers") is None
+    conn.raw_execute.assert_not_called()
@@ -8,11 +8,18 @@ from pathlib import Path
 
 import pytest
 import pandas as pd
+from IPython.core.error import UsageError
 import polars as pl
 import sqlalchemy
+import pyarrow as pa
 
 from sql.connection import DBAPIConnection, SQLAlchemyConnection
+from sql.run import resultset
 from sql.run.resultset import ResultSet
+from sql.run.arrow import ArrowBuffer, ArrowResultProxy
+from sql.run.table import TableRenderer, _format_links
+from sql.connection import capabilities
+from sql.connection.capabilities import get_arrow_batches
 from sql.connection.connection import IS_SQLALCHEMY_ONE
 
 
@@ -60,16 +67,10 @@ def test_resultset_dicts(result_set):
 
 
 def test_resultset_dataframe(result_set, config):
-    # since this will use the native method, the issue will be re-executed
-    # so we need to create the df here so duckdb can find it
-    df = pd.DataFrame({"x": range(3)})  # noqa
     assert result_set.DataFrame().equals(pd.DataFrame({"x": range(3)}))
 
 
 def test_resultset_polars_dataframe(result_set):
-    # since this will use the native method, the issue will be re-executed
-    # so we need to create the df here so duckdb can find it
-    df = pd.DataFrame({"x": range(3)})  # noqa
     assert result_set.PolarsDataFrame().frame_equal(pl.DataFrame({"x": range(3)}))
 
 
@@ -635,3 +636,527 @@ def test_doesnt_refresh_sqlaproxy_if_different_connection():
     list(first_set)
 
     assert id(first_set._sqlaproxy) == original_id
+
+
+@pytest.fixture
+def config_arrow(config):
+    config.result_storage = "arrow"
+    return config
+
+
+@pytest.fixture
+def result_set_arrow(result, config_arrow):
+    result_set, conn = result
+    return ResultSet(result_set, config_arrow, statement="select * from df", conn=conn)
+
+
+def test_resultset_arrow_stores_record_batches(result_set_arrow):
+    list(result_set_arrow)
+
+    assert isinstance(result_set_arrow._results, ArrowBuffer)
+    assert result_set_arrow._results.to_table().num_rows == 3
+
+
+def test_resultset_arrow_getitem(result_set_arrow):
+    assert result_set_arrow[0] == (0,)
+    assert result_set_arrow[0:2] == [(0,), (1,)]
+
+    # force fetching
+    list(result_set_arrow)
+
+    assert result_set_arrow[-1] == (2,)
+    assert result_set_arrow[::2] == [(0,), (2,)]
+
+
+def test_resultset_arrow_dict_len_and_iter(result_set_arrow):
+    assert result_set_arrow.dict() == {"x": (0, 1, 2)}
+    assert len(result_set_arrow) == 3
+    assert list(result_set_arrow) == [(0,), (1,), (2,)]
+    assert list(result_set_arrow.dicts()) == [{"x": 0}, {"x": 1}, {"x": 2}]
+
+
+def test_resultset_arrow_csv(result_set_arrow, tmp_empty):
+    result_set_arrow.csv("file.csv")
+
+    assert Path("file.csv").read_text() == "x\n0\n1\n2\n"
+
+
+def test_resultset_arrow_dataframes(result_set_arrow):
+    assert result_set_arrow.DataFrame().equals(pd.DataFrame({"x": range(3)}))
+    assert result_set_arrow.PolarsDataFrame().frame_equal(pl.DataFrame({"x": range(3)}))
+
+
+@pytest.mark.parametrize(
+    "make_connection, result_storage",
+    [
+        (lambda: SQLAlchemyConnection(create_engine("sqlite://")), "rows"),
+        (lambda: SQLAlchemyConnection(create_engine("sqlite://")), "arrow"),
+        (lambda: DBAPIConnection(duckdb.connect()), "arrow"),
+    ],
+    ids=["rows", "arrow", "native-arrow"],
+)
+def test_resultset_dataframes_with_duplicate_columns(
+    ip_empty, make_connection, result_storage
+):
+    conn = make_connection()
+
+    mock = Mock()
+    mock.displaylimit = 10
+    mock.autolimit = 0
+    mock.result_storage = result_storage
+
+    statement = "SELECT 1 AS a, 2 AS a"
+    rs = ResultSet(conn.raw_execute(statement), mock, statement=statement, conn=conn)
+    df = rs.DataFrame()
+
+    assert list(df.columns) == ["a", "a"]
+    assert df.values.tolist() == [[1, 2]]
+
+    with pytest.raises(pl.exceptions.DuplicateError):
+        rs.PolarsDataFrame()
+
+
+def test_resultset_arrow_fetches_in_batches(results, monkeypatch):
+    monkeypatch.setattr(resultset, "ARROW_FETCH_BATCH_SIZE", 2)
+
+    mock = Mock()
+    mock.displaylimit = 1
+    mock.autolimit = 0
+    mock.result_storage = "arrow"
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+
+    assert list(rs) == [(1,), (2,), (3,), (4,), (5,)]
+    results.fetchall.assert_not_called()
+    assert results.fetchmany.call_args_list == [
+        call(size=2),
+        call(size=2),
+        call(size=2),
+    ]
+    assert len(rs._results._batches) == 3
+
+
+def test_resultset_arrow_null_first_batch(ip_empty, monkeypatch):
+    monkeypatch.setattr(resultset, "ARROW_FETCH_BATCH_SIZE", 1)
+    conn = SQLAlchemyConnection(create_engine("duckdb://"))
+    conn.execute("CREATE TABLE a (x INT)")
+    conn.execute("INSERT INTO a VALUES (NULL), (NULL), (1)")
+
+    mock = Mock()
+    mock.displaylimit = 10
+    mock.autolimit = 0
+    mock.result_storage = "arrow"
+
+    statement = "SELECT * FROM a"
+    rs = ResultSet(conn.raw_execute(statement), mock, statement=statement, conn=conn)
+
+    assert rs.dict() == {"x": (None, None, 1)}
+    assert rs._results.to_table().schema.field("x").type == "int64"
+
+
+def test_resultset_arrow_falls_back_to_rows_with_mixed_types(sqlite_sqlalchemy):
+    sqlite_sqlalchemy.execute("CREATE TABLE a (x)")
+    sqlite_sqlalchemy.execute("INSERT INTO a VALUES (1), ('a'), (2.5)")
+
+    mock = Mock()
+    mock.displaylimit = 10
+    mock.autolimit = 0
+    mock.result_storage = "arrow"
+
+    statement = "SELECT * FROM a"
+    rs = ResultSet(
+        sqlite_sqlalchemy.raw_execute(statement),
+        mock,
+        statement=statement,
+        conn=sqlite_sqlalchemy,
+    )
+
+    assert list(rs) == [(1,), ("a",), (2.5,)]
+    assert not rs._is_columnar()
+    assert rs.DataFrame().to_dict() == {"x": {0: 1, 1: "a", 2: 2.5}}
+
+
+def test_resultset_uses_arrow_batches_with_native_duckdb(mock_config):
+    conn = DBAPIConnection(duckdb.connect())
+    statement = "SELECT random() AS x FROM range(5000)"
+
+    rs = ResultSet(conn.raw_execute(statement), mock_config, statement, conn=conn)
+    preview = rs[0:2]
+    df = rs.DataFrame()
+
+    assert isinstance(rs._sqlaproxy, ArrowResultProxy)
+    assert len(df) == 5000
+    # the values would be different if the query was executed again
+    assert list(df.x[:2]) == [row[0] for row in preview]
+    assert list(rs.PolarsDataFrame()["x"]) == list(df.x)
+    assert [row[0] for row in rs] == list(df.x)
+
+
+def test_resultset_arrow_batches_return_the_driver_types(mock_config):
+    conn = DBAPIConnection(duckdb.connect())
+    # SUM returns a HUGEINT, which arrow represents as decimal128(38, 0)
+    statement = (
+        "SELECT SUM(range) AS total, 170141183460469231731687303715884105727::HUGEINT"
+        " AS big, 1.5::DECIMAL(10, 2) AS dec, NULL::HUGEINT AS missing FROM range(10)"
+    )
+    expected = conn.raw_execute(statement).fetchall()
+
+    rs = ResultSet(conn.raw_execute(statement), mock_config, statement, conn=conn)
+
+    assert isinstance(rs._sqlaproxy, ArrowResultProxy)
+    assert list(rs) == expected
+    assert [type(value) for value in rs[0]] == [type(value) for value in expected[0]]
+
+
+def test_resultset_arrow_batches_empty_results(mock_config):
+    conn = DBAPIConnection(duckdb.connect())
+    statement = "SELECT * FROM range(5000) WHERE range < 0"
+
+    rs = ResultSet(conn.raw_execute(statement), mock_config, statement, conn=conn)
+
+    assert list(rs) == []
+    assert rs.DataFrame().to_dict() == {"range": {}}
+
+
+class FakeArrowCursor:
+    """Mimics the cursor of a driver that returns results in Arrow format"""
+
+    description = [("x",), ("y",)]
+    rowcount = -1
+
+    def __init__(self, table, method):
+        self._table = table
+        self.method = method
+        self.closed = False
+        self.fetchmany = Mock()
+        self.fetchall = Mock()
+
+    def close(self):
+        self.closed = True
+
+    def __getattr__(self, name):
+        if name != self.method:
+            raise AttributeError(name)
+
+        if name == "fetch_arrow_batches":
+            return lambda: iter([self._table.slice(0, 2), self._table.slice(2)])
+        elif name == "fetch_arrow_all":
+            return lambda: self._table
+        elif name == "_query_job":
+            return Mock(to_arrow=lambda: self._table)
+
+        return lambda: self._table
+
+
+@pytest.mark.parametrize(
+    "method",
+    [
+        "fetch_arrow_batches",
+        "fetch_arrow_table",
+        "fetch_arrow_all",
+        "_query_job",
+    ],
+)
+def test_resultset_uses_arrow_cursor(method, mock_config):
+    table = pa.table({"x": [1, 2, 3], "y": ["a", "b", "c"]})
+    cursor = FakeArrowCursor(table, method)
+    conn = Mock()
+    conn.dialect = None
+
+    rs = ResultSet(cursor, mock_config, statement=None, conn=conn)
+
+    assert rs[0:2] == [(1, "a"), (2, "b")]
+    assert rs.DataFrame().to_dict() == {
+        "x": {0: 1, 1: 2, 2: 3},
+        "y": {0: "a", 1: "b", 2: "c"},
+    }
+    assert rs.PolarsDataFrame().to_dict(as_series=False) == {
+        "x": [1, 2, 3],
+        "y": ["a", "b", "c"],
+    }
+    assert list(rs) == [(1, "a"), (2, "b"), (3, "c")]
+    cursor.fetchmany.assert_not_called()
+    cursor.fetchall.assert_not_called()
+
+    rs.close()
+    assert cursor.closed
+
+
+def test_get_arrow_batches_ignores_unknown_sqlalchemy_dialects(sqlite_sqlalchemy):
+    result = sqlite_sqlalchemy.raw_execute("SELECT 1")
+    assert get_arrow_batches(result, dialect="sqlite") is None
+
+
+def test_get_arrow_batches_returns_none_without_pyarrow(monkeypatch):
+    monkeypatch.setattr(capabilities, "pa", None)
+    cursor = duckdb.connect().execute("SELECT 1")
+    assert get_arrow_batches(cursor) is None
+
+
+@pytest.fixture
+def count_duckdb_engine_executions(monkeypatch):
+    import duckdb_engine
+
+    statements = []
+    execute = duckdb_engine.ConnectionWrapper.execute
+
+    def execute_and_count(self, statement, *args, **kwargs):
+        statements.append(statement)
+        return execute(self, statement, *args, **kwargs)
+
+    monkeypatch.setattr(duckdb_engine.ConnectionWrapper, "execute", execute_and_count)
+    yield statements
+
+
+@pytest.mark.parametrize("method", ["DataFrame", "PolarsDataFrame"])
+def test_converting_duckdb_sqlalchemy_results_executes_query_once(
+    count_duckdb_engine_executions, mock_config, method
+):
+    conn = SQLAlchemyConnection(create_engine("duckdb://"))
+    statement = "SELECT * FROM range(5000)"
+
+    rs = ResultSet(conn.raw_execute(statement), mock_config, statement, conn=conn)
+    frame = getattr(rs, method)()
+
+    assert len(frame) == 5000
+    assert len(rs) == 5000
+    assert count_duckdb_engine_executions.count(statement) == 1
+
+
+def test_converting_outdated_duckdb_sqlalchemy_results(mock_config):
+    conn = SQLAlchemyConnection(create_engine("duckdb://"))
+    conn.execute("CREATE TABLE numbers AS SELECT * FROM range(5000)")
+
+    statement = "SELECT * FROM numbers"
+    first = ResultSet(conn.raw_execute(statement), mock_config, statement, conn=conn)
+
+    # running another query on the same connection invalidates the first results
+    statement = "SELECT 'a' AS c"
+    ResultSet(conn.raw_execute(statement), mock_config, statement, conn=conn)
+
+    assert first.DataFrame()["range"].tolist() == list(range(5000))
+    assert len(first) == 5000
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [
+        (1, [[(1,)], [(2,)], [(3,)], [(4,)], [(5,)]]),
+        (2, [[(1,), (2,)], [(3,), (4,)], [(5,)]]),
+        (5, [[(1,), (2,), (3,), (4,), (5,)]]),
+        (10, [[(1,), (2,), (3,), (4,), (5,)]]),
+    ],
+)
+def test_iter_batches(results, size, expected):
+    mock = Mock()
+    mock.displaylimit = 100
+    mock.autolimit = 0
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+
+    assert [list(batch) for batch in rs.iter_batches(size)] == expected
+    # rows are not stored, only the ones fetched for the preview
+    assert rs._results == [(1,), (2,)]
+    results.fetchall.assert_not_called()
+
+
+def test_iter_rows(results):
+    mock = Mock()
+    mock.displaylimit = 100
+    mock.autolimit = 0
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+
+    assert list(rs.iter_rows(size=2)) == [(1,), (2,), (3,), (4,), (5,)]
+    assert results.fetchmany.call_args_list == [
+        call(size=2),
+        call(size=2),
+        call(size=2),
+    ]
+
+
+def test_iter_batches_respects_autolimit(results):
+    mock = Mock()
+    mock.displaylimit = 100
+    mock.autolimit = 3
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+
+    assert list(rs.iter_rows(size=2)) == [(1,), (2,), (3,)]
+
+
+@pytest.mark.parametrize(
+    "consume",
+    [
+        lambda rs: list(rs),
+        lambda rs: len(rs),
+        lambda rs: rs.DataFrame(),
+        lambda rs: rs.PolarsDataFrame(),
+        lambda rs: rs.dict(),
+        lambda rs: rs.iter_batches(),
+        lambda rs: rs.iter_rows(),
+    ],
+    ids=[
+        "list",
+        "len",
+        "DataFrame",
+        "PolarsDataFrame",
+        "dict",
+        "iter_batches",
+        "iter_rows",
+    ],
+)
+def test_iter_batches_consumes_results(results, consume):
+    mock = Mock()
+    mock.displaylimit = 1
+    mock.autolimit = 0
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+    rs.iter_batches(size=2)
+
+    with pytest.raises(UsageError) as excinfo:
+        consume(rs)
+
+    assert excinfo.value.error_type == "RuntimeError"
+    assert "already been consumed" in str(excinfo.value)
+    assert "x" in str(rs)
+
+
+@pytest.mark.parametrize("size", [0, -1, 1.5, "1"])
+def test_iter_batches_invalid_size(results, size):
+    mock = Mock()
+    mock.displaylimit = 1
+    mock.autolimit = 0
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+
+    with pytest.raises(UsageError) as excinfo:
+        rs.iter_batches(size)
+
+    assert excinfo.value.error_type == "ValueError"
+    assert "size must be a positive integer" in str(excinfo.value)
+
+
+def test_iter_batches_doesnt_retain_arrow_batches(mock_config):
+    conn = DBAPIConnection(duckdb.connect())
+    statement = "SELECT * FROM range(10000)"
+
+    rs = ResultSet(conn.raw_execute(statement), mock_config, statement, conn=conn)
+
+    total = 0
+
+    for batch in rs.iter_batches(size=1000):
+        total += len(batch)
+        assert len(rs._sqlaproxy._read) <= 2
+
+    assert total == 10000
+
+
+def test_dataframe_chunksize(results):
+    mock = Mock()
+    mock.displaylimit = 1
+    mock.autolimit = 0
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+    frames = rs.DataFrame(chunksize=2)
+
+    assert [frame.to_dict(orient="list") for frame in frames] == [
+        {"x": [1, 2]},
+        {"x": [3, 4]},
+        {"x": [5]},
+    ]
+    results.fetchall.assert_not_called()
+
+
+def test_polars_dataframe_chunksize(results):
+    mock = Mock()
+    mock.displaylimit = 1
+    mock.autolimit = 0
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+    frames = rs.PolarsDataFrame(chunksize=3)
+
+    assert [frame.to_dict(as_series=False) for frame in frames] == [
+        {"x": [1, 2, 3]},
+        {"x": [4, 5]},
+    ]
+    results.fetchall.assert_not_called()
+
+
+def test_dataframe_invalid_chunksize(results):
+    mock = Mock()
+    mock.displaylimit = 1
+    mock.autolimit = 0
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+
+    # the error is raised when calling the method, not when iterating
+    with pytest.raises(UsageError) as excinfo:
+        rs.DataFrame(chunksize=0)
+
+    assert excinfo.value.error_type == "ValueError"
+
+
+def test_resultset_caches_rendered_table(results, monkeypatch):
+    mock = Mock()
+    mock.displaylimit = 2
+    mock.autolimit = 0
+
+    render = Mock(side_effect=TableRenderer._render)
+    monkeypatch.setattr(
+        TableRenderer, "_render", lambda self, rows, html: render(self, rows, html=html)
+    )
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+    html = rs._repr_html_()
+
+    assert rs._repr_html_() == html
+    assert render.call_count == 1
+
+    str(rs)
+    str(rs)
+    assert render.call_count == 2
+
+    # more rows are displayed, so the table is rendered again
+    mock.displaylimit = 3
+    assert "<td>3</td>" in rs._repr_html_()
+    assert render.call_count == 3
+
+
+def test_resultset_only_renders_displayed_rows(results):
+    mock = Mock()
+    mock.displaylimit = 2
+    mock.autolimit = 0
+
+    rs = ResultSet(results, mock, statement=None, conn=Mock())
+    list(rs)
+
+    html = rs._repr_html_()
+
+    assert "<td>2</td>" in html
+    assert "<td>3</td>" not in html
+
+
+@pytest.mark.parametrize(
+    "rows, expected",
+    [
+        ([], []),
+        ([(1, "a"), (2, "b")], [(1, "a"), (2, "b")]),
+        (
+            [(1, "http://a.com"), (2, None)],
+            [(1, "<a href=http://a.com>http://a.com</a>"), (2, None)],
+        ),
+        (
+            [("http://a.com", "https://b.com"), ("c", 3)],
+            [
+                (
+                    "<a href=http://a.com>http://a.com</a>",
+                    "<a href=https://b.com>https://b.com</a>",
+                ),
+                ("c", 3),
+            ],
+        ),
+    ],
+)
+def test_format_links(rows, expected):
+    assert _format_links(rows) == expected
@@ -13,7 +13,9 @@ from sql.run.run import (
     run_statements,
     is_postgres_or_redshift,
     select_df_type,
+    _iter_parameter_batches,
 )
+from sql.run import parallel
 from sql.run.pgspecial import handle_postgres_special
 from sql.run.resultset import ResultSet
 
@@ -34,6 +36,10 @@ class Config:
     style = "DEFAULT"
     autolimit = 0
     displaylimit = 10
+    result_storage = "rows"
+    stream_results = 0
+    autolimit_pushdown = False
+    statement_concurrency = 1
 
 
 class ConfigPandas(Config):
@@ -153,3 +159,217 @@ def test_do_not_fail_if_sqlalchemy_autocommit_not_supported():
     run_statements(conn, "SELECT 1", Config)
 
     # TODO: test .commit called or not depending on config!
+
+
+@pytest.mark.parametrize(
+    "config, expected_type",
+    [
+        [Config, pandas.DataFrame],
+        [ConfigPandas, pandas.DataFrame],
+        [ConfigPolars, polars.DataFrame],
+    ],
+)
+def test_run_with_chunksize(config, expected_type):
+    conn = DBAPIConnection(duckdb.connect())
+
+    out = run_statements(conn, "SELECT * FROM range(5)", config, chunksize=2)
+    frames = list(out)
+
+    assert [len(frame) for frame in frames] == [2, 2, 1]
+    assert all(isinstance(frame, expected_type) for frame in frames)
+
+
+@pytest.mark.parametrize(
+    "autolimit_pushdown, expected",
+    [
+        (True, "SELECT * FROM numbers LIMIT 2"),
+        (False, "SELECT * FROM numbers"),
+    ],
+)
+def test_run_autolimit_pushdown(monkeypatch, autolimit_pushdown, expected):
+    class ConfigAutolimit(Config):
+        autolimit = 2
+
+    ConfigAutolimit.autolimit_pushdown = autolimit_pushdown
+
+    conn = DBAPIConnection(duckdb.connect())
+    conn.execute("CREATE TABLE numbers AS SELECT * FROM range(5)")
+    raw_execute = Mock(wraps=conn.raw_execute)
+    monkeypatch.setattr(conn, "raw_execute", raw_execute)
+
+    out = run_statements(conn, "SELECT * FROM numbers", ConfigAutolimit)
+
+    raw_execute.assert_called_once_with(expected, parameters=None)
+    assert list(out) == [(0,), (1,)]
+
+
+def test_first_word_is_computed_per_statement():
+    conn = DBAPIConnection(duckdb.connect())
+
+    with pytest.raises(UsageError, match="does not support transactions"):
+        run_statements(conn, "SELECT 1; BEGIN", Config)
+
+
+class ConfigConcurrent(Config):
+    statement_concurrency = 4
+
+
+@pytest.mark.parametrize(
+    "statements, expected",
+    [
+        (["CREATE TABLE a AS SELECT 1", "CREATE TABLE b AS SELECT 2"], [[], []]),
+        (
+            ["CREATE TABLE a AS SELECT 1", "CREATE TABLE b AS SELECT * FROM a"],
+            [[], [0]],
+        ),
+        (["SELECT * FROM a", "DROP TABLE a", "SELECT * FROM b"], [[], [0], []]),
+        (["INSERT INTO a VALUES (1)", "INSERT INTO a VALUES (2)"], [[], [0]]),
+        (["SELECT * FROM a", "SELECT * FROM a"], [[], []]),
+        (["CREATE TABLE a AS SELECT 1", "SET threads = 1"], None),
+        (["CREATE TABLE a AS SELECT 1", "CREATE VIEW v AS SELECT * FROM a"], None),
+        (["CREATE TABLE a AS SELECT 1", "SELECT * FROM existing_view"], None),
+    ],
+)
+def test_find_dependencies(statements, expected):
+    assert (
+        parallel.find_dependencies(statements, "duckdb", frozenset(["existing_view"]))
+        == expected
+    )
+
+
+@pytest.fixture
+def duckdb_file(tmp_empty):
+    conn = SQLAlchemyConnection(create_engine("duckdb:///my.db"))
+    yield conn
+    conn.close()
+
+
+def test_run_independent_statements_concurrently(duckdb_file, monkeypatch):
+    checkout = Mock(wraps=duckdb_file.checkout)
+    monkeypatch.setattr(duckdb_file, "checkout", checkout)
+
+    out = run_statements(
+        duckdb_file,
+        """
+CREATE TABLE a AS SELECT range AS x FROM range(100);
+CREATE TABLE b AS SELECT range AS x FROM range(10);
+CREATE TABLE c AS SELECT * FROM a WHERE x < 50;
+INSERT INTO b SELECT * FROM c;
+SELECT (SELECT COUNT(*) FROM b) AS b, (SELECT COUNT(*) FROM c) AS c
+""",
+        ConfigConcurrent,
+    )
+
+    assert out.dict() == {"b": (60,), "c": (50,)}
+    # the last statement runs in the connection
+    assert checkout.call_count == 4
+
+
+def test_run_statements_sequentially_if_not_supported(duckdb_file, monkeypatch):
+    checkout = Mock(wraps=duckdb_file.checkout)
+    monkeypatch.setattr(duckdb_file, "checkout", checkout)
+
+    out = run_statements(
+        duckdb_file,
+        "SET threads = 1; CREATE TABLE a AS SELECT 1 AS x; SELECT * FROM a",
+        ConfigConcurrent,
+    )
+
+    assert out.dict() == {"x": (1,)}
+    checkout.assert_not_called()
+
+
+def test_run_statements_sequentially_if_they_read_a_view(duckdb_file, monkeypatch):
+    duckdb_file.raw_execute("CREATE TABLE a AS SELECT 1 AS x")
+    duckdb_file.raw_execute("CREATE VIEW v AS SELECT * FROM a")
+    checkout = Mock(wraps=duckdb_file.checkout)
+    monkeypatch.setattr(duckdb_file, "checkout", checkout)
+
+    out = run_statements(
+        duckdb_file,
+        "INSERT INTO a VALUES (2); CREATE TABLE b AS SELECT * FROM v; "
+        "SELECT COUNT(*) AS n FROM b",
+        ConfigConcurrent,
+    )
+
+    assert out.dict() == {"n": (2,)}
+    checkout.assert_not_called()
+
+
+def test_get_view_names(duckdb_file):
+    duckdb_file.raw_execute("CREATE TABLE a AS SELECT 1 AS x")
+    duckdb_file.raw_execute("CREATE VIEW My_View AS SELECT * FROM a")
+
+    assert parallel.get_view_names(duckdb_file) == frozenset(["my_view"])
+
+
+def test_get_view_names_empty_inspector_result_is_unknown(tmp_empty):
+    conn = SQLAlchemyConnection(create_engine("sqlite:///my.db"))
+    conn.raw_execute("CREATE TABLE a AS SELECT 1 AS x")
+
+    assert parallel.get_view_names(conn) is None
+
+
+def test_run_independent_statements_error(duckdb_file):
+    with pytest.raises(Exception, match="missing"):
+        run_statements(
+            duckdb_file,
+            "CREATE TABLE a AS SELECT * FROM missing; "
+            "CREATE TABLE b AS SELECT * FROM a; "
+            "SELECT 1",
+            ConfigConcurrent,
+        )
+
+    # the statement that depends on the failed one didn't run
+    tables = duckdb_file.raw_execute("SELECT table_name FROM information_schema.tables")
+    assert tables.fetchall() == []
+
+
+@pytest.mark.parametrize("connect_str", ["duckdb://", "sqlite:///my.db"])
+def test_get_concurrency_sequential(tmp_empty, connect_str):
+    conn = SQLAlchemyConnection(create_engine(connect_str))
+
+    assert parallel.get_concurrency(conn, ConfigConcurrent) == 1
+    assert parallel.get_concurrency(DBAPIConnection(duckdb.connect()), Config) == 1
+
+
+def test_get_concurrency(duckdb_file):
+    assert parallel.get_concurrency(duckdb_file, ConfigConcurrent) == 4
+
+
+def test_get_concurrency_without_autocommit(tmp_empty):
+    class ConfigNoAutocommit(ConfigConcurrent):
+        autocommit = False
+
+    conn = SQLAlchemyConnection(
+        create_engine("duckdb:///my.db"), config=ConfigNoAutocommit
+    )
+
+    assert parallel.get_concurrency(conn, ConfigNoAutocommit) == 1
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [{"x": x} for x in range(5)],
+        (({"x": x}) for x in range(5)),
+        pandas.DataFrame({"x": range(5)}),
+        polars.DataFrame({"x": range(5)}),
+    ],
+    ids=["list", "generator", "pandas", "polars"],
+)
+def test_iter_parameter_batches(data):
+    batches = list(_iter_parameter_batches(data, 2))
+
+    assert batches == [[{"x": 0}, {"x": 1}], [{"x": 2}, {"x": 3}], [{"x": 4}]]
+    # NumPy scalars are converted to Python objects
+    assert all(type(row["x"]) is int for batch in batches for row in batch)
+
+
+def test_iter_parameter_batches_converts_nan_to_none():
+    frame = pandas.DataFrame({"x": [1.5, None], "y": ["a", None]})
+
+    assert list(_iter_parameter_batches(frame, 10)) == [
+        [{"x": 1.5, "y": "a"}, {"x": None, "y": None}]
+    ]